@@ -0,0 +1,213 @@
+"""
+cleaning_rules.py
+This module defines the declarative cleaning rules used by clean_data.
+A cleaning step is described once as a rule, in one of three stages:
+    convert: ParseCurrency, MapOrdinal (raw text to numbers)
+    fill: FillMissing (a constant value, or the median of the column)
+    derive: Bin, FlagPattern (new columns from the filled data)
+A RuleSet compiles its rules once: it checks them, prepares the lookup tables,
+and fuses the constant fills of all columns into a single fillna call.
+Each rule then runs as one vectorized pass over its column and replaces the column in place,
+so new scraped fields only need new rules, not changes to the cleaning functions.
+
+functions:
+- ParseCurrency.apply: Converts a price text such as "£51.77" to a float.
+- MapOrdinal.apply: Converts text labels such as "Three" to numbers through a mapping.
+- FillMissing.apply: Fills the missing values of a column with a constant or its median.
+- Bin.apply: Puts a numeric column into labelled bins.
+- FlagPattern.apply: Flags the rows whose text matches a pattern.
+- RuleSet.convert: Runs the convert rules.
+- RuleSet.fill: Runs the fill rules with the medians of the median filled columns.
+- RuleSet.derive: Runs the derive rules.
+- RuleSet.fingerprint: Returns a hash of the rules, used to tell if saved results were made by the same rules.
+"""
+import hashlib
+import json
+import string
+
+from abc import ABC, abstractmethod
+
+import numpy as np
+import pandas as pd
+
+STAGES = ["convert", "fill", "derive"]
+FILL_STRATEGIES = ["constant", "median"]
+
+class Rule(ABC):
+    stage = None
+
+    def __init__(self, column: str) -> None:
+        self.column = column
+
+    """
+    Returns the rule parameters, without the compiled lookup tables (attributes starting with _).
+    """
+    def describe(self) -> dict:
+        return {"rule": type(self).__name__,
+                **{name: value for name, value in vars(self).items() if not name.startswith("_")}}
+
+    """
+    Runs the rule on its column, changing the DataFrame in place.
+    """
+    @abstractmethod
+    def apply(self, df: pd.DataFrame) -> None:
+        pass
+
+class ParseCurrency(Rule):
+    stage = "convert"
+
+    def __init__(self, column: str, symbol: str = "£") -> None:
+        super().__init__(column)
+        self.symbol = symbol
+        self._strip_chars = symbol + string.whitespace
+
+    """
+    Strips the currency symbol and the white space in one pass, and converts the rest to float
+    (text that is not a number becomes NaN).
+    """
+    def apply(self, df: pd.DataFrame) -> None:
+        df[self.column] = pd.to_numeric(df[self.column].str.strip(self._strip_chars), errors="coerce")
+
+class MapOrdinal(Rule):
+    stage = "convert"
+
+    def __init__(self, column: str, mapping: dict) -> None:
+        super().__init__(column)
+        if not mapping:
+            raise ValueError("Mapping can't be empty")
+        self.mapping = mapping
+        self._labels = pd.Index(list(mapping))
+        # The last entry is used for the labels that are not in the mapping
+        self._int_values = np.array(list(mapping.values()) + [0])
+        self._float_values = np.append(np.array(list(mapping.values()), dtype=float), np.nan)
+
+    """
+    Converts the labels to their values with a lookup table indexed by the position of each label in the mapping
+    (-1 for the labels that are not in the mapping, which picks the last entry).
+    The result has integer type when every label is in the mapping, like Series.map.
+    """
+    def apply(self, df: pd.DataFrame) -> None:
+        codes = self._labels.get_indexer(df[self.column])
+        if (codes >= 0).all() and self._int_values.dtype.kind == "i":
+            values = self._int_values[codes]
+        else:
+            values = self._float_values[codes]
+        df[self.column] = pd.Series(values, index=df.index)
+
+class FillMissing(Rule):
+    stage = "fill"
+
+    def __init__(self, column: str, value=None, strategy: str = "constant") -> None:
+        super().__init__(column)
+        if strategy not in FILL_STRATEGIES:
+            raise ValueError(f"Fill strategy must be one of {FILL_STRATEGIES}")
+        if strategy == "constant" and value is None:
+            raise ValueError("Constant fill needs a value")
+        self.value = value
+        self.strategy = strategy
+
+    """
+    Fills the missing values of the column, RuleSet.fill runs the fills of all columns as a single fillna call instead.
+    Parameters:
+        df (pd.DataFrame): The converted data
+        medians (dict): {column: median} calculated over the whole dataset by the caller, needed by the median strategy
+    """
+    def apply(self, df: pd.DataFrame, medians: dict = None) -> None:
+        if self.strategy == "median" and (medians is None or self.column not in medians):
+            raise ValueError(f"Median fill of {self.column} needs its median")
+        if self.column in df.columns:
+            df[self.column] = df[self.column].fillna(self.value if self.strategy == "constant" else medians[self.column])
+
+class Bin(Rule):
+    stage = "derive"
+
+    def __init__(self, column: str, target: str, bins: list, labels: list, right: bool = False) -> None:
+        super().__init__(column)
+        if len(labels) != len(bins) - 1:
+            raise ValueError("Labels must be one fewer than bins")
+        if any(lower >= upper for lower, upper in zip(bins, bins[1:])):
+            raise ValueError("Bins must be increasing")
+        self.target = target
+        self.bins = list(bins)
+        self.labels = list(labels)
+        self.right = right
+        self._bins = np.array(bins, dtype=float)
+        # The last entry is used for the values outside the bins
+        self._labels = np.array(list(labels) + [None], dtype=object)
+
+    """
+    Finds the bin of every value by binary search, the same bins as pd.cut:
+    [lower, upper) by default, (lower, upper] if right is True, NaN outside the bins.
+    """
+    def apply(self, df: pd.DataFrame) -> None:
+        values = df[self.column].to_numpy(dtype=float)
+        side = "left" if self.right else "right"
+        index = np.searchsorted(self._bins, values, side=side) - 1
+        outside = (index < 0) | (index >= len(self.labels)) | np.isnan(values)
+        if self.right:
+            # The lowest bound is not part of the first bin, like pd.cut without include_lowest
+            outside |= values == self._bins[0]
+        df[self.target] = pd.Series(self._labels[np.where(outside, len(self.labels), index)], index=df.index, dtype=str)
+
+class FlagPattern(Rule):
+    stage = "derive"
+
+    def __init__(self, column: str, target: str, pattern: str, case: bool = False) -> None:
+        super().__init__(column)
+        self.target = target
+        self.pattern = pattern
+        self.case = case
+
+    """
+    Flags the rows whose text contains the pattern, missing text is not flagged.
+    """
+    def apply(self, df: pd.DataFrame) -> None:
+        df[self.target] = df[self.column].str.contains(self.pattern, case=self.case, na=False)
+
+class RuleSet:
+    def __init__(self, rules: list) -> None:
+        # Validate initial data
+        for rule in rules:
+            if rule.stage not in STAGES:
+                raise ValueError(f"Rule stage must be one of {STAGES}")
+        fill_columns = [rule.column for rule in rules if rule.stage == "fill"]
+        if len(fill_columns) != len(set(fill_columns)):
+            raise ValueError("A column can only have one fill rule")
+
+        self.rules = rules
+        self._convert_rules = [rule for rule in rules if rule.stage == "convert"]
+        self._derive_rules = [rule for rule in rules if rule.stage == "derive"]
+        # The constant fills of every column run as a single fillna call
+        self._constant_fills = {rule.column: rule.value for rule in rules
+                                if rule.stage == "fill" and rule.strategy == "constant"}
+        self.median_columns = [rule.column for rule in rules if rule.stage == "fill" and rule.strategy == "median"]
+        self.converted_columns = [rule.column for rule in self._convert_rules]
+
+    def convert(self, df: pd.DataFrame) -> pd.DataFrame:
+        for rule in self._convert_rules:
+            rule.apply(df)
+        return df
+
+    """
+    Fills the missing values.
+    Parameters:
+        df (pd.DataFrame): The converted data
+        medians (dict): {column: median} for the median filled columns,
+            calculated over the whole dataset by the caller
+    """
+    def fill(self, df: pd.DataFrame, medians: dict) -> pd.DataFrame:
+        values = {**self._constant_fills, **{column: medians[column] for column in self.median_columns}}
+        values = {column: value for column, value in values.items() if column in df.columns}
+        return df.fillna(values)
+
+    def derive(self, df: pd.DataFrame) -> pd.DataFrame:
+        for rule in self._derive_rules:
+            rule.apply(df)
+        return df
+
+    """
+    Returns the SHA-256 hex digest of the rule parameters.
+    """
+    def fingerprint(self) -> str:
+        document = json.dumps([rule.describe() for rule in self.rules], default=str, sort_keys=True)
+        return hashlib.sha256(document.encode("utf-8")).hexdigest()
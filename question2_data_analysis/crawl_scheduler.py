@@ -0,0 +1,207 @@
+"""
+crawl_scheduler.py
+This module crawls several catalogue mirrors of books.toscrape.com in one run.
+It defines:
+    BloomFilter: a compact set of seen URLs, used to de-duplicate the frontier
+    CrawlScheduler: a frontier of listing and detail pages per host, fetched by one shared pool of workers
+        while every host keeps its own concurrency limit and request rate
+
+functions:
+- BloomFilter.add: Adds a URL and tells if it may have been seen before.
+- CrawlScheduler.add_url: Adds a URL to the frontier of its host unless it was seen before.
+- CrawlScheduler.crawl: Crawls the seeds and yields the scraped book rows.
+"""
+import argparse
+import hashlib
+import math
+
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from urllib.parse import urlsplit
+from question2_data_analysis.data_scraper import BASE_URL, fetch_with_retries, save_to_csv
+from question2_data_analysis.http_session import create_session
+from question2_data_analysis.page_parser import parse_breadcrumb_category, parse_listing_page
+from question2_data_analysis.rate_limiter import TokenBucket
+from question2_data_analysis.response_cache import ResponseCache
+from question2_data_analysis.scrape_metrics import ScrapeMetrics
+
+class BloomFilter:
+    def __init__(self, capacity: int = 100000, error_rate: float = 0.001) -> None:
+        # Validate initial data
+        if capacity <= 0:
+            raise ValueError("Capacity must be positive value")
+        if not (0 < error_rate < 1):
+            raise ValueError("Error rate must be between 0 and 1")
+
+        # Optimal number of bits and hash functions for the capacity and false positive rate
+        self.size = math.ceil(-capacity * math.log(error_rate) / math.log(2) ** 2)
+        self.hash_count = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+
+    """
+    Calculates the bit positions of a URL with double hashing of a single digest.
+    """
+    def _positions(self, url: str) -> list:
+        digest = hashlib.blake2b(url.encode("utf-8"), digest_size=16).digest()
+        first = int.from_bytes(digest[:8], "little")
+        second = int.from_bytes(digest[8:], "little") | 1
+        return [(first + i * second) % self.size for i in range(self.hash_count)]
+
+    def __contains__(self, url: str) -> bool:
+        return all(self.bits[position >> 3] & (1 << (position & 7)) for position in self._positions(url))
+
+    """
+    Adds a URL to the filter.
+    returns:
+    - True if the URL is new, False if it may have been added before
+        (a false positive happens at most at the error rate, while the filter is under its capacity)
+    """
+    def add(self, url: str) -> bool:
+        is_new = False
+        for position in self._positions(url):
+            mask = 1 << (position & 7)
+            if not self.bits[position >> 3] & mask:
+                self.bits[position >> 3] |= mask
+                is_new = True
+        return is_new
+
+class HostState:
+    def __init__(self, requests_per_second: float) -> None:
+        self.rate_limiter = TokenBucket(requests_per_second)
+        self.listings: deque = deque() # Listing page URLs waiting to be fetched
+        self.details: deque = deque() # (detail URL, listing entry) waiting to be fetched
+        self.active = 0 # Number of requests in flight
+
+    def has_pending(self) -> bool:
+        return bool(self.listings or self.details)
+
+class CrawlScheduler:
+    def __init__(self,
+                seeds: list[str],
+                pages: int = 1,
+                host_concurrency: int = 2,
+                host_requests_per_second: float = 1.0,
+                workers: int = None,
+                cache: ResponseCache = None,
+                metrics: ScrapeMetrics = None,
+                expected_urls: int = 100000
+                ) -> None:
+        # Validate initial data
+        if pages <= 0:
+            raise ValueError("Pages must be positive value")
+        if host_concurrency <= 0:
+            raise ValueError("Host concurrency must be positive value")
+        if host_requests_per_second <= 0:
+            raise ValueError("Host requests per second must be positive value")
+
+        self.seeds = seeds # URL templates for paginated book listings, one per mirror
+        self.pages = pages
+        self.host_concurrency = host_concurrency
+        self.host_requests_per_second = host_requests_per_second
+        self.cache = cache
+        self.metrics = metrics
+
+        self.hosts: dict[str, HostState] = {}
+        self.seen = BloomFilter(capacity=expected_urls)
+        for seed in seeds:
+            for page in range(1, pages + 1):
+                self.add_url(seed.format(page))
+
+        # By default every host can use all of its slots at the same time
+        self.workers = workers or max(1, len(self.hosts) * host_concurrency)
+        self.session = create_session(pool_size=self.workers)
+
+    """
+    Adds a URL to the frontier of its host.
+    Parameters:
+        url (str): The URL of a listing page, or of a detail page if entry is given
+        entry (list): The listing page entry of a detail page
+    returns:
+    - True if the URL was added, False if it was seen before
+    """
+    def add_url(self, url: str, entry: list = None) -> bool:
+        if not self.seen.add(url):
+            return False
+
+        host = urlsplit(url).netloc
+        if host not in self.hosts:
+            self.hosts[host] = HostState(self.host_requests_per_second)
+        if entry is None:
+            self.hosts[host].listings.append(url)
+        else:
+            self.hosts[host].details.append((url, entry))
+        return True
+
+    """
+    Fetches and parses one page, run by the worker threads.
+    returns:
+    - The listing entries of a listing page, the category of a detail page, or None if the fetch failed
+    """
+    def _fetch(self, host: HostState, url: str, is_detail: bool):
+        response = fetch_with_retries(url, rate_limiter=host.rate_limiter, session=self.session,
+                                      cache=self.cache, metrics=self.metrics)
+        if response is None:
+            return None
+        if is_detail:
+            return parse_breadcrumb_category(response)
+        return parse_listing_page(response, url)
+
+    """
+    Crawls the seeds.
+    structure:
+    - Give every host with pending URLs and free slots new tasks, detail pages first
+        so rows are produced early and the frontier stays small
+    - Wait for any task to finish and free its host slot
+    - Add the detail pages found on a listing page to the frontier, or yield the row of a detail page
+    - Stop when no host has pending URLs and no task is running
+    Yield:
+    - A list containing [title, price, rating, category, availability] for each book
+    """
+    def crawl(self):
+        running = {} # {future: (host, detail entry or None)}
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            while True:
+                for host in self.hosts.values():
+                    while host.has_pending() and host.active < self.host_concurrency:
+                        if host.details:
+                            url, entry = host.details.popleft()
+                        else:
+                            url, entry = host.listings.popleft(), None
+                        host.active += 1
+                        running[executor.submit(self._fetch, host, url, entry is not None)] = (host, entry)
+
+                if not running:
+                    break
+
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    host, entry = running.pop(future)
+                    host.active -= 1
+                    try:
+                        result = future.result()
+                    except Exception as task_error:
+                        print(f"Error: {task_error}")
+                        continue
+
+                    if entry is not None:
+                        title, price, rating, _, availability = entry
+                        if self.metrics is not None:
+                            self.metrics.record_row()
+                        yield [title, price, rating, result, availability]
+                    elif result is not None:
+                        for listing_entry in result:
+                            self.add_url(listing_entry[3], listing_entry)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Crawl several catalogue mirrors in one run")
+    parser.add_argument("seeds", nargs="*", default=[BASE_URL], help="URL templates for paginated book listings, with {} for the page number")
+    parser.add_argument("--pages", type=int, default=25, help="Number of listing pages per seed")
+    parser.add_argument("--host-concurrency", type=int, default=2, help="Maximum number of requests in flight per host")
+    parser.add_argument("--host-rps", type=float, default=2.0, help="Maximum requests per second per host")
+    parser.add_argument("--output", default="books_data_crawl.csv", help="Name of the raw CSV file")
+    args = parser.parse_args()
+
+    scheduler = CrawlScheduler(args.seeds, args.pages, args.host_concurrency, args.host_rps,
+                               cache=ResponseCache(), metrics=ScrapeMetrics())
+    save_to_csv(scheduler.crawl(), args.output)
+    print(scheduler.metrics.snapshot()["requests"])
@@ -1,89 +1,234 @@
 """
 data_analyzer.py
 This module contains functions to perform descriptive and inferential statistical analysis.
+Every statistic comes from one pass over the data with the streaming_stats accumulators,
+so a cleaned file larger than memory can be analyzed in chunks, and shards can be analyzed in parallel and merged.
+The cleaned file is loaded through the dataset cache shared with the other stages,
+and every analysis also has a variant that takes an already loaded DataFrame.
+
+functions:
+- frame_statistics: Computes the statistics of a DataFrame in one pass.
+- analysis_statistics: Computes the statistics of a cleaned file in one pass.
+- print_descriptive_statistics: Prints the central tendency, dispersion, group statistics and rating distribution.
+- print_inferential_statistics: Prints the price outliers, the price-rating correlation and the Fiction vs Nonfiction t-test.
+- analyze_data_descriptive_statistics / analyze_frame_descriptive_statistics: The descriptive statistics of a file / DataFrame.
+- analyze_data_inferential_statistics / analyze_frame_inferential_statistics: The inferential statistics of a file / DataFrame.
+- grouped_statistics: Computes the statistics of a column for every group of another column in one pass.
+- analyze_data_grouped_statistics: Prints the statistics of a column for the largest groups of another column.
+- analyze_data_pairwise_tests: Prints the tests of every pair of groups, corrected for multiple comparisons.
+- analyze_data_resampling: Prints the bootstrap confidence intervals and the Fiction vs Nonfiction permutation test.
 """
+import argparse
 import os
 import pandas as pd
+
 from scipy import stats
+from question2_data_analysis.dataset_io import DATASET_CACHE
+from question2_data_analysis.pairwise_tests import CORRECTIONS, pairwise_tests
+from question2_data_analysis.resampling import DEFAULT_RESAMPLES, bootstrap_ci, permutation_test
+from question2_data_analysis.streaming_stats import AnalysisStatistics, GroupedStatistics
 
 CLEANED_DATA_PATH = "question2_data_analysis/data/cleaned/" # Path to save the cleaned data
+ANALYSIS_COLUMNS = ["price", "rating", "category"] # The only columns the analysis reads
 
-def analyze_data_descriptive_statistics(file_name: str) -> None:
+"""
+Define a function to compute the statistics of a cleaned file
+Parameters:
+    file_name (str): The name of the cleaned CSV file in CLEANED_DATA_PATH
+    chunksize (int): Read the file in chunks of this many rows, or None to load it at once
+        (from the dataset cache, or its Parquet or memory-mapped copy when there is one)
+Return:
+- The AnalysisStatistics of the file, merge the statistics of several files to analyze them together
+"""
+def analysis_statistics(file_name: str, chunksize: int = None) -> AnalysisStatistics:
     file_path = os.path.join(CLEANED_DATA_PATH, file_name)
-    df = pd.read_csv(file_path)
+    if chunksize is None:
+        return frame_statistics(DATASET_CACHE.load(file_path, columns=ANALYSIS_COLUMNS, mapped=True))
+    statistics = AnalysisStatistics()
+
+    # Validate initial data
+    if chunksize <= 0:
+        raise ValueError("Chunk size must be positive value")
+    for chunk in pd.read_csv(file_path, usecols=ANALYSIS_COLUMNS, chunksize=chunksize, encoding="utf-8-sig"):
+        statistics.update(chunk)
+    return statistics
+
+"""
+Define a function to compute the statistics of an already loaded DataFrame, with the price, rating and category columns
+"""
+def frame_statistics(df: pd.DataFrame) -> AnalysisStatistics:
+    statistics = AnalysisStatistics()
+    statistics.update(df)
+    return statistics
+
+def analyze_data_descriptive_statistics(file_name: str, chunksize: int = None) -> None:
+    print_descriptive_statistics(analysis_statistics(file_name, chunksize))
+
+def analyze_frame_descriptive_statistics(df: pd.DataFrame) -> None:
+    print_descriptive_statistics(frame_statistics(df))
+
+def analyze_data_inferential_statistics(file_name: str, chunksize: int = None) -> None:
+    print_inferential_statistics(analysis_statistics(file_name, chunksize))
+
+def analyze_frame_inferential_statistics(df: pd.DataFrame) -> None:
+    print_inferential_statistics(frame_statistics(df))
+
+"""
+Define a function to compute the statistics of a column for every group of another column
+Parameters:
+    file_name (str): The name of the cleaned CSV file in CLEANED_DATA_PATH
+    by (str): The column that defines the groups, such as category, rating or price_category
+    value (str): The numeric column described in each group
+    chunksize (int): Read the file in chunks of this many rows, or None to load it at once
+Return:
+- The GroupedStatistics of the file, its table, top_k and welch_test serve any breakdown without another pass
+"""
+def grouped_statistics(file_name: str, by: str = "category", value: str = "price", chunksize: int = None) -> GroupedStatistics:
+    file_path = os.path.join(CLEANED_DATA_PATH, file_name)
+    statistics = GroupedStatistics()
+    if chunksize is None:
+        df = DATASET_CACHE.load(file_path, columns=list(dict.fromkeys([by, value])), mapped=True)
+        statistics.update(df[by], df[value])
+        return statistics
+
+    # Validate initial data
+    if chunksize <= 0:
+        raise ValueError("Chunk size must be positive value")
+    for chunk in pd.read_csv(file_path, usecols=list(dict.fromkeys([by, value])), chunksize=chunksize, encoding="utf-8-sig"):
+        statistics.update(chunk[by], chunk[value])
+    return statistics
+
+def analyze_data_grouped_statistics(file_name: str, by: str = "category", value: str = "price", top: int = 10,
+                                    chunksize: int = None) -> None:
+    statistics = grouped_statistics(file_name, by, value, chunksize)
+    print(f"\n-- Group statistics: {value} by {by} (top {top}) --")
+    table = statistics.table()
+    print(table.loc[statistics.top_k(top)].round(2).to_string())
+
+"""
+Define a function to compare a column between every pair of groups of another column
+Parameters:
+    file_name (str): The name of the cleaned CSV file in CLEANED_DATA_PATH
+    by (str): The column that defines the groups
+    value (str): The numeric column compared
+    mann_whitney (bool): Also run the Mann-Whitney U test
+    correction (str): The multiple comparison correction, one of CORRECTIONS
+    top (int): The number of pairs printed, the most significant first
+    chunksize (int): Read the file in chunks of this many rows, or None to load it at once
+Return:
+- The table of every pair (see pairwise_tests)
+"""
+def analyze_data_pairwise_tests(file_name: str, by: str = "category", value: str = "price", mann_whitney: bool = False,
+                                correction: str = "holm", top: int = 10, chunksize: int = None) -> pd.DataFrame:
+    table = pairwise_tests(grouped_statistics(file_name, by, value, chunksize), mann_whitney=mann_whitney, correction=correction)
+    print(f"\n-- Pairwise tests: {value} by {by}, {len(table)} pairs, {correction} correction (top {top}) --")
+    columns = ["group_a", "group_b", "difference", "t_stat", "p_value", "p_adjusted", "significant"]
+    if mann_whitney:
+        columns += ["u_stat", "mw_p_value", "mw_p_adjusted", "mw_significant"]
+    print(table[columns].head(top).round(4).to_string(index=False))
+    print(f"Significant pairs:\t{int(table['significant'].sum())}")
+    return table
+
+"""
+Define a function to analyze the price with resampling, which needs no normality assumption
+Parameters:
+    file_name (str): The name of the cleaned CSV file in CLEANED_DATA_PATH
+    resamples (int): The number of bootstrap resamples and permutations
+    seed (int): The seed, the same seed gives the same intervals and p-value
+    workers (int): The number of worker processes, None to resample in this process
+Structure:
+- Bootstrap 95% confidence intervals of the mean price, the median price and the price-rating correlation
+- Permutation test of the difference of the mean price of Fiction and Nonfiction
+Return:
+- A dictionary with the interval of each statistic and the permutation test (None without enough data)
+"""
+def analyze_data_resampling(file_name: str, resamples: int = DEFAULT_RESAMPLES, seed: int = 0, workers: int = None) -> dict:
+    df = DATASET_CACHE.load(os.path.join(CLEANED_DATA_PATH, file_name), columns=ANALYSIS_COLUMNS, mapped=True)
+    results = {
+        "mean": bootstrap_ci(df["price"], "mean", resamples, seed=seed, workers=workers),
+        "median": bootstrap_ci(df["price"], "median", resamples, seed=seed, workers=workers),
+        "correlation": bootstrap_ci(df[["price", "rating"]], "correlation", resamples, seed=seed, workers=workers),
+    }
+    print(f"\n-- Bootstrap 95% confidence intervals ({resamples} resamples) --")
+    for name, result in results.items():
+        print(f"{name.capitalize()}:\t{result['estimate']:.4f} [{result['low']:.4f}, {result['high']:.4f}] (SE {result['std_error']:.4f})")
+
+    fiction = df.loc[df["category"] == "Fiction", "price"].dropna()
+    nonfiction = df.loc[df["category"] == "Nonfiction", "price"].dropna()
+    print(f"\n-- Permutation test: Fiction vs Nonfiction ({resamples} permutations) --")
+    if len(fiction) > 0 and len(nonfiction) > 0:
+        results["permutation"] = permutation_test(fiction, nonfiction, resamples, seed=seed, workers=workers)
+        print(f"Difference of the means:\t{results['permutation']['difference']:.4f}")
+        print(f"P-value:\t{results['permutation']['p_value']:.4f}")
+    else:
+        results["permutation"] = None
+        print("Not enough data to perform permutation test.")
+    return results
+
+def print_descriptive_statistics(statistics: AnalysisStatistics) -> None:
+    price = statistics.price
     
     # Central tendency: mean, median, mode for prices
     print(f"\n-- Central tendency: Mean, Median, Mode for Price --")
-    mean_price = df["price"].mean()
-    median_price = df["price"].median()
-    mode_price = df["price"].mode()
+    mean_price = price.mean if price.n else float("nan")
+    median_price = price.quantile(0.5)
+    mode_price = price.mode()
     print(f"Mean:\t\t{mean_price:.2f}")
     print(f"Median:\t\t{median_price:.2f}")
-    if not mode_price.empty:
-        print(f"Mode:\t\t{mode_price[0]:.2f}")
+    if price.n:
+        print(f"Mode:\t\t{mode_price:.2f}")
         
     # Dispersion: standard deviation, range
     print(f"\n-- Dispersion: standard deviation, range --")
-    std_price = df["price"].std()
-    price_range = df["price"].max() - df["price"].min()
+    std_price = price.std()
+    price_range = price.max - price.min
     print(f"STD:\t\t{std_price:.2f}")
     print(f"Range:\t\t{price_range:.2f}")
     
     #Group statistics: average price by category (top 5)
     print(f"\n-- Group statistics: average price by category (top 5) --")
-    top5_categories = (
-        df['category']
-        .value_counts(ascending=False)
-        .head(5)
-        .index
-    )
-    avg_prices_by_category = (
-        df[df['category'].isin(top5_categories)]
-        .groupby('category')['price']
-        .mean()
-        .round(2)
-        .sort_values(ascending=False)
-        .reset_index()
-    )
+    avg_prices_by_category = statistics.top_category_prices(5)
     print(avg_prices_by_category)
     
     # Rating distribution: frequency count
     print(f"\n-- Rating distribution: frequency count --")
+    rating_counts = statistics.rating.counts if statistics.rating.n else pd.Series(dtype=int)
     rating_distribution = (
-        df["rating"]
-        .value_counts()
+        rating_counts
         .sort_index()
+        .rename_axis("rating")
+        .rename("count")
         .reset_index()
     )
     print(rating_distribution)
 
-def analyze_data_inferential_statistics(file_name: str) -> None:
+def print_inferential_statistics(statistics: AnalysisStatistics) -> None:
     ALPHA = 0.05  # significance level
     
-    file_path = os.path.join(CLEANED_DATA_PATH, file_name)
-    df = pd.read_csv(file_path)
+    price = statistics.price
     
     # Outlier detection: Use IQR method for price outliers
     print(f"\n-- Outlier detection: Use IQR method for price outliers --")
-    Q1 = df["price"].quantile(0.25)
-    Q3 = df["price"].quantile(0.75)
+    Q1 = price.quantile(0.25)
+    Q3 = price.quantile(0.75)
     IQR = Q3 - Q1
 
     lower_bound = Q1 - 1.5 * IQR
     upper_bound = Q3 + 1.5 * IQR
 
-    outliers = df[(df["price"] < lower_bound) | (df["price"] > upper_bound)]
+    # The frequency table gives the count without a second pass
+    outliers = price.count_outside(lower_bound, upper_bound)
 
     print(f"Q1:\t\t\t\t{Q1:.2f}")
     print(f"Q3:\t\t\t\t{Q3:.2f}")
     print(f"IQR:\t\t\t\t{IQR:.2f}")
     print(f"Lower Bound:\t\t\t{lower_bound:.2f}")
     print(f"Upper Bound:\t\t\t{upper_bound:.2f}")
-    print(f"Number of Outliers:\t\t{len(outliers)}")
+    print(f"Number of Outliers:\t\t{outliers}")
 
     # Correlation analysis: Pearson correlation between price and rating
     print(f"\n-- Correlation analysis: Pearson correlation between price and rating --")
-    correlation, p_corr = stats.pearsonr(df["price"], df["rating"])
+    correlation, p_corr = statistics.price_rating_correlation()
 
     print(f"Pearson Correlation Coefficient (r):\t{correlation:.3f}")
     print(f"P-value:\t\t\t\t{p_corr:.4f}")
@@ -96,19 +241,19 @@ def analyze_data_inferential_statistics(file_name: str) -> None:
     # Hypothesis testing
     # Compare average prices between Fiction vs Non-Fiction
     print(f"\n-- Hypothesis testing - Compare average prices between Fiction vs Non-Fiction --")
-    fiction_prices = df[df["category"] == "Fiction"]["price"]
-    nonfiction_prices = df[df["category"] == "Nonfiction"]["price"]
+    fiction_count, fiction_mean, fiction_std = statistics.category_price("Fiction")
+    nonfiction_count, nonfiction_mean, nonfiction_std = statistics.category_price("Nonfiction")
     
-    if len(fiction_prices) >= 2 and len(nonfiction_prices) >= 2:
+    if fiction_count >= 2 and nonfiction_count >= 2:
 
-        t_stat, p_value = stats.ttest_ind(
-            fiction_prices,
-            nonfiction_prices,
+        t_stat, p_value = stats.ttest_ind_from_stats(
+            fiction_mean, fiction_std, fiction_count,
+            nonfiction_mean, nonfiction_std, nonfiction_count,
             equal_var=False  # Welch's t-test (safer)
         )
 
-        print(f"Fiction Mean Price:\t{fiction_prices.mean():.2f}")
-        print(f"Non-Fiction Mean Price:\t{nonfiction_prices.mean():.2f}")
+        print(f"Fiction Mean Price:\t{fiction_mean:.2f}")
+        print(f"Non-Fiction Mean Price:\t{nonfiction_mean:.2f}")
         print(f"T-statistic:\t\t{t_stat:.3f}")
         print(f"P-value:\t\t{p_value:.4f}")
 
@@ -121,6 +266,26 @@ def analyze_data_inferential_statistics(file_name: str) -> None:
         print("Not enough data to perform t-test.")
     
 if __name__ == "__main__":
-    analyze_data_descriptive_statistics('cleaned_books_data_500.csv')
-    analyze_data_inferential_statistics('cleaned_books_data_500.csv')
-    
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Analyze the cleaned data")
+    parser.add_argument("--chunksize", type=int, default=None, help="Read the cleaned file in chunks of this many rows (for files larger than memory)")
+    parser.add_argument("--group-by", default=None, help="Also print the price statistics of the largest groups of this column (e.g. category, rating)")
+    parser.add_argument("--pairwise", action="store_true", help="Also test the price of every pair of groups (of --group-by, category by default)")
+    parser.add_argument("--mann-whitney", action="store_true", help="Add the Mann-Whitney U test to the pairwise tests")
+    parser.add_argument("--correction", choices=CORRECTIONS, default="holm", help="Multiple comparison correction of the pairwise tests")
+    parser.add_argument("--bootstrap", type=int, default=None, metavar="N", help="Also print bootstrap confidence intervals and a permutation test with N resamples")
+    parser.add_argument("--workers", type=int, default=None, help="Worker processes of the resampling (one process by default)")
+    parser.add_argument("--seed", type=int, default=0, help="Seed of the resampling")
+    args = parser.parse_args()
+
+    # One pass over the data for both analyses
+    statistics = analysis_statistics('cleaned_books_data_500.csv', chunksize=args.chunksize)
+    print_descriptive_statistics(statistics)
+    print_inferential_statistics(statistics)
+    if args.group_by:
+        analyze_data_grouped_statistics('cleaned_books_data_500.csv', by=args.group_by, chunksize=args.chunksize)
+    if args.pairwise:
+        analyze_data_pairwise_tests('cleaned_books_data_500.csv', by=args.group_by or "category", mann_whitney=args.mann_whitney,
+                                    correction=args.correction, chunksize=args.chunksize)
+    
+    if args.bootstrap:
+        analyze_data_resampling('cleaned_books_data_500.csv', resamples=args.bootstrap, seed=args.seed, workers=args.workers)
@@ -3,11 +3,31 @@ data_cleaner.py
 The script for cleaning the scraped raw data
 """
 
+import argparse
+import hashlib
+import io
+import json
+import multiprocessing
 import os
+import time
+import numpy as np
 import pandas as pd
 
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from contextlib import nullcontext, redirect_stdout
+from question2_data_analysis.cleaning_rules import Bin, FillMissing, FlagPattern, MapOrdinal, ParseCurrency, RuleSet
+from question2_data_analysis.data_profiler import DataProfiler, diff_profiles, load_profile, profile_table, write_json
+from question2_data_analysis.data_schema import apply_schema, memory_per_row
+from question2_data_analysis.dataset_io import PYARROW_AVAILABLE, ColumnarWriter, columnar_path, load_cleaned, mapped_path, write_mapped
+from question2_data_analysis.near_duplicates import duplicate_report, find_duplicate_clusters, key_hashes
+from question2_data_analysis.raw_validation import DEFAULT_MAX_FAILURE_RATE, RawValidator
+
 RAW_DATA_PATH = "question2_data_analysis/data/raw/" # Path to the raw scraped data
 CLEANED_DATA_PATH = "question2_data_analysis/data/cleaned/" # Path to save the cleaned data
+DEFAULT_CHUNKSIZE = 100000 # Rows per chunk when the incremental mode has to clean the whole file
+WATERMARK_WINDOW = 4096 # Bytes before the watermark hashed to detect a rewritten raw file
+MERGED_FILE_NAME = "books_data_merged.csv" # Name of the merged output of a batch, saved with the cleaned_ prefix
+DEDUP_MODES = ["exact", "key", "fuzzy"] # Identical rows, same normalized title and category, or also similar titles
 
 # Define the map for converting text rating to int rating
 RATING_MAP = {
@@ -18,81 +38,733 @@ RATING_MAP = {
     "Five": 5,
 }
 
-def clean_data(file_name: str):
-    print("\n-- Cleaning Data ---")
+# Define the cleaning rules of the scraped book data
+DEFAULT_RULES = RuleSet([
+    # Price standardization (Remove '£' symbol, convert to float)
+    ParseCurrency('price', symbol='£'),
+    # Rating conversion: Convert text ratings to numeric (1-5)
+    MapOrdinal('rating', RATING_MAP),
+    # Handle missing data: Identify and address null values
+    FillMissing('title', 'Unknown'),
+    FillMissing('price', strategy='median'),
+    FillMissing('rating', strategy='median'),
+    FillMissing('category', 'Unknown'),
+    FillMissing('availability', 'Unknown'),
+    # Categorize Price
+    Bin('price', 'price_category', bins=[0, 20, 40, float('inf')], labels=['Budget', 'Mid-range', 'Premium']),
+    # Boolean based on availability
+    FlagPattern('availability', 'in_stock', 'In Stock', case=False),
+])
+
+"""
+Define a function to count the values of the median filled columns of a converted chunk
+Return:
+- A dictionary {column: value counts}
+"""
+def median_value_counts(df: pd.DataFrame, rules: RuleSet) -> dict:
+    return {column: df[column].value_counts() for column in rules.median_columns}
+
+"""
+Define a function to merge two dictionaries of value counts
+"""
+def merge_value_counts(counts: dict, other: dict) -> dict:
+    return {column: counts[column].add(other[column], fill_value=0) for column in counts}
+
+"""
+Define a function to calculate an exact median from a frequency table
+Parameters:
+    counts (pd.Series): The number of times each value occurs, indexed by value
+Return:
+- The same median as Series.median over the values, or NaN if there are no values
+"""
+def median_from_counts(counts: pd.Series) -> float:
+    counts = counts.sort_index()
+    total = counts.sum()
+    if total == 0:
+        return np.nan
+    cumulative = counts.cumsum().to_numpy()
+    values = counts.index.to_numpy(dtype=float)
+    lower = values[np.searchsorted(cumulative, (total - 1) // 2 + 1)]
+    upper = values[np.searchsorted(cumulative, total // 2 + 1)]
+    return (lower + upper) / 2
+
+"""
+Define a function to hash the rows of a filled chunk
+Return:
+- A 64-bit hash per row, the same for equal rows whether a number is stored as int or float
+"""
+def row_hashes(df: pd.DataFrame) -> np.ndarray:
+    numbers = {column: float for column in df.select_dtypes("number").columns}
+    return pd.util.hash_pandas_object(df.astype(numbers), index=False).to_numpy()
+
+"""
+Define a function to drop the rows of a chunk that were already seen
+Parameters:
+    df (pd.DataFrame): The filled chunk
+    seen_hashes (np.ndarray): The sorted hashes of the rows already written
+    hashes (np.ndarray): The hashes of the chunk rows, the row hashes if None
+Structure:
+- Drop the duplicates within the chunk
+- Drop the rows whose hash is found in seen_hashes by binary search
+Return:
+- A tuple of (remaining rows, updated sorted hashes)
+"""
+def drop_seen_rows(df: pd.DataFrame, seen_hashes: np.ndarray, hashes: np.ndarray = None) -> tuple[pd.DataFrame, np.ndarray]:
+    hashes = row_hashes(df) if hashes is None else hashes
+    positions = np.minimum(np.searchsorted(seen_hashes, hashes), max(len(seen_hashes) - 1, 0))
+    is_seen = seen_hashes[positions] == hashes if len(seen_hashes) else np.zeros(len(hashes), dtype=bool)
+    keep = ~is_seen & ~pd.Series(hashes).duplicated().to_numpy()
+    return df[keep], np.union1d(seen_hashes, hashes[keep])
+
+"""
+Define a function to hash the rows of a filled chunk for a dedup mode
+Return:
+- The row hashes for the exact mode, the normalized title and category hashes for the key mode
+"""
+def dedup_hashes(df: pd.DataFrame, dedup: str) -> np.ndarray:
+    return key_hashes(df) if dedup == "key" else row_hashes(df)
+
+"""
+Define a function to clean the scraped raw data
+Parameters:
+    file_name (str): The name of the raw CSV file in RAW_DATA_PATH
+    chunksize (int): Clean the file in chunks of this many rows, or None to load it at once
+    columnar (bool): Also save a typed Parquet copy of the cleaned data (needs pyarrow)
+    incremental (bool): Only clean the raw rows appended since the last incremental run
+    rules (RuleSet): The cleaning rules, DEFAULT_RULES if None
+    dedup (str): The duplicates to remove, one of DEDUP_MODES (fuzzy needs the in-memory mode)
+    max_failure_rate (float or dict): The fraction of a column's values that may fail conversion before the cleaning stops,
+        or {column: rate}, the failed rows are written to quarantine_<file_name> next to the cleaned file
+Return:
+- The rows read and written (and the clean state in chunked and incremental mode), or None if the cleaning failed
+"""
+def clean_data(file_name: str, chunksize: int = None, columnar: bool = False, incremental: bool = False,
+               rules: RuleSet = None, dedup: str = "exact", max_failure_rate=DEFAULT_MAX_FAILURE_RATE) -> dict:
+    if dedup not in DEDUP_MODES:
+        raise ValueError(f"Dedup mode must be one of {DEDUP_MODES}")
+    if columnar and not PYARROW_AVAILABLE:
+        print("-- pyarrow is not installed, the Parquet copy is not saved --")
+        columnar = False
     try:
-        file_path = os.path.join(RAW_DATA_PATH, file_name)
-
-        if os.path.isfile(file_path):
-            df = pd.read_csv(file_path)
-
-            # Before Cleaning
-            print("-- Before Cleaning --")
-            print(f"Initial Data Shape: {df.shape}")
-            print("\nData Types:")
-            print('-'*50)
-            print(df.dtypes)
-            print("\nData Summary:")
-            print('-'*50)
-            print(df.describe())
-            print("\nNULL Data:")
-            print('-'*50)
-            print(df.isna().sum())
-            
-            # Price standardization (Remove '£' symbol, convert to float)
-            df['price'] = df['price'].str.replace('£', '', regex=False).str.strip()
-            df['price'] = pd.to_numeric(df['price'], errors='coerce')
-            
-            # Rating conversion: Convert text ratings to numeric (1-5)
-            df['rating'] = df['rating'].map(RATING_MAP)
-            
-            # Handle missing data: Identify and address null values
-            df['title'] = df['title'].fillna('Unknown')
-            df['price'] = df['price'].fillna(df['price'].median())
-            df['rating'] = df['rating'].fillna(df['rating'].median())
-            df['category'] = df['category'].fillna('Unknown')
-            df['availability'] = df['availability'].fillna('Unknown')
-            
-            # Remove duplicates
-            df = df.drop_duplicates(keep='first')
-            
-            # Categorize Price
-            df['price_category'] = pd.cut(
-                df['price'], 
-                bins=(0, 20, 40, float('inf')),
-                right=False,
-                labels=['Budget', 'Mid-range', 'Premium']
-            ).astype(str)
-            
-            # Boolean based on availability
-            df['in_stock'] = df['availability'].str.contains('In Stock', case=False, na=False)
-            
-            # Create the csv saving folder if it is not exist
-            os.makedirs(CLEANED_DATA_PATH, exist_ok=True)
-            output_file_path = os.path.join(CLEANED_DATA_PATH, 'cleaned_'+file_name)
-            df.to_csv(output_file_path, index=False, encoding='utf-8-sig')
-            
-            print(f"\n-- Cleaned Data saved to {output_file_path} --")
-            
-            
-            # After Cleaning
-            print("-- After Cleaning --")
-            print(f"Data Shape: {df.shape}")
-            print("\nData Types:")
-            print('-'*50)
-            print(df.dtypes)
-            print("\nData Summary:")
-            print('-'*50)
-            print(df.describe())
-            print("\nNULL Data:")
-            print('-'*50)
-            print(df.isna().sum())
-        else:
-            raise FileNotFoundError(f"Can't find the {file_name} file at {RAW_DATA_PATH}")
-        
+        return clean_file(file_name, chunksize, columnar, incremental, rules or DEFAULT_RULES, dedup, max_failure_rate)
     except Exception as e:
         print(f"Error: {e}")
-    
+
+"""
+Define a function to clean a raw file with the mode picked by its options
+Same parameters as clean_data, the errors are raised to the caller
+"""
+def clean_file(file_name: str, chunksize: int, columnar: bool, incremental: bool, rules: RuleSet, dedup: str,
+               max_failure_rate=DEFAULT_MAX_FAILURE_RATE) -> dict:
+    if incremental:
+        return clean_data_incremental(file_name, chunksize or DEFAULT_CHUNKSIZE, columnar, rules, dedup, max_failure_rate)
+    if chunksize is not None:
+        return clean_data_chunked(file_name, chunksize, columnar, rules, dedup, max_failure_rate)
+    return clean_data_in_memory(file_name, columnar, rules, dedup, max_failure_rate)
+
+"""
+Define a function to get the quarantine file of a raw file, next to its cleaned file
+"""
+def quarantine_path(file_name: str) -> str:
+    return os.path.join(CLEANED_DATA_PATH, 'quarantine_'+file_name)
+
+"""
+Define a function to print the rows quarantined by the validation, if any
+"""
+def print_validation(validator: RawValidator) -> None:
+    if validator.quarantined:
+        failures = ", ".join(f"{column} {count}" for column, count in validator.failures.items() if count)
+        print(f"-- Validation: {validator.quarantined} of {validator.rows} rows can't be converted ({failures}), "
+              f"saved to {validator.quarantine_path} --")
+
+"""
+Define a function to clean a raw file loaded at once, and save the memory-mappable copy of the cleaned file
+Parameters:
+    file_name (str): The name of the raw CSV file in RAW_DATA_PATH
+    columnar (bool): Also save a typed Parquet copy of the cleaned data
+    rules (RuleSet): The cleaning rules
+    dedup (str): The duplicates to remove
+    max_failure_rate (float or dict): The fraction of a column's values that may fail conversion
+Return:
+- The rows read and written
+"""
+def clean_data_in_memory(file_name: str, columnar: bool = False, rules: RuleSet = DEFAULT_RULES,
+                         dedup: str = "exact", max_failure_rate=DEFAULT_MAX_FAILURE_RATE) -> dict:
+    print("\n-- Cleaning Data ---")
+    file_path = os.path.join(RAW_DATA_PATH, file_name)
+    if not os.path.isfile(file_path):
+        raise FileNotFoundError(f"Can't find the {file_name} file at {RAW_DATA_PATH}")
+    df = pd.read_csv(file_path)
+    rows = len(df)
+
+    # Before Cleaning
+    before = DataProfiler()
+    before.update(df)
+    print("-- Before Cleaning --")
+    print(f"Initial Data Shape: {df.shape}")
+    print("\nData Profile:")
+    print('-'*50)
+    print(profile_table(before.snapshot()))
+
+    # Price standardization and rating conversion, the rows that can't be converted are quarantined
+    # and the cleaning stops here if there are too many of them
+    validator = RawValidator(rules, quarantine_path(file_name), max_failure_rate)
+    df = validator.convert(df)
+    validator.check()
+    print_validation(validator)
+
+    # Handle missing data: Identify and address null values
+    df = rules.fill(df, {column: df[column].median() for column in rules.median_columns})
+
+    # Remove duplicates
+    if dedup == "exact":
+        df = df.drop_duplicates(keep='first')
+    else:
+        clusters = find_duplicate_clusters(df, fuzzy=(dedup == "fuzzy"))
+        report = duplicate_report(df, clusters)
+        print(f"\n-- Duplicate clusters ({dedup}): {len(report)} clusters, {len(df) - len(np.unique(clusters))} rows removed --")
+        print(report.head(10).to_string())
+        df = df[clusters == np.arange(len(df))]
+
+    # Categorize Price and boolean based on availability
+    df = rules.derive(df)
+
+    # Create the csv saving folder if it is not exist
+    os.makedirs(CLEANED_DATA_PATH, exist_ok=True)
+    output_file_path = os.path.join(CLEANED_DATA_PATH, 'cleaned_'+file_name)
+    df.to_csv(output_file_path, index=False, encoding='utf-8-sig')
+
+    print(f"\n-- Cleaned Data saved to {output_file_path} --")
+
+    # Compact column types (categoricals, int8 rating)
+    memory_before = memory_per_row(df)
+    df = apply_schema(df)
+    print(f"-- Memory per row: {memory_before:.1f} bytes before the schema, {memory_per_row(df):.1f} bytes after --")
+
+    if columnar:
+        with ColumnarWriter(columnar_path(output_file_path)) as writer:
+            writer.write(df)
+        print(f"-- Parquet copy saved to {columnar_path(output_file_path)} --")
+
+    # The memory-mappable copy the analysis stages map, read back from the saved file so it is exactly what they would load
+    write_mapped(load_cleaned(output_file_path), output_file_path)
+    print(f"-- Memory-mapped copy saved to {mapped_path(output_file_path)} --")
+
+    # After Cleaning
+    after = DataProfiler()
+    after.update(df)
+    print("-- After Cleaning --")
+    print(f"Data Shape: {df.shape}")
+    print("\nData Profile:")
+    print('-'*50)
+    print(profile_table(after.snapshot()))
+    save_profiles(output_file_path, before, after)
+
+    return {"rows": rows, "written": len(df)}
+
+"""
+Define a function to save the profiles of a clean
+Parameters:
+    output_file_path (str): The path of the cleaned CSV file
+    before (DataProfiler): The profile of the raw data
+    after (DataProfiler): The profile of the cleaned data
+Structure:
+- Compare the cleaned data profile with the one saved by the previous clean, and print the regressions
+    (lost rows or columns, more null values, a column that changed kind, a shifted mean)
+- Save the raw and cleaned data profiles and the comparison to the .profile.json file next to the cleaned file
+"""
+def save_profiles(output_file_path: str, before: DataProfiler, after: DataProfiler) -> None:
+    profile_path = os.path.splitext(output_file_path)[0] + ".profile.json"
+    previous = load_profile(profile_path)
+    document = {"before": before.snapshot(), "after": after.snapshot()}
+    if previous is not None:
+        document["since_last_clean"] = diff_profiles(previous["after"], document["after"])
+        regressions = document["since_last_clean"]["regressions"]
+        if regressions:
+            print("\n-- Data quality regressions since the last clean --")
+            for regression in regressions:
+                print(regression)
+    write_json(profile_path, document)
+    print(f"-- Data profile saved to {profile_path} --")
+
+"""
+Define a function to clean a raw file that does not fit in memory
+Parameters:
+    file_name (str): The name of the raw CSV file in RAW_DATA_PATH
+    chunksize (int): The number of rows held in memory at a time
+    columnar (bool): Also save a typed Parquet copy, one row group per chunk
+    rules (RuleSet): The cleaning rules
+    dedup (str): The duplicates to remove, exact or key
+    max_failure_rate (float or dict): The fraction of a column's values that may fail conversion
+Structure:
+- First pass: read the file in chunks, profile them (row and null counts included), validate and convert them
+    (the rows that can't be converted are quarantined), and build the frequency tables
+    of the converted median filled columns for the exact medians
+- Stop before the second pass if too many values can't be converted
+- Second pass: convert, fill and derive each chunk without its quarantined rows, drop the rows already seen
+    (kept as a sorted array of 64-bit row hashes instead of the rows), and append the chunk to the output file
+- Both passes profile their chunks as they go, the profiles are saved next to the output file
+The output is the same as the in-memory clean_data.
+Return:
+- The clean state used by the incremental mode
+"""
+def clean_data_chunked(file_name: str, chunksize: int, columnar: bool = False, rules: RuleSet = DEFAULT_RULES,
+                       dedup: str = "exact", max_failure_rate=DEFAULT_MAX_FAILURE_RATE) -> dict:
+    print("\n-- Cleaning Data (chunked) ---")
+    if chunksize <= 0:
+        raise ValueError("Chunk size must be positive value")
+    if dedup == "fuzzy":
+        raise ValueError("Fuzzy dedup compares every title with the others, it needs the in-memory mode")
+
+    file_path = os.path.join(RAW_DATA_PATH, file_name)
+    if not os.path.isfile(file_path):
+        raise FileNotFoundError(f"Can't find the {file_name} file at {RAW_DATA_PATH}")
+    watermark = complete_lines_end(file_path)
+
+    # First pass: global statistics
+    # Every raw column is text, a chunk where a column is only null values must not be read as float
+    # The profile of the raw chunks also gives the row and null counts
+    # The null counts of the median filled columns are taken after the quarantine, as in memory
+    before = DataProfiler()
+    validator = RawValidator(rules, quarantine_path(file_name), max_failure_rate)
+    value_counts = {column: pd.Series(dtype=float) for column in rules.median_columns}
+    null_counts = pd.Series(0, index=rules.median_columns)
+    for chunk in pd.read_csv(file_path, chunksize=chunksize, dtype=str):
+        before.update(chunk)
+        chunk = validator.convert(chunk)
+        null_counts = null_counts.add(chunk[rules.median_columns].isna().sum(), fill_value=0).astype(int)
+        value_counts = merge_value_counts(value_counts, median_value_counts(chunk, rules))
+    rows = before.rows
+    columns = list(before.columns)
+    validator.check()
+
+    print("-- Before Cleaning --")
+    print(f"Initial Data Shape: {(rows, len(columns))}")
+    print("\nData Profile:")
+    print('-'*50)
+    print(profile_table(before.snapshot()))
+    print_validation(validator)
+
+    medians = {column: median_from_counts(counts) for column, counts in value_counts.items()}
+    # A numeric column with null values becomes float in memory, keep the same type in every chunk
+    float_columns = {column: float for column in rules.median_columns if null_counts[column] > 0}
+    # The rating stays a whole number unless the median fill is a half star
+    integer_rating = 'rating' not in float_columns or float(medians['rating']).is_integer()
+
+    # Second pass: clean and write chunk by chunk
+    os.makedirs(CLEANED_DATA_PATH, exist_ok=True)
+    output_file_path = os.path.join(CLEANED_DATA_PATH, 'cleaned_'+file_name)
+    seen_hashes = np.array([], dtype=np.uint64) # Sorted hashes of the rows already written
+    written = 0
+    memory_before = memory_after = 0
+    after = DataProfiler()
+    writer = ColumnarWriter(columnar_path(output_file_path)) if columnar else nullcontext()
+    with open(output_file_path, mode="w", newline="", encoding="utf-8-sig") as file, writer:
+        for chunk_index, chunk in enumerate(pd.read_csv(file_path, chunksize=chunksize, dtype=str)):
+            chunk = rules.fill(validator.convert(chunk, record=False), medians).astype(float_columns)
+
+            # Remove duplicates within the chunk and against the previous chunks
+            chunk, seen_hashes = drop_seen_rows(chunk, seen_hashes, dedup_hashes(chunk, dedup))
+
+            chunk = rules.derive(chunk)
+            chunk.to_csv(file, index=False, header=(chunk_index == 0))
+            written += len(chunk)
+
+            # Compact column types (categoricals, int8 rating)
+            memory_before += memory_per_row(chunk) * len(chunk)
+            chunk = apply_schema(chunk, integer_rating=integer_rating)
+            memory_after += memory_per_row(chunk) * len(chunk)
+            after.update(chunk)
+            if columnar:
+                writer.write(chunk)
+
+    print(f"\n-- Cleaned Data saved to {output_file_path} --")
+    if columnar:
+        print(f"-- Parquet copy saved to {columnar_path(output_file_path)} --")
+    print("-- After Cleaning --")
+    print(f"Data Shape: {(written, len(chunk.columns) if written else len(columns))}")
+    if written:
+        print(f"Memory per row: {memory_before / written:.1f} bytes before the schema, {memory_after / written:.1f} bytes after")
+    print("\nData Profile:")
+    print('-'*50)
+    print(profile_table(after.snapshot()))
+    save_profiles(output_file_path, before, after)
+
+    return {
+        "watermark": watermark,
+        "watermark_hash": watermark_hash(file_path, watermark),
+        "columns": columns,
+        "rows": rows,
+        "written": written,
+        "null_counts": null_counts.astype(int).to_dict(),
+        "value_counts": value_counts,
+        "rules": rules.fingerprint(),
+        "dedup": dedup,
+        "seen_hashes": seen_hashes,
+    }
+
+
+"""
+Define a function to find the end of the last complete line of a raw file
+Parameters:
+    file_path (str): The path of the raw CSV file
+Return:
+- The byte offset after the last newline, a line being written by the scraper is left for the next run
+"""
+def complete_lines_end(file_path: str) -> int:
+    with open(file_path, mode="rb") as file:
+        end = file.seek(0, os.SEEK_END)
+        while end > 0:
+            start = max(0, end - WATERMARK_WINDOW)
+            file.seek(start)
+            newline = file.read(end - start).rfind(b"\n")
+            if newline >= 0:
+                return start + newline + 1
+            end = start
+    return 0
+
+"""
+Define a function to hash the bytes just before the watermark
+Return:
+- The SHA-256 hex digest of the last WATERMARK_WINDOW bytes before the watermark
+"""
+def watermark_hash(file_path: str, watermark: int) -> str:
+    with open(file_path, mode="rb") as file:
+        file.seek(max(0, watermark - WATERMARK_WINDOW))
+        return hashlib.sha256(file.read(watermark - file.tell())).hexdigest()
+
+"""
+Define a function to save the clean state of the incremental mode
+Parameters:
+    output_file_path (str): The path of the cleaned CSV file
+    state (dict): The watermark, counts, value counts, rules fingerprint, dedup mode and row hashes of the cleaned data
+Structure:
+- Save the row hashes as a .hashes.npy file
+- Save everything else as a .state.json file, written last so a failed save is never trusted
+"""
+def save_clean_state(output_file_path: str, state: dict) -> None:
+    base_path = os.path.splitext(output_file_path)[0]
+    np.save(base_path + ".hashes.npy", state["seen_hashes"])
+
+    document = {key: value for key, value in state.items() if key != "seen_hashes"}
+    document["value_counts"] = {
+        column: [[value, int(count)] for value, count in counts.items()]
+        for column, counts in state["value_counts"].items()
+    }
+    temp_path = base_path + ".state.json.tmp"
+    with open(temp_path, mode="w", encoding="utf-8") as file:
+        json.dump(document, file)
+    os.replace(temp_path, base_path + ".state.json")
+
+"""
+Define a function to load the clean state of the incremental mode
+Return:
+- The state saved by save_clean_state, or None if there is no saved state
+"""
+def load_clean_state(output_file_path: str) -> dict:
+    base_path = os.path.splitext(output_file_path)[0]
+    if not (os.path.isfile(base_path + ".state.json") and os.path.isfile(base_path + ".hashes.npy")
+            and os.path.isfile(output_file_path)):
+        return None
+
+    with open(base_path + ".state.json", encoding="utf-8") as file:
+        state = json.load(file)
+    state["value_counts"] = {
+        column: pd.Series([count for _, count in pairs], index=[value for value, _ in pairs], dtype=float)
+        for column, pairs in state.get("value_counts", {}).items()
+    }
+    state["seen_hashes"] = np.load(base_path + ".hashes.npy")
+    return state
+
+"""
+Define a function to clean the whole raw file and save the clean state for the next incremental run
+"""
+def clean_full(file_name: str, chunksize: int, columnar: bool, rules: RuleSet, dedup: str, output_file_path: str,
+               max_failure_rate=DEFAULT_MAX_FAILURE_RATE) -> dict:
+    state = clean_data_chunked(file_name, chunksize, columnar, rules, dedup, max_failure_rate)
+    state["output_size"] = os.path.getsize(output_file_path)
+    save_clean_state(output_file_path, state)
+    return state
+
+"""
+Define a function to clean only the raw rows appended since the last run
+Parameters:
+    file_name (str): The name of the raw CSV file in RAW_DATA_PATH
+    chunksize (int): The number of rows per chunk when the whole file has to be cleaned
+    columnar (bool): Also save a typed Parquet copy when the whole file is cleaned
+    rules (RuleSet): The cleaning rules
+    dedup (str): The duplicates to remove, exact or key
+    max_failure_rate (float or dict): The fraction of a column's values that may fail conversion, checked on the new rows
+Structure:
+- Load the saved state: the watermark (byte offset of the cleaned raw rows) and a hash of the bytes before it,
+    the null counts and value counts of the median filled columns, the rules fingerprint and dedup mode,
+    the dedup hashes of the cleaned rows and the cleaned file size
+- Clean the whole file with clean_data_chunked if there is no state, the raw or cleaned file was rewritten,
+    or the rules or dedup mode changed
+- Read only the rows after the watermark, validate them (the quarantined rows are added to the quarantine file),
+    and update the value counts and the fill medians
+- Clean the whole file if the new medians would change rows that were already filled,
+    or the first null value turns a median filled column into float
+- Otherwise fill and derive the new rows, drop the ones whose hash was already cleaned,
+    and append the rest to the cleaned CSV file
+The output is the same as cleaning the whole file again.
+Return:
+- The updated clean state
+"""
+def clean_data_incremental(file_name: str, chunksize: int = DEFAULT_CHUNKSIZE, columnar: bool = False,
+                           rules: RuleSet = DEFAULT_RULES, dedup: str = "exact",
+                           max_failure_rate=DEFAULT_MAX_FAILURE_RATE) -> dict:
+    print("\n-- Cleaning Data (incremental) ---")
+    if dedup == "fuzzy":
+        raise ValueError("Fuzzy dedup compares every title with the others, it needs the in-memory mode")
+    file_path = os.path.join(RAW_DATA_PATH, file_name)
+    if not os.path.isfile(file_path):
+        raise FileNotFoundError(f"Can't find the {file_name} file at {RAW_DATA_PATH}")
+    output_file_path = os.path.join(CLEANED_DATA_PATH, 'cleaned_'+file_name)
+
+    state = load_clean_state(output_file_path)
+    if (state is None or os.path.getsize(file_path) < state["watermark"]
+            or watermark_hash(file_path, state["watermark"]) != state["watermark_hash"]
+            or os.path.getsize(output_file_path) != state["output_size"]
+            or state.get("rules") != rules.fingerprint()
+            or state.get("dedup", "exact") != dedup):
+        print("-- No clean state for this raw file, cleaned file, rules and dedup mode, cleaning the whole file --")
+        return clean_full(file_name, chunksize, columnar, rules, dedup, output_file_path, max_failure_rate)
+
+    # Only the complete lines after the watermark
+    end = complete_lines_end(file_path)
+    if end <= state["watermark"]:
+        print("-- No new raw rows --")
+        return state
+    with open(file_path, mode="rb") as file:
+        file.seek(state["watermark"])
+        delta = file.read(end - state["watermark"])
+    df = pd.read_csv(io.BytesIO(delta), header=None, names=state["columns"], dtype=str)
+    new_rows = len(df)
+
+    # Update the aggregates with the new rows only
+    validator = RawValidator(rules, quarantine_path(file_name), max_failure_rate, append=True)
+    df = validator.convert(df)
+    validator.check()
+    print_validation(validator)
+    null_counts = pd.Series(state["null_counts"]).add(df[rules.median_columns].isna().sum(), fill_value=0).astype(int)
+    value_counts = merge_value_counts(state["value_counts"], median_value_counts(df, rules))
+    medians = {column: median_from_counts(counts) for column, counts in value_counts.items()}
+
+    # Rows already filled with the old medians would be filled differently now,
+    # and the first null value of a column changes its type in the rows already written
+    for column in rules.median_columns:
+        old_median = median_from_counts(state["value_counts"][column])
+        old_nulls = state["null_counts"][column]
+        if (old_nulls > 0 and medians[column] != old_median) or (old_nulls == 0 and null_counts[column] > 0):
+            print(f"-- The fill median or the type of {column} changed, cleaning the whole file --")
+            return clean_full(file_name, chunksize, columnar, rules, dedup, output_file_path, max_failure_rate)
+
+    float_columns = {column: float for column in rules.median_columns if null_counts[column] > 0}
+    df = rules.fill(df, medians).astype(float_columns)
+    df, seen_hashes = drop_seen_rows(df, state["seen_hashes"], dedup_hashes(df, dedup))
+    df = rules.derive(df)
+    with open(output_file_path, mode="a", newline="", encoding="utf-8") as file:
+        df.to_csv(file, index=False, header=False)
+
+    state = {
+        **state,
+        "watermark": end,
+        "watermark_hash": watermark_hash(file_path, end),
+        "rows": state["rows"] + new_rows,
+        "written": state["written"] + len(df),
+        "null_counts": null_counts.to_dict(),
+        "value_counts": value_counts,
+        "seen_hashes": seen_hashes,
+        "output_size": os.path.getsize(output_file_path),
+    }
+    save_clean_state(output_file_path, state)
+
+    print(f"-- Cleaned {new_rows} new raw rows, {len(df)} appended to {output_file_path} --")
+    if columnar:
+        print("-- The Parquet copy is not updated in incremental mode, the readers use the CSV file until the next full clean --")
+    return state
+
+
+"""
+Define a function to find the raw CSV files to clean in a batch
+Return:
+- The names of the CSV files in RAW_DATA_PATH, sorted
+"""
+def discover_raw_files() -> list:
+    if not os.path.isdir(RAW_DATA_PATH):
+        return []
+    return sorted(name for name in os.listdir(RAW_DATA_PATH)
+                  if name.endswith(".csv") and os.path.isfile(os.path.join(RAW_DATA_PATH, name)))
+
+"""
+Define a function to point a batch worker process at the data folders of the batch
+"""
+def set_data_paths(raw_data_path: str, cleaned_data_path: str) -> None:
+    global RAW_DATA_PATH, CLEANED_DATA_PATH
+    RAW_DATA_PATH = raw_data_path
+    CLEANED_DATA_PATH = cleaned_data_path
+
+"""
+Define a function to clean one file of a batch
+Parameters:
+    file_name (str): The name of the raw CSV file in RAW_DATA_PATH
+    options (dict): The clean_file options shared by the batch (chunksize, columnar, incremental, rules, dedup,
+        max_failure_rate)
+Structure:
+- Clean the file with its console output captured, so the outputs of parallel workers are not interleaved
+- Catch any error, so one bad file does not stop the batch
+Return:
+- A dictionary with the file name, the status (ok or failed), the rows read and written, the seconds taken,
+    and the error message
+"""
+def clean_batch_file(file_name: str, options: dict) -> dict:
+    result = {"file": file_name, "status": "ok", "rows": 0, "written": 0, "seconds": 0.0, "error": ""}
+    start = time.perf_counter()
+    try:
+        with redirect_stdout(io.StringIO()):
+            cleaned = clean_file(file_name, **options)
+        result["rows"], result["written"] = cleaned["rows"], cleaned["written"]
+    except Exception as e:
+        result["status"], result["error"] = "failed", f"{type(e).__name__}: {e}"
+    result["seconds"] = round(time.perf_counter() - start, 3)
+    return result
+
+"""
+Define a function to merge the cleaned files of a batch into one file
+Parameters:
+    file_names (list): The names of the raw files whose cleaned files are merged, in order
+    merged_name (str): The name of the merged file, saved as cleaned_<merged_name> in CLEANED_DATA_PATH
+    dedup (str): The duplicates removed across files, exact or key (fuzzy uses key)
+    rules (RuleSet): The cleaning rules, their converted columns are compared as numbers
+    chunksize (int): The number of rows held in memory at a time
+Structure:
+- Read the cleaned files in chunks as text, so every value is written back exactly as it was cleaned
+- Drop the rows already written from a previous file (the same sorted hash index as the chunked mode),
+    the converted columns are compared by value (a rating is 1.0 in a file with filled ratings and 1 in another)
+- Append the rest to the merged file
+Return:
+- The number of rows written
+"""
+def merge_cleaned(file_names: list, merged_name: str, dedup: str = "exact", rules: RuleSet = DEFAULT_RULES,
+                  chunksize: int = DEFAULT_CHUNKSIZE) -> int:
+    output_file_path = os.path.join(CLEANED_DATA_PATH, 'cleaned_'+merged_name)
+    dedup = "exact" if dedup == "exact" else "key"
+    seen_hashes = np.array([], dtype=np.uint64)
+    columns = None
+    written = 0
+    temp_path = output_file_path + ".tmp"
+    with open(temp_path, mode="w", newline="", encoding="utf-8-sig") as file:
+        for file_name in file_names:
+            cleaned_path = os.path.join(CLEANED_DATA_PATH, 'cleaned_'+file_name)
+            for chunk in pd.read_csv(cleaned_path, chunksize=chunksize, dtype=str, keep_default_na=False,
+                                     encoding="utf-8-sig"):
+                header = columns is None
+                if header:
+                    columns = chunk.columns.tolist()
+                elif chunk.columns.tolist() != columns:
+                    raise ValueError(f"The columns of cleaned_{file_name} do not match the other cleaned files")
+                values = chunk.assign(**{column: pd.to_numeric(chunk[column], errors="coerce")
+                                         for column in rules.converted_columns if column in columns})
+                chunk, seen_hashes = drop_seen_rows(chunk, seen_hashes, dedup_hashes(values, dedup))
+                chunk.to_csv(file, index=False, header=header)
+                written += len(chunk)
+    os.replace(temp_path, output_file_path)
+    return written
+
+"""
+Define a function to clean every raw file of RAW_DATA_PATH in parallel
+Parameters:
+    file_names (list): The raw files to clean, all the CSV files of RAW_DATA_PATH if None
+    workers (int): The number of worker processes, one per file up to the number of CPUs if None,
+        1 cleans the files one by one in this process
+    chunksize, columnar, incremental, rules, dedup, max_failure_rate: The clean_data options used for every file
+    merged_name (str): Merge the cleaned files into cleaned_<merged_name>, or None to keep them separate
+Structure:
+- Clean the files in a process pool, each worker cleans one file at a time and reports its status and timing
+- A failed file (bad data, missing column, crashed worker) is reported and skipped, the other files go on
+- Print the batch summary, and merge the files that were cleaned
+Return:
+- The batch summary as a DataFrame, one row per file
+"""
+def clean_batch(file_names: list = None,
+                workers: int = None,
+                chunksize: int = None,
+                columnar: bool = False,
+                incremental: bool = False,
+                rules: RuleSet = None,
+                dedup: str = "exact",
+                max_failure_rate=DEFAULT_MAX_FAILURE_RATE,
+                merged_name: str = MERGED_FILE_NAME
+                ) -> pd.DataFrame:
+    if dedup not in DEDUP_MODES:
+        raise ValueError(f"Dedup mode must be one of {DEDUP_MODES}")
+    if workers is not None and workers <= 0:
+        raise ValueError("Workers must be positive value")
+    if columnar and not PYARROW_AVAILABLE:
+        print("-- pyarrow is not installed, the Parquet copies are not saved --")
+        columnar = False
+
+    if file_names is None:
+        file_names = discover_raw_files()
+    print(f"\n-- Cleaning {len(file_names)} raw files (batch) ---")
+    options = {"chunksize": chunksize, "columnar": columnar, "incremental": incremental,
+               "rules": rules or DEFAULT_RULES, "dedup": dedup, "max_failure_rate": max_failure_rate}
+    os.makedirs(CLEANED_DATA_PATH, exist_ok=True)
+
+    workers = workers or max(1, min(len(file_names), os.cpu_count() or 1))
+    results = []
+    if workers == 1:
+        for file_name in file_names:
+            results.append(clean_batch_file(file_name, options))
+            print(f"{file_name}: {results[-1]['status']} in {results[-1]['seconds']:.2f}s")
+    else:
+        with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"),
+                                 initializer=set_data_paths, initargs=(RAW_DATA_PATH, CLEANED_DATA_PATH)) as executor:
+            futures = {executor.submit(clean_batch_file, file_name, options): file_name for file_name in file_names}
+            for future in as_completed(futures):
+                try:
+                    result = future.result()
+                except Exception as e:
+                    # The worker process died, the error of the file itself is caught in clean_batch_file
+                    result = {"file": futures[future], "status": "failed", "rows": 0, "written": 0,
+                              "seconds": 0.0, "error": f"{type(e).__name__}: {e}"}
+                results.append(result)
+                print(f"{result['file']}: {result['status']} in {result['seconds']:.2f}s")
+
+    summary = pd.DataFrame(results, columns=["file", "status", "rows", "written", "seconds", "error"])
+    summary = summary.sort_values("file", kind="stable").reset_index(drop=True)
+    print("\n-- Batch summary --")
+    print(summary.to_string(index=False))
+
+    cleaned = summary.loc[summary["status"] == "ok", "file"].tolist()
+    if merged_name and cleaned:
+        try:
+            merged = merge_cleaned(cleaned, merged_name, dedup, options["rules"])
+            print(f"\n-- {len(cleaned)} cleaned files merged into {os.path.join(CLEANED_DATA_PATH, 'cleaned_'+merged_name)}, {merged} rows --")
+        except Exception as e:
+            print(f"Error: {e}")
+    return summary
+
 
 if __name__ == "__main__":
-    clean_data('books_data_500.csv')
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Clean the scraped raw data")
+    parser.add_argument("--chunksize", type=int, default=None, help="Clean the file in chunks of this many rows (for files larger than memory)")
+    parser.add_argument("--parquet", action="store_true", help="Also save a typed Parquet copy of the cleaned data (needs pyarrow)")
+    parser.add_argument("--incremental", action="store_true", help="Only clean the raw rows appended since the last incremental run")
+    parser.add_argument("--dedup", choices=DEDUP_MODES, default="exact",
+                        help="Remove identical rows (exact), rows with the same normalized title and category (key), "
+                             "or also similar titles with MinHash/LSH (fuzzy, in-memory only)")
+    parser.add_argument("--batch", action="store_true", help="Clean every raw CSV file in parallel and merge the cleaned files")
+    parser.add_argument("--workers", type=int, default=None, help="Worker processes of the batch mode (default: one per file, up to the number of CPUs)")
+    parser.add_argument("--max-failure-rate", type=float, default=DEFAULT_MAX_FAILURE_RATE,
+                        help="Stop the cleaning when more than this fraction of a column can't be converted "
+                             "(the failed rows are saved to quarantine_<file> next to the cleaned file)")
+    args = parser.parse_args()
+
+    if args.batch:
+        clean_batch(workers=args.workers, chunksize=args.chunksize, columnar=args.parquet, incremental=args.incremental,
+                    dedup=args.dedup, max_failure_rate=args.max_failure_rate)
+    else:
+        clean_data('books_data_500.csv', chunksize=args.chunksize, columnar=args.parquet, incremental=args.incremental,
+                   dedup=args.dedup, max_failure_rate=args.max_failure_rate)
@@ -4,19 +4,24 @@ This module performs predictive analysis using linear regression.
 It predicts book prices based on features like rating and category.
 The model is evaluated using R² score and Mean Absolute Error (MAE).
 Feature importance is also analyzed to understand which features influence price the most.
+The cleaned file is loaded through the dataset cache shared with the other stages,
+and predict_frame takes an already loaded DataFrame.
 """
 import os
 import pandas as pd
 from sklearn.model_selection import train_test_split
 from sklearn.linear_model import LinearRegression
 from sklearn.metrics import r2_score, mean_absolute_error
+from question2_data_analysis.dataset_io import DATASET_CACHE
 
 CLEANED_DATA_PATH = "question2_data_analysis/data/cleaned/" # Path to save the cleaned data
+PREDICTION_COLUMNS = ["rating", "category", "price"] # The only columns the model reads
 
 def predict_data(file_name: str) -> None:
     file_path = os.path.join(CLEANED_DATA_PATH, file_name)
-    df = pd.read_csv(file_path)
-    
+    predict_frame(DATASET_CACHE.load(file_path, columns=PREDICTION_COLUMNS, mapped=True))
+
+def predict_frame(df: pd.DataFrame) -> None:
     # Predictive Analysis (Linear Regression)
 
     # Define Features and Target
@@ -24,6 +29,8 @@ def predict_data(file_name: str) -> None:
     y = df["price"]
 
     # One-hot encode category
+    # Sorted categories, so the dropped baseline category is the same for the CSV and the Parquet data
+    X["category"] = pd.Categorical(X["category"], categories=sorted(X["category"].unique()))
     X = pd.get_dummies(X, columns=["category"], drop_first=True)
 
     # Train-Test Split
@@ -0,0 +1,314 @@
+"""
+data_profiler.py
+This module defines the DataProfiler class, which profiles every column of a dataset in a single pass:
+    all columns: non-null count, null count and fraction, cardinality (distinct values)
+    numeric and boolean columns: min, max, mean, standard deviation and quantiles
+    text columns: min, max and mean text length
+The profiler is updated chunk by chunk, so a file larger than memory is profiled while it is read,
+and two profilers of different chunks or files can be merged.
+Each statistic is kept in a fixed size summary:
+    mean and variance: Welford/Chan running moments
+    quantiles: a uniform sample of at most sample_size values (the values with the smallest random priorities),
+        exact while the column has fewer values than the sample size
+    cardinality: a K minimum values sketch of the value hashes, exact while there are fewer distinct values than the sketch size
+The profile is a JSON document, and diff_profiles compares two profiles to detect data quality regressions.
+
+functions:
+- __init__: Initializes an empty profile.
+- update: Adds a chunk of rows to the profile.
+- merge: Adds the rows of another profiler to the profile.
+- snapshot: Returns the profile as a dictionary.
+- to_json: Writes the profile to a JSON file.
+- load_profile: Reads a profile JSON file.
+- profile_table: Describes a profile as a DataFrame, one row per column.
+- diff_profiles: Compares two profiles and lists the data quality regressions.
+"""
+import json
+import os
+import numpy as np
+import pandas as pd
+
+SAMPLE_SIZE = 10000 # Values kept per numeric column for the quantiles
+SKETCH_SIZE = 4096 # Smallest value hashes kept per column for the cardinality
+QUANTILES = [0.05, 0.25, 0.5, 0.75, 0.95]
+NULL_TOLERANCE = 0.01 # Increase of a null fraction reported as a regression
+ROW_TOLERANCE = 0.1 # Fraction of rows lost reported as a regression
+MEAN_TOLERANCE = 0.1 # Relative change of a mean reported as a regression
+
+class DataProfiler:
+    def __init__(self, sample_size: int = SAMPLE_SIZE, sketch_size: int = SKETCH_SIZE, seed: int = 0) -> None:
+        # Validate initial data
+        if sample_size <= 0:
+            raise ValueError("Sample size must be positive value")
+        if sketch_size <= 1:
+            raise ValueError("Sketch size must be greater than 1")
+
+        self.sample_size = sample_size
+        self.sketch_size = sketch_size
+        self.rows = 0
+        self.columns: dict[str, dict] = {} # {column: running summary}
+        self._generator = np.random.default_rng(seed)
+
+    """
+    Adds a chunk of rows to the profile, with one vectorized pass over each column.
+    Parameters:
+        df (pd.DataFrame): The chunk, its columns keep the kind (numeric, boolean or text) of the first chunk
+    """
+    def update(self, df: pd.DataFrame) -> None:
+        for column in df.columns:
+            series = df[column]
+            kind = column_kind(series)
+            summary = self.columns.setdefault(column, self._empty_summary(kind, str(series.dtype)))
+            if summary["kind"] != kind:
+                raise ValueError(f"Column {column} changed from {summary['kind']} to {kind} between chunks")
+
+            values = series.dropna()
+            summary["count"] += len(values)
+            summary["nulls"] += len(series) - len(values)
+            if kind == "text":
+                values = values.astype(str)
+                self._add_moments(summary, values.str.len().to_numpy(dtype=float))
+            else:
+                values = values.to_numpy(dtype=float)
+                self._add_moments(summary, values)
+                self._add_sample(summary, values, self._generator.random(len(values)))
+            self._add_hashes(summary, pd.util.hash_pandas_object(pd.Series(values), index=False).to_numpy())
+        self.rows += len(df)
+
+    """
+    Adds the rows of another profiler to the profile, as if its chunks had been added with update.
+    """
+    def merge(self, other: "DataProfiler") -> None:
+        for column, other_summary in other.columns.items():
+            summary = self.columns.setdefault(column, self._empty_summary(other_summary["kind"], other_summary["dtype"]))
+            if summary["kind"] != other_summary["kind"]:
+                raise ValueError(f"Column {column} is {summary['kind']} in one profile and {other_summary['kind']} in the other")
+            summary["count"] += other_summary["count"]
+            summary["nulls"] += other_summary["nulls"]
+            self._merge_moments(summary, other_summary["moments"], other_summary["min"], other_summary["max"])
+            if summary["kind"] != "text":
+                self._add_sample(summary, other_summary["sample"], other_summary["priorities"])
+            self._add_hashes(summary, other_summary["hashes"])
+        self.rows += other.rows
+
+    """
+    Returns the profile as a dictionary.
+    structure:
+    - The row count, then for every column its kind and dtype, the counts, the cardinality estimate,
+        and the value (numeric, boolean) or text length (text) statistics
+    - The statistics of a column without values are None
+    returns:
+    - A dictionary that can be written as JSON
+    """
+    def snapshot(self) -> dict:
+        columns = {}
+        for column, summary in self.columns.items():
+            rows = summary["count"] + summary["nulls"]
+            distinct = len(summary["hashes"])
+            if distinct < self.sketch_size:
+                cardinality = distinct
+            else:
+                # The k-th smallest of the uniform 64-bit hashes of n distinct values is about k / n of the range
+                cardinality = round((self.sketch_size - 1) / (float(summary["hashes"][-1]) / 2.0**64))
+            n, mean, m2 = summary["moments"]
+            statistics = {
+                "min": json_number(summary["min"]) if n else None,
+                "max": json_number(summary["max"]) if n else None,
+                "mean": json_number(mean) if n else None,
+            }
+            profile = {
+                "kind": summary["kind"],
+                "dtype": summary["dtype"],
+                "count": int(summary["count"]),
+                "nulls": int(summary["nulls"]),
+                "null_fraction": summary["nulls"] / rows if rows else None,
+                "cardinality": int(cardinality),
+                "cardinality_exact": distinct < self.sketch_size,
+            }
+            if summary["kind"] == "text":
+                profile["length"] = statistics
+            else:
+                profile.update(statistics)
+                profile["std"] = json_number(np.sqrt(m2 / (n - 1))) if n > 1 else None
+                values = np.quantile(summary["sample"], QUANTILES) if n else [np.nan] * len(QUANTILES)
+                profile["quantiles"] = {f"{quantile:.0%}": json_number(value) for quantile, value in zip(QUANTILES, values)}
+                profile["quantiles_exact"] = n <= self.sample_size
+            columns[column] = profile
+        return {"rows": self.rows, "columns": columns}
+
+    """
+    Writes the profile to a JSON file through a temporary file, so readers never see a half written file.
+    """
+    def to_json(self, file_path: str) -> None:
+        write_json(file_path, self.snapshot())
+
+    def _empty_summary(self, kind: str, dtype: str) -> dict:
+        return {
+            "kind": kind,
+            "dtype": dtype,
+            "count": 0,
+            "nulls": 0,
+            "moments": (0, 0.0, 0.0), # (count, mean, sum of squared differences from the mean)
+            "min": np.inf,
+            "max": -np.inf,
+            "hashes": np.array([], dtype=np.uint64), # The smallest distinct value hashes, sorted
+            "sample": np.array([]),
+            "priorities": np.array([]),
+        }
+
+    def _add_moments(self, summary: dict, values: np.ndarray) -> None:
+        if len(values):
+            mean = values.mean()
+            moments = (len(values), mean, ((values - mean) ** 2).sum())
+            self._merge_moments(summary, moments, values.min(), values.max())
+
+    """
+    Merges the running moments of a column with those of another set of values (Chan's parallel update).
+    """
+    def _merge_moments(self, summary: dict, moments: tuple, minimum: float, maximum: float) -> None:
+        n_a, mean_a, m2_a = summary["moments"]
+        n_b, mean_b, m2_b = moments
+        if n_b == 0:
+            return
+        n = n_a + n_b
+        delta = mean_b - mean_a
+        summary["moments"] = (n, mean_a + delta * n_b / n, m2_a + m2_b + delta ** 2 * n_a * n_b / n)
+        summary["min"] = min(summary["min"], minimum)
+        summary["max"] = max(summary["max"], maximum)
+
+    """
+    Keeps the values with the smallest random priorities, a uniform sample of every value added so far.
+    """
+    def _add_sample(self, summary: dict, values: np.ndarray, priorities: np.ndarray) -> None:
+        values = np.concatenate([summary["sample"], values])
+        priorities = np.concatenate([summary["priorities"], priorities])
+        if len(values) > self.sample_size:
+            keep = np.argpartition(priorities, self.sample_size - 1)[:self.sample_size]
+            values, priorities = values[keep], priorities[keep]
+        summary["sample"], summary["priorities"] = values, priorities
+
+    def _add_hashes(self, summary: dict, hashes: np.ndarray) -> None:
+        summary["hashes"] = np.union1d(summary["hashes"], hashes)[:self.sketch_size]
+
+"""
+Define a function to find the kind of a column
+Return:
+- "boolean", "numeric" or "text" (any other type, including categoricals)
+"""
+def column_kind(series: pd.Series) -> str:
+    if pd.api.types.is_bool_dtype(series.dtype):
+        return "boolean"
+    if pd.api.types.is_numeric_dtype(series.dtype):
+        return "numeric"
+    return "text"
+
+"""
+Define a function to convert a number to a JSON value
+Return:
+- A Python float rounded to 12 significant digits (so the chunk sizes do not show in the last digits),
+    or None for NaN and infinity (not valid JSON)
+"""
+def json_number(value) -> float:
+    value = float(value)
+    return float(f"{value:.12g}") if np.isfinite(value) else None
+
+"""
+Define a function to write a dictionary to a JSON file through a temporary file
+"""
+def write_json(file_path: str, document: dict) -> None:
+    # Create the profile saving folder if it is not exist
+    os.makedirs(os.path.dirname(file_path) or ".", exist_ok=True)
+    temp_path = file_path + ".tmp"
+    with open(temp_path, mode="w", encoding="utf-8") as file:
+        json.dump(document, file, indent=2)
+    os.replace(temp_path, file_path)
+
+"""
+Define a function to read a profile JSON file
+Return:
+- The profile dictionary, or None if the file does not exist
+"""
+def load_profile(file_path: str) -> dict:
+    if not os.path.isfile(file_path):
+        return None
+    with open(file_path, encoding="utf-8") as file:
+        return json.load(file)
+
+"""
+Define a function to describe a profile as a table
+Parameters:
+    profile (dict): A profile returned by DataProfiler.snapshot
+Return:
+- A DataFrame with one row per column: kind, nulls, cardinality, min, mean, median and max
+    (the text length statistics for text columns)
+"""
+def profile_table(profile: dict) -> pd.DataFrame:
+    rows = []
+    for column, summary in profile["columns"].items():
+        statistics = summary.get("length", summary)
+        rows.append({
+            "column": column,
+            "kind": summary["kind"],
+            "nulls": summary["nulls"],
+            "cardinality": summary["cardinality"],
+            "min": statistics["min"],
+            "mean": statistics["mean"],
+            "median": summary["quantiles"]["50%"] if "quantiles" in summary else None,
+            "max": statistics["max"],
+        })
+    return pd.DataFrame(rows).set_index("column")
+
+"""
+Define a function to compare two profiles
+Parameters:
+    before (dict): The earlier profile
+    after (dict): The later profile
+    null_tolerance (float): Increase of a null fraction reported as a regression
+    row_tolerance (float): Fraction of rows lost reported as a regression
+    mean_tolerance (float): Relative change of a mean reported as a regression
+Structure:
+- Compare the row counts and the column sets
+- For every column of both profiles, list the statistics that changed as [before, after]
+- Report a regression for a lost column, a column that changed kind, a null fraction or mean
+    that moved more than the tolerance, and rows lost over the tolerance
+Return:
+- A dictionary with the rows, added and removed columns, the changes per column and the regression messages
+"""
+def diff_profiles(before: dict,
+                  after: dict,
+                  null_tolerance: float = NULL_TOLERANCE,
+                  row_tolerance: float = ROW_TOLERANCE,
+                  mean_tolerance: float = MEAN_TOLERANCE
+                  ) -> dict:
+    regressions = []
+    removed = [column for column in before["columns"] if column not in after["columns"]]
+    added = [column for column in after["columns"] if column not in before["columns"]]
+    regressions += [f"{column}: column removed" for column in removed]
+    if before["rows"] and (before["rows"] - after["rows"]) / before["rows"] > row_tolerance:
+        regressions.append(f"rows: {before['rows']} -> {after['rows']}")
+
+    changes = {}
+    for column in before["columns"]:
+        if column not in after["columns"]:
+            continue
+        old, new = before["columns"][column], after["columns"][column]
+        changed = {key: [old.get(key), new.get(key)] for key in ("kind", "nulls", "null_fraction", "cardinality", "min", "max", "mean")
+                   if old.get(key) != new.get(key)}
+        if changed:
+            changes[column] = changed
+
+        if old["kind"] != new["kind"]:
+            regressions.append(f"{column}: kind {old['kind']} -> {new['kind']}")
+        elif new["null_fraction"] is not None and (new["null_fraction"] - (old["null_fraction"] or 0)) > null_tolerance:
+            regressions.append(f"{column}: null fraction {old['null_fraction'] or 0:.3f} -> {new['null_fraction']:.3f}")
+        old_mean, new_mean = old.get("mean"), new.get("mean")
+        if old["kind"] == new["kind"] and old_mean and new_mean is not None and abs(new_mean - old_mean) / abs(old_mean) > mean_tolerance:
+            regressions.append(f"{column}: mean {old_mean:.4g} -> {new_mean:.4g}")
+
+    return {
+        "rows": [before["rows"], after["rows"]],
+        "added_columns": added,
+        "removed_columns": removed,
+        "changes": changes,
+        "regressions": regressions,
+    }
@@ -0,0 +1,81 @@
+"""
+data_schema.py
+This module defines the compact column types of the cleaned dataset:
+    category, availability: categorical (low cardinality text, stored once with small integer codes)
+    price_category: ordered categorical (Budget < Mid-range < Premium)
+    rating: int8, or float32 if a median fill left a half star rating
+    price: float64, or float32 when the reader asks for it
+    in_stock: bool
+title keeps its string type, almost every book has a different title.
+clean_data applies the schema before saving the Parquet copy, and load_cleaned applies it to every loaded dataset.
+
+functions:
+- categories_by_appearance: Orders the categories of a categorical column by first appearance.
+- apply_schema: Converts the columns of a cleaned dataset to their compact types.
+- memory_per_row: Calculates the memory used by each row of a dataset.
+"""
+import numpy as np
+import pandas as pd
+
+CATEGORICAL_COLUMNS = ["category", "availability"] # Low cardinality text columns
+PRICE_CATEGORIES = pd.CategoricalDtype(["Budget", "Mid-range", "Premium"], ordered=True)
+
+"""
+Define a function to order the categories of a categorical column by first appearance
+Parameters:
+    series (pd.Series): A categorical column
+Structure:
+- Find the codes in the order they first appear
+- Put the categories that do not appear at the end
+Return:
+- The same column with reordered categories, so ties in value_counts break by first appearance
+    like they do for string columns
+"""
+def categories_by_appearance(series: pd.Series) -> pd.Series:
+    categories = series.cat.categories
+    codes = series.cat.codes.to_numpy()
+    appearance = categories.take(pd.unique(codes[codes >= 0]))
+    return series.cat.reorder_categories(appearance.append(categories.difference(appearance)))
+
+"""
+Define a function to convert a cleaned dataset to the compact column types
+Parameters:
+    df (pd.DataFrame): The cleaned dataset, with any subset of the columns
+    integer_rating (bool): Store the rating as int8, or None to check if every rating is a whole number
+    float32_price (bool): Store the price as float32 instead of float64
+Structure:
+- Convert the low cardinality text columns to categoricals ordered by first appearance
+- Convert price_category to the ordered Budget < Mid-range < Premium categorical
+- Downcast the rating and price, convert in_stock to bool
+Return:
+- The converted dataset
+"""
+def apply_schema(df: pd.DataFrame, integer_rating: bool = None, float32_price: bool = False) -> pd.DataFrame:
+    for column in CATEGORICAL_COLUMNS:
+        if column in df.columns:
+            df[column] = categories_by_appearance(df[column].astype("category"))
+
+    if "price_category" in df.columns:
+        df["price_category"] = df["price_category"].astype(PRICE_CATEGORIES)
+
+    if "rating" in df.columns:
+        if integer_rating is None:
+            ratings = df["rating"].to_numpy(dtype=float)
+            integer_rating = bool(np.all(ratings == np.round(ratings)))
+        df["rating"] = df["rating"].astype(np.int8 if integer_rating else np.float32)
+
+    if "price" in df.columns:
+        df["price"] = df["price"].astype(np.float32 if float32_price else np.float64)
+
+    if "in_stock" in df.columns:
+        df["in_stock"] = df["in_stock"].astype(bool)
+
+    return df
+
+"""
+Define a function to calculate the memory used by each row of a dataset
+Return:
+- The bytes per row, counting the string contents
+"""
+def memory_per_row(df: pd.DataFrame) -> float:
+    return df.memory_usage(deep=True, index=False).sum() / max(len(df), 1)
@@ -10,13 +10,35 @@ import time
 import random
 import os
 import csv
+import argparse
 
-from bs4 import BeautifulSoup
+from collections.abc import Callable, Iterable, Iterator
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, as_completed, wait
 from tqdm import tqdm
+from question2_data_analysis.rate_limiter import TokenBucket
+from question2_data_analysis.response_cache import ResponseCache
+from question2_data_analysis.scrape_journal import ScrapeJournal
+from question2_data_analysis.parse_pipeline import ParsePipeline
+from question2_data_analysis.scrape_metrics import ScrapeMetrics
+from question2_data_analysis.page_parser import (
+    parse_breadcrumb_category,
+    parse_category_links,
+    parse_listing,
+    parse_listing_page,
+)
+from question2_data_analysis.http_session import (
+    BACKOFF_BASE,
+    backoff_delay,
+    create_session,
+    get_session,
+    is_retryable_status,
+    parse_retry_after,
+)
 
 BASE_URL = 'https://books.toscrape.com/catalogue/page-{}.html' # URL template for paginated book listings
 DETAIL_BASE_URL = 'https://books.toscrape.com/catalogue/' # Base URL for further book details
 DATA_PATH = "question2_data_analysis/data/raw/" # Path to save the scraped data
+BATCH_SIZE = 100 # Number of rows written to the CSV file at a time
 
 """
 Define a function to fetch the content of the URL
@@ -24,31 +46,166 @@ Parameters:
     url (str): The URL to fetch
     retries (int): The number of retry attempts if failed
     timeout (int): The timeout for the request in seconds
+    rate_limiter (TokenBucket): Optional shared rate limiter used instead of the random sleep
+    session (requests.Session): Optional pooled session, the shared default session is used if not given
+    backoff_base (float): The delay for the first retry in seconds, doubled on every failed attempt
+    cache (ResponseCache): Optional on-disk response cache
+    metrics (ScrapeMetrics): Optional metrics of the run, records cache results, waits, requests and retries
 Structure:
-- Try to fetch the URL content
-- If successful, return the response text
-- If an error occurs, print the error and retry until the maximum number of retries is reached
+- If the URL is cached and still fresh (or the cache is offline), return the cached text without a request
+- Wait for the rate limiter token, or a random amount of time if no limiter is given
+- Try to fetch the URL content through the pooled session (keep-alive connections)
+- If the URL is cached but stale, send a conditional GET and reuse the cached text on 304 Not Modified
+- If successful, store the response in the cache and return the response text
+- If a client error (4xx) occurs, give up at once, except for 408 and 429 which are temporary
+- If a server error (5xx) occurs, wait for the Retry-After header or the backoff delay and retry
+- If a timeout occurs, double the timeout for the next attempt and retry after the backoff delay
+- Print the error of each failed attempt until the maximum number of retries is reached
 Return:
 - The response text if successful, or None if all attempts fail
 """
-def fetch_with_retries(url: str, retries: int = 3, timeout: int = 10) -> requests.Response:
+def fetch_with_retries(url: str,
+                       retries: int = 3,
+                       timeout: int = 10,
+                       rate_limiter: TokenBucket = None,
+                       session: requests.Session = None,
+                       backoff_base: float = BACKOFF_BASE,
+                       cache: ResponseCache = None,
+                       metrics: ScrapeMetrics = None) -> str:
+    metrics = metrics if metrics is not None else ScrapeMetrics()
+    entry = None
+    if cache is not None:
+        entry = cache.get(url)
+        if entry is not None and (cache.offline or cache.is_fresh(entry)):
+            metrics.record_cache("hit")
+            return entry["body"]
+        if cache.offline:
+            metrics.record_cache("miss")
+            print(f"Offline: {url} is not cached")
+            return None
+
+    session = session if session is not None else get_session()
+    headers = cache.conditional_headers(entry) if cache is not None else {}
     for attempt in range(1, retries + 1):
+        retry_after = None
+        started = None # Start time of a request that has not been recorded yet
         try:
-            time.sleep(random.uniform(1,2)) # Wait a random amount of time before execute request
-            response = requests.get(url, timeout=timeout)
+            if rate_limiter is not None:
+                metrics.record_wait(rate_limiter.acquire()) # Wait for a token from the shared rate limiter
+            else:
+                delay = random.uniform(1,2)
+                time.sleep(delay) # Wait a random amount of time before execute request
+                metrics.record_wait(delay)
+            started = time.monotonic()
+            response = session.get(url, timeout=timeout, headers=headers)
+            metrics.record_request(time.monotonic() - started, len(response.content), response.status_code)
+            started = None
+            if response.status_code == 304 and entry is not None:
+                metrics.record_cache("revalidated")
+                cache.refresh(url, entry) # Page has not changed since it was cached
+                return entry["body"]
             response.raise_for_status()  # Check if the request was successful
             response.encoding = "utf-8" # Encode the response to UTF-8 to handle special characters
             
+            if cache is not None:
+                metrics.record_cache("miss")
+                cache.put(url, response.text, response.headers.get("ETag"), response.headers.get("Last-Modified"))
             return response.text
+        except requests.HTTPError as e:
+            print(f"Attempt {attempt} failed: {e}")
+            if not is_retryable_status(e.response.status_code):
+                print("Client error can't be fixed by retrying. Giving up.")
+                return None
+            retry_after = parse_retry_after(e.response.headers.get("Retry-After"))
+        except requests.Timeout as e:
+            print(f"Attempt {attempt} timed out: {e}")
+            timeout *= 2 # Give a slow server more time on the next attempt
         except Exception as e:
             print(f"Attempt {attempt} failed: {e}")
-            if attempt == retries:
-                print("All attempts failed. Giving up.")
+
+        if started is not None:
+            metrics.record_request(time.monotonic() - started) # The request failed without a response
+
+        if attempt == retries:
+            print("All attempts failed. Giving up.")
+        else:
+            metrics.record_retry()
+            time.sleep(retry_after if retry_after is not None else backoff_delay(attempt, backoff_base))
+
+"""
+Define a function to parse a fetched page
+Parameters:
+    pipeline (ParsePipeline): Optional process pool parsing stage, the page is parsed in this thread if not given
+    parse_function (Callable): The page_parser function to run
+    html (str): The HTML content of the page
+    *args: Further arguments of the parse function
+    metrics (ScrapeMetrics): Optional metrics of the run, records the parse time
+Return:
+- The result of the parse function
+"""
+def parse_page(pipeline: ParsePipeline, parse_function: Callable, html: str, *args, metrics: ScrapeMetrics = None):
+    started = time.monotonic()
+    try:
+        if pipeline is None:
+            return parse_function(html, *args)
+        return pipeline.parse(parse_function, html, *args)
+    finally:
+        if metrics is not None:
+            metrics.record_parse(time.monotonic() - started)
+
+"""
+Define a function to queue a fetched page in the parse pipeline without waiting for it
+Parameters:
+    pipeline (ParsePipeline): The process pool parsing stage
+    parse_function (Callable): The page_parser function to run
+    html (str): The HTML content of the page
+    *args: Further arguments of the parse function
+    metrics (ScrapeMetrics): Optional metrics of the run, records the parse time (queue wait included) when it is done
+Return:
+- The future of the result of the parse function
+"""
+def submit_parse(pipeline: ParsePipeline, parse_function: Callable, html: str, *args, metrics: ScrapeMetrics = None) -> Future:
+    started = time.monotonic()
+    future = pipeline.submit(parse_function, html, *args)
+    if metrics is not None:
+        future.add_done_callback(lambda _: metrics.record_parse(time.monotonic() - started))
+    return future
+
+"""
+Define a function to check whether a row or page that may still be fetched or parsed is finished
+Parameters:
+    result: A value, or a future whose result may be another future (a fetch that handed its page to the parse pipeline)
+Return:
+- True if the value is available (or the future failed)
+"""
+def is_ready(result) -> bool:
+    while isinstance(result, Future):
+        if not result.done():
+            return False
+        if result.exception() is not None:
+            return True
+        result = result.result()
+    return True
+
+"""
+Define a function to wait for a row or page that may still be fetched or parsed
+Return:
+- The value, the futures are waited for one after the other
+"""
+def resolve(result):
+    while isinstance(result, Future):
+        result = result.result()
+    return result
 
 """
 Define a function to extract the category of a book from its detail URL
 Parameters:
     detail_url (str): The URL of the book's detail page
+    rate_limiter (TokenBucket): Optional shared rate limiter passed to fetch_with_retries
+    session (requests.Session): Optional pooled session passed to fetch_with_retries
+    cache (ResponseCache): Optional response cache passed to fetch_with_retries
+    pipeline (ParsePipeline): Optional process pool parsing stage
+    metrics (ScrapeMetrics): Optional metrics of the run
 Structure:
 - Try to fetch the detail page content
 - If successful, parse the HTML and extract the category from the breadcrumb navigation
@@ -56,30 +213,62 @@ Structure:
 Return:
     The category name as a string, or None if extraction fails
 """
-def get_category(detail_url: str) -> str:
+def get_category(detail_url: str,
+                 rate_limiter: TokenBucket = None,
+                 session: requests.Session = None,
+                 cache: ResponseCache = None,
+                 pipeline: ParsePipeline = None,
+                 metrics: ScrapeMetrics = None) -> str:
     try:
-        response = fetch_with_retries(detail_url)
-        
-        soup = BeautifulSoup(response, "html.parser")
-        breadcrumb = soup.find("ul", class_="breadcrumb")
-        category = breadcrumb.find_all("li")[2].text.strip()
-        return category
+        response = fetch_with_retries(detail_url, rate_limiter=rate_limiter, session=session, cache=cache, metrics=metrics)
+        return parse_page(pipeline, parse_breadcrumb_category, response, metrics=metrics)
     except Exception as e:
         print(f"Error: {e}")
         return None
 
+"""
+Define a function to pass rows to a sink in batches
+Parameters:
+    rows (Iterable): The rows to write, can be a generator that is still scraping
+    write_batch (Callable): The sink, called with each list of rows
+    batch_size (int): The number of rows passed to the sink at a time
+Return:
+- The number of rows written
+"""
+def write_in_batches(rows: Iterable, write_batch: Callable[[list], None], batch_size: int = BATCH_SIZE) -> int:
+    if batch_size <= 0:
+        raise ValueError("Batch size must be positive value")
+
+    count = 0
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= batch_size:
+            write_batch(batch)
+            count += len(batch)
+            batch = []
+    if batch:
+        write_batch(batch)
+        count += len(batch)
+    return count
+
 """
 Define a function to save the scraped data to a CSV file
 Parameters:
-    data (list): A list of lists containing the book data
+    data (Iterable): The book data rows, a list or a generator such as iter_scrape_data
     file_name (str): The name of the CSV file to save the data to
+    batch_size (int): The number of rows written and flushed to disk at a time
 Structure:
 - Define the headers for the CSV file
 - Create the directory for saving the CSV file if it does not exist
-- Open the CSV file for writing and write the headers and data rows
+- Open the CSV file for writing and write the headers
+- Write the data rows in batches and flush each batch,
+    so rows reach the disk while the scraper is still running
 - Print a confirmation message with the file path
+Return:
+- The number of rows saved
 """
-def save_to_csv(data: list, file_name: str):
+def save_to_csv(data: Iterable, file_name: str, batch_size: int = BATCH_SIZE) -> int:
     headers = ["title", "price", "rating", "category", "availability"]
     # Create the csv saving folder if it is not exist
     os.makedirs(DATA_PATH, exist_ok=True)
@@ -89,61 +278,457 @@ def save_to_csv(data: list, file_name: str):
     with open(filepath, mode="w", newline="", encoding="utf-8-sig") as file:
         writer = csv.writer(file)
         writer.writerow(headers)
-        writer.writerows(data)
-        file.close()
+
+        def write_batch(batch: list) -> None:
+            writer.writerows(batch)
+            file.flush()
+
+        count = write_in_batches(data, write_batch, batch_size)
     
-    print(f"\n-- Data saved to {filepath} --")
+    print(f"\n-- {count} rows saved to {filepath} --")
+    return count
+
+"""
+Define a function to fetch and parse a listing page
+Parameters:
+    url (str): The URL of the listing page
+    detail_base_url (str): The base URL used to resolve each book's detail URL
+    rate_limiter (TokenBucket): Optional shared rate limiter passed to fetch_with_retries
+    session (requests.Session): Optional pooled session passed to fetch_with_retries
+    cache (ResponseCache): Optional response cache passed to fetch_with_retries
+    pipeline (ParsePipeline): Optional process pool parsing stage, the page is handed to it without waiting for the parse
+    metrics (ScrapeMetrics): Optional metrics of the run
+Return:
+- A list of lists containing [title, price, rating, detail_url, availability] (the future of that list with a pipeline),
+    or None if the fetch failed
+"""
+def fetch_listing_page(url: str,
+                       detail_base_url: str,
+                       rate_limiter: TokenBucket = None,
+                       session: requests.Session = None,
+                       cache: ResponseCache = None,
+                       pipeline: ParsePipeline = None,
+                       metrics: ScrapeMetrics = None) -> list:
+    response = fetch_with_retries(url, rate_limiter=rate_limiter, session=session, cache=cache, metrics=metrics)
+    if response is None:
+        return None
+    if pipeline is not None:
+        return submit_parse(pipeline, parse_listing_page, response, detail_base_url, metrics=metrics)
+    return parse_page(pipeline, parse_listing_page, response, detail_base_url, metrics=metrics)
+
+"""
+Define a function to collect the detail URLs of every book in one category
+Parameters:
+    category_url (str): The URL of the first page of the category
+    rate_limiter (TokenBucket): Optional shared rate limiter passed to fetch_with_retries
+    session (requests.Session): Optional pooled session passed to fetch_with_retries
+    cache (ResponseCache): Optional response cache passed to fetch_with_retries
+    pipeline (ParsePipeline): Optional process pool parsing stage
+    metrics (ScrapeMetrics): Optional metrics of the run
+Structure:
+- Fetch the category page and extract the detail URL of each book
+- Follow the "next" pagination link until the last page
+Return:
+- A list of detail URLs
+"""
+def crawl_category(category_url: str,
+                   rate_limiter: TokenBucket = None,
+                   session: requests.Session = None,
+                   cache: ResponseCache = None,
+                   pipeline: ParsePipeline = None,
+                   metrics: ScrapeMetrics = None) -> list:
+    detail_urls = []
+    page_url = category_url
+    while page_url:
+        response = fetch_with_retries(page_url, rate_limiter=rate_limiter, session=session, cache=cache, metrics=metrics)
+        if response is None:
+            break
+
+        entries, page_url = parse_page(pipeline, parse_listing, response, page_url, metrics=metrics)
+        detail_urls.extend(entry[3] for entry in entries)
+
+    return detail_urls
+
+"""
+Define a function to build the book URL to category map from the category index pages
+Parameters:
+    index_url (str): The URL of a page listing all categories in its sidebar
+    workers (int): The number of categories crawled at the same time
+    rate_limiter (TokenBucket): Optional shared rate limiter passed to fetch_with_retries
+    session (requests.Session): Optional pooled session passed to fetch_with_retries
+    cache (ResponseCache): Optional response cache passed to fetch_with_retries
+    pipeline (ParsePipeline): Optional process pool parsing stage
+    metrics (ScrapeMetrics): Optional metrics of the run
+Structure:
+- Fetch the index page and extract the category links
+- Crawl every category listing once, instead of fetching one detail page per book
+- Map each book's detail URL to the category it was listed under
+Return:
+- A dictionary {detail_url: category}
+"""
+def build_category_map(index_url: str,
+                       workers: int = 1,
+                       rate_limiter: TokenBucket = None,
+                       session: requests.Session = None,
+                       cache: ResponseCache = None,
+                       pipeline: ParsePipeline = None,
+                       metrics: ScrapeMetrics = None) -> dict:
+    category_map = {}
+    response = fetch_with_retries(index_url, rate_limiter=rate_limiter, session=session, cache=cache, metrics=metrics)
+    if response is None:
+        return category_map
+
+    categories = parse_page(pipeline, parse_category_links, response, index_url, metrics=metrics)
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = {
+            executor.submit(crawl_category, category_url, rate_limiter, session, cache, pipeline, metrics): category
+            for category, category_url in categories
+        }
+        for future in tqdm(as_completed(futures), total=len(futures), desc="Scraping Categories"):
+            try:
+                for detail_url in future.result():
+                    category_map[detail_url] = futures[future]
+            except Exception as category_error:
+                print(f"Error: {category_error}")
+
+    return category_map
+
+"""
+Define a function to load the categories of books already in a raw CSV file
+Parameters:
+    file_name (str): The name of the raw CSV file in DATA_PATH
+Structure:
+- Read the rows of the CSV file if it exists
+- Key each category by the title and price as shown on the listing page,
+    because the raw CSV has no detail URL column
+Return:
+- A dictionary {(title, price): category}
+"""
+def load_known_categories(file_name: str) -> dict:
+    known_categories = {}
+    filepath = os.path.join(DATA_PATH, file_name)
+    if not os.path.isfile(filepath):
+        return known_categories
+
+    with open(filepath, newline="", encoding="utf-8-sig") as file:
+        for row in csv.DictReader(file):
+            if row["category"]:
+                known_categories[(row["title"], row["price"])] = row["category"]
+
+    print(f"\n-- {len(known_categories)} known books loaded from {filepath} --")
+    return known_categories
+
+"""
+Define a function to build the row of one book from its listing page entry
+Parameters:
+    entry (list): [title, price, rating, detail_url, availability] from the listing page
+    page (int): The listing page number of the book
+    index (int): The position of the book on the listing page
+    rate_limiter (TokenBucket): Optional shared rate limiter passed to get_category
+    session (requests.Session): Optional pooled session passed to get_category
+    cache (ResponseCache): Optional response cache passed to get_category
+    category_map (dict): Optional {detail_url: category} map from the category listing pages
+    known_categories (dict): Optional {(title, price): category} map of books already scraped
+    journal (ScrapeJournal): Optional checkpoint journal
+    pipeline (ParsePipeline): Optional process pool parsing stage, the detail page is handed to it without waiting for the parse
+    metrics (ScrapeMetrics): Optional metrics of the run, records the scraped row
+Structure:
+- Take the category of a book already scraped, or from the category map
+- Otherwise fetch the category from the book's detail page
+- Record the row in the journal and the metrics
+Return:
+- A list containing [title, price, rating, category, availability],
+    or the future of that list when the detail page is parsed by the pipeline
+"""
+def scrape_book(entry: list,
+                page: int,
+                index: int,
+                rate_limiter: TokenBucket = None,
+                session: requests.Session = None,
+                cache: ResponseCache = None,
+                category_map: dict = None,
+                known_categories: dict = None,
+                journal: ScrapeJournal = None,
+                pipeline: ParsePipeline = None,
+                metrics: ScrapeMetrics = None) -> list:
+    title, price, rating, detail_url, availability = entry
+    category = (known_categories or {}).get((title, price)) or (category_map or {}).get(detail_url)
+
+    def finish_row(category: str) -> list:
+        row = [title, price, rating, category, availability]
+        if journal is not None:
+            journal.record_book(page, index, detail_url, row)
+        if metrics is not None:
+            metrics.record_row()
+        return row
+
+    if category is not None or pipeline is None:
+        return finish_row(category or get_category(detail_url, rate_limiter, session, cache, pipeline, metrics))
+
+    # Only fetch in this thread, the row is finished when the parse pipeline returns the category
+    row_future = Future()
+
+    def finish_parsed(parsed: Future) -> None:
+        try:
+            category = parsed.result()
+        except Exception as e:
+            print(f"Error: {e}")
+            category = None
+        try:
+            row_future.set_result(finish_row(category))
+        except Exception as e:
+            row_future.set_exception(e)
+
+    try:
+        response = fetch_with_retries(detail_url, rate_limiter=rate_limiter, session=session, cache=cache, metrics=metrics)
+    except Exception as e:
+        print(f"Error: {e}")
+        response = None
+    if response is None:
+        return finish_row(None)
+    submit_parse(pipeline, parse_breadcrumb_category, response, metrics=metrics).add_done_callback(finish_parsed)
+    return row_future
 
 """
 Define a function to scrape book data from the website
+Parameters:
+    The same as iter_scrape_data
+Return:
+- A list of lists containing the scraped book data
+"""
+def scrape_data(pages: int = 5,
+                workers: int = 1,
+                requests_per_second: float = None,
+                base_url: str = BASE_URL,
+                detail_base_url: str = DETAIL_BASE_URL,
+                cache: ResponseCache = None,
+                category_strategy: str = "detail",
+                journal: ScrapeJournal = None,
+                known_categories: dict = None,
+                parse_workers: int = 0,
+                metrics: ScrapeMetrics = None) -> list:
+    scraped_data = list(iter_scrape_data(pages, workers, requests_per_second, base_url, detail_base_url,
+                                         cache, category_strategy, journal, known_categories, parse_workers, metrics))
+    print(f"\n-- {len(scraped_data)} data was scraped --")
+    return scraped_data
+
+"""
+Define a generator to scrape book data from the website, yielding each row as soon as it is scraped
 Parameters:
     pages (int): The number of pages to scrape (default is 5)
+    workers (int): The number of concurrent workers (default is 1, the sequential path)
+    requests_per_second (float): Optional request rate shared by all workers, replaces the random sleep
+    base_url (str): The URL template for paginated book listings
+    detail_base_url (str): The base URL for further book details
+    cache (ResponseCache): Optional response cache, so reruns only transfer pages that changed
+    category_strategy (str): "detail" reads each book's category from its detail page,
+        "index" builds the category map from the category listing pages first
+        and only fetches the detail pages of books missing from the map
+    journal (ScrapeJournal): Optional checkpoint journal, a restarted run resumes from it
+    known_categories (dict): Optional {(title, price): category} map of books already scraped,
+        only the detail pages of new books are fetched (incremental mode)
+    parse_workers (int): The number of processes parsing the fetched pages (default is 0, parse in the fetching thread)
+    metrics (ScrapeMetrics): Optional metrics of the run, filled while scraping
 Structure:
-- Initialize an empty list to store the scraped book data
+- Create a pooled session with one keep-alive connection per worker
+- Start the process pool parsing stage if parse workers are requested
+- Build the category map if the "index" strategy is requested
+- If more than one worker or parse workers are requested, hand over to the concurrent scraper,
+    where the fetchers keep fetching while their pages are parsed
 - Loop through the number of pages
-- Construct the URL and fetch the page content
-- Extract the data tile, price, rating, category and availability
-- Append the data into book data list
-Return:
-- A list of lists containing the scraped book data
+- Take the rows of a page completed by a previous run from the journal
+- Otherwise construct the URL and fetch the page content
+- Extract the data tile, price, rating, category and availability of each book not journaled yet
+- Yield the data of each book
+Yield:
+- A list containing [title, price, rating, category, availability] for each book
 """
-def scrape_data(pages: int = 5) -> list:
-    scraped_data = []
-    for page in tqdm(range(1, pages + 1), desc="Scraping Pages"):
-        url = BASE_URL.format(page)
-        
-        try:
-            response = fetch_with_retries(url)
-            if response is None:
+def iter_scrape_data(pages: int = 5,
+                     workers: int = 1,
+                     requests_per_second: float = None,
+                     base_url: str = BASE_URL,
+                     detail_base_url: str = DETAIL_BASE_URL,
+                     cache: ResponseCache = None,
+                     category_strategy: str = "detail",
+                     journal: ScrapeJournal = None,
+                     known_categories: dict = None,
+                     parse_workers: int = 0,
+                     metrics: ScrapeMetrics = None) -> Iterator[list]:
+    if category_strategy not in ("detail", "index"):
+        raise ValueError("Category strategy must be 'detail' or 'index'")
+
+    rate_limiter = TokenBucket(requests_per_second) if requests_per_second else None
+    session = create_session(pool_size=workers)
+    pipeline = ParsePipeline(parse_workers) if parse_workers > 0 else None
+    try:
+        category_map = {}
+        if category_strategy == "index":
+            category_map = build_category_map(base_url.format(1), workers, rate_limiter, session, cache, pipeline, metrics)
+
+        if workers > 1 or pipeline is not None:
+            yield from iter_scrape_data_concurrent(pages, workers, rate_limiter, base_url, detail_base_url,
+                                                   session, cache, category_map, journal, known_categories, pipeline, metrics)
+            return
+
+        for page in tqdm(range(1, pages + 1), desc="Scraping Pages"):
+            if journal is not None and journal.is_page_complete(page):
+                yield from journal.page_rows(page)
                 continue
+
+            url = base_url.format(page)
             
-            soup = BeautifulSoup(response, 'html.parser')
-            books = soup.find_all("article", class_="product_pod")
-            
-            for book in tqdm(books, desc=f"Processing Page {page}", leave=False):
-                try:
-                    title = book.h3.a['title']
-                    price = book.find("p", class_="price_color").text.strip()
-                    rating = book.find("p", class_="star-rating")["class"][1]
-                    category = get_category(DETAIL_BASE_URL + book.h3.a["href"])
-                    availability = book.find("p", class_="instock availability").text.strip()
-                    
-                    scraped_data.append([
-                        title,
-                        price,
-                        rating,
-                        category,
-                        availability
-                    ])
-                except Exception as book_error:
-                    print(f"Error: {book_error}")
-            
-        except Exception as page_error:
-            print(f"Error: {page_error}")
-            
-    print(f"\n-- {len(scraped_data)} data was scraped --")
-    return scraped_data
+            try:
+                entries = fetch_listing_page(url, detail_base_url, rate_limiter, session, cache, pipeline, metrics)
+                if entries is None:
+                    continue
+                
+                if journal is not None:
+                    journal.expect_page(page, len(entries))
+                
+                for index, entry in tqdm(enumerate(entries), total=len(entries), desc=f"Processing Page {page}", leave=False):
+                    row = journal.get_row(page, index) if journal is not None else None
+                    if row is None:
+                        row = scrape_book(entry, page, index, rate_limiter, session, cache,
+                                          category_map, known_categories, journal, pipeline, metrics)
+                    yield row
+                
+            except Exception as page_error:
+                print(f"Error: {page_error}")
+    finally:
+        if pipeline is not None:
+            pipeline.close()
+
+"""
+Define a generator to scrape book data with a bounded pool of concurrent workers
+Parameters:
+    pages (int): The number of pages to scrape
+    workers (int): The maximum number of requests in flight at the same time
+    rate_limiter (TokenBucket): Optional shared rate limiter, keeps the workers polite to the host
+    base_url (str): The URL template for paginated book listings
+    detail_base_url (str): The base URL for further book details
+    session (requests.Session): Optional pooled session shared by all workers
+    cache (ResponseCache): Optional response cache shared by all workers
+    category_map (dict): Optional {detail_url: category} map, only books missing from it fetch their detail page
+    journal (ScrapeJournal): Optional checkpoint journal, a restarted run resumes from it
+    known_categories (dict): Optional {(title, price): category} map of books already scraped
+    pipeline (ParsePipeline): Optional process pool parsing stage, the fetching threads hand their pages to it
+        and go on fetching, the parses are collected here
+    metrics (ScrapeMetrics): Optional metrics of the run
+Structure:
+- Submit every listing page fetch and parse not completed by a previous run to the thread pool
+- As each listing page completes (fetched, then parsed by the pipeline if any), submit its books not journaled yet
+    to the same pool, so listing and detail fetches overlap
+- After each completed fetch or parse, yield the rows that are already finished, in page and book order,
+    so the result is the same as the sequential path
+- Yield the remaining rows in order once every listing page is processed
+Yield:
+- A list containing [title, price, rating, category, availability] for each book
+"""
+def iter_scrape_data_concurrent(pages: int,
+                                workers: int,
+                                rate_limiter: TokenBucket = None,
+                                base_url: str = BASE_URL,
+                                detail_base_url: str = DETAIL_BASE_URL,
+                                session: requests.Session = None,
+                                cache: ResponseCache = None,
+                                category_map: dict = None,
+                                journal: ScrapeJournal = None,
+                                known_categories: dict = None,
+                                pipeline: ParsePipeline = None,
+                                metrics: ScrapeMetrics = None) -> Iterator[list]:
+    if session is None:
+        session = create_session(pool_size=workers)
+    rows_by_page = {} # {page: [row or future of scrape_book]}, None if the listing page failed
+    next_page = 1 # The next page to yield rows from
+    next_index = 0 # The next book to yield on that page
+
+    executor = ThreadPoolExecutor(max_workers=workers)
+    try:
+        page_futures = {} # {future of a fetch, or of the parse it handed to the pipeline: page}
+        for page in range(1, pages + 1):
+            if journal is not None and journal.is_page_complete(page):
+                rows_by_page[page] = journal.page_rows(page)
+            else:
+                future = executor.submit(fetch_listing_page, base_url.format(page), detail_base_url,
+                                         rate_limiter, session, cache, pipeline, metrics)
+                page_futures[future] = page
+
+        progress = tqdm(total=len(page_futures), desc="Scraping Pages")
+        while page_futures:
+            done, _ = wait(page_futures, return_when=FIRST_COMPLETED)
+            future = next(iter(done))
+            page = page_futures.pop(future)
+            try:
+                entries = future.result()
+                if isinstance(entries, Future):
+                    # Fetched, the page is being parsed
+                    page_futures[entries] = page
+                    continue
+                progress.update(1)
+                rows_by_page[page] = None
+                if entries is None:
+                    continue
+
+                if journal is not None:
+                    journal.expect_page(page, len(entries))
+
+                rows_by_page[page] = []
+                for index, entry in enumerate(entries):
+                    row = journal.get_row(page, index) if journal is not None else None
+                    if row is None:
+                        row = executor.submit(scrape_book, entry, page, index, rate_limiter, session, cache,
+                                              category_map, known_categories, journal, pipeline, metrics)
+                    rows_by_page[page].append(row)
+            except Exception as page_error:
+                progress.update(1)
+                rows_by_page[page] = None
+                print(f"Error: {page_error}")
+
+            # Yield the finished rows in order without waiting for the others
+            while next_page in rows_by_page:
+                rows = rows_by_page[next_page] or []
+                while next_index < len(rows) and is_ready(rows[next_index]):
+                    yield resolve(rows[next_index])
+                    next_index += 1
+                if next_index < len(rows):
+                    break
+                del rows_by_page[next_page]
+                next_page, next_index = next_page + 1, 0
+        progress.close()
+
+        # Every listing page is processed, wait for the remaining rows in order
+        for page in range(next_page, pages + 1):
+            rows = rows_by_page.get(page) or []
+            start = next_index if page == next_page else 0
+            for row in rows[start:]:
+                yield resolve(row)
+    finally:
+        executor.shutdown(wait=True, cancel_futures=True)
 
 if __name__ == "__main__":
-    scraped_data = scrape_data(25) # Scrape from 25 pages for 500 records
-    save_to_csv(scraped_data, f"books_data_500.csv")
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Scrape book data from books.toscrape.com")
+    parser.add_argument("--offline", action="store_true", help="Rebuild the CSV from the response cache without network access")
+    parser.add_argument("--incremental", action="store_true", help="Only fetch the details of books not already in the raw CSV")
+    parser.add_argument("--parse-workers", type=int, default=0, help="Number of processes parsing the pages (0 parses in the fetching threads)")
+    parser.add_argument("--metrics-interval", type=float, default=0, help="Seconds between metrics snapshots while scraping (0 only saves them at the end)")
+    args = parser.parse_args()
+
+    file_name = "books_data_500.csv"
+    metrics_path = os.path.join(DATA_PATH, file_name + ".metrics.json")
+    metrics = ScrapeMetrics()
+    if args.metrics_interval > 0:
+        metrics.start_snapshots(metrics_path, args.metrics_interval)
+    cache = ResponseCache(offline=args.offline)
+    journal = ScrapeJournal(os.path.join(DATA_PATH, file_name + ".journal"))
+    known_categories = load_known_categories(file_name) if args.incremental else None
+
+    # Scrape from 25 pages for 500 records, rows are streamed to the CSV file while scraping
+    scraped_data = iter_scrape_data(25, workers=8, requests_per_second=5, cache=cache, category_strategy="index",
+                                    journal=journal, known_categories=known_categories, parse_workers=args.parse_workers,
+                                    metrics=metrics)
+    save_to_csv(scraped_data, file_name)
+    journal.clear() # The CSV is complete, the next run starts from scratch
+
+    metrics.stop_snapshots()
+    metrics.to_json(metrics_path)
+    print(f"\n-- Metrics saved to {metrics_path} --")
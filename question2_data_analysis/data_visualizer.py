@@ -9,6 +9,8 @@ It generates:
     Interactive versions of the scatter plot and bar chart.
         Selectors to choose top categories
 The visualizations are saved in the 'data/visualizations' folder as HTML files.
+The cleaned file is loaded through the dataset cache shared with the other stages,
+and visualize_frame takes an already loaded DataFrame.
 """
 
 import os
@@ -16,9 +18,26 @@ import numpy as np
 import pandas as pd
 import plotly.express as px
 import plotly.graph_objects as go
+from question2_data_analysis.dataset_io import DATASET_CACHE
 
 CLEANED_DATA_PATH = "question2_data_analysis/data/cleaned/"
 OUT_DATA_PATH = "question2_data_analysis/data/visualizations/"
+VISUALIZATION_COLUMNS = ["price", "rating", "category"] # The only columns the charts read
+
+
+"""
+Define a function to rank the categories by average rating
+Parameters:
+    df (pd.DataFrame): The data, with the category and rating columns
+Return:
+- A DataFrame with the category and its average rating, the highest first
+"""
+def average_rating_by_category(df: pd.DataFrame) -> pd.DataFrame:
+    avg_rating = df.groupby("category", observed=True)["rating"].mean()
+    # Sorted by name before ranking, like the CSV strings: the loaded categorical orders its groups by first appearance,
+    # which would break the rating ties differently
+    avg_rating.index = avg_rating.index.astype(str)
+    return avg_rating.sort_index().sort_values(ascending=False).reset_index()
 
 
 def histogram_price(df: pd.DataFrame) -> None:
@@ -109,12 +128,7 @@ def bar_avg_rating_top8(df: pd.DataFrame) -> None:
     top8 = df["category"].value_counts().head(8).index
     subset = df[df["category"].isin(top8)]
 
-    avg_rating = (
-        subset.groupby("category")["rating"]
-        .mean()
-        .sort_values(ascending=False)
-        .reset_index()
-    )
+    avg_rating = average_rating_by_category(subset)
 
     fig = px.bar(
         avg_rating,
@@ -212,12 +226,7 @@ def interactive_scatterplot_price_vs_rating_selector(df: pd.DataFrame) -> None:
 def interactive_bar_avg_rating_selector(df: pd.DataFrame) -> None:
     print(f"\n-- Interactive Bar Chart: Average rating by category with selector --")
 
-    avg_rating = (
-        df.groupby("category")["rating"]
-        .mean()
-        .sort_values(ascending=False)
-        .reset_index()
-    )
+    avg_rating = average_rating_by_category(df)
 
     limits = [5, 10, 15, 20, len(avg_rating)]
     labels = ["Top 5", "Top 10", "Top 15", "Top 20", "All"]
@@ -266,8 +275,9 @@ def interactive_bar_avg_rating_selector(df: pd.DataFrame) -> None:
 
 def data_visualize(file_name: str) -> None:
     file_path = os.path.join(CLEANED_DATA_PATH, file_name)
-    df = pd.read_csv(file_path)
+    visualize_frame(DATASET_CACHE.load(file_path, columns=VISUALIZATION_COLUMNS, mapped=True))
 
+def visualize_frame(df: pd.DataFrame) -> None:
     os.makedirs(OUT_DATA_PATH, exist_ok=True)
 
     histogram_price(df)
@@ -0,0 +1,395 @@
+"""
+dataset_io.py
+This module reads and writes the cleaned dataset.
+Next to the cleaned CSV file, clean_data can write a typed columnar copy in Parquet format
+(needs the optional pyarrow package), where the categorical columns of the schema in data_schema
+are dictionary encoded, and the numeric and boolean columns keep their compact types.
+The analysis, prediction and visualization stages read the Parquet copy when it is up to date,
+and only load the columns they use.
+clean_data (or else the first of them to run) also saves a memory-mappable copy (a folder of raw NumPy arrays, one per
+column, named after the size and modification time of the CSV file and published with one atomic rename, so concurrent
+runs never see or remove a partial copy), which the stages map instead of parsing the file again: the numeric and boolean columns, and the codes held by the
+categorical columns (df[column].array.codes, .cat.codes returns a copy), are backed by the mapped files without a copy,
+so every process reading the dataset shares the same page cache. The text columns are decoded into new strings.
+Within one process, the stages load the dataset through DATASET_CACHE, which keeps the loaded frames
+(keyed by path, size and modification time) and evicts the least recently used ones over its memory limit.
+
+functions:
+- columnar_path: Returns the path of the Parquet copy of a cleaned CSV file.
+- ColumnarWriter.write: Appends a cleaned chunk to the Parquet file.
+- ColumnarWriter.close: Finishes the Parquet file.
+- mapped_path: Returns the path of the memory-mappable copy of a cleaned CSV file.
+- mapped_version_path: Returns the path of the copy made from one version of the CSV file.
+- write_mapped: Saves a cleaned dataset as a memory-mappable copy.
+- load_mapped: Maps the memory-mappable copy of a cleaned dataset.
+- load_mapped_column: Maps (or decodes) one column of the copy.
+- load_cleaned: Loads the cleaned dataset, from the Parquet copy when it is up to date.
+- DatasetCache.load: Returns the cleaned dataset from the cache, loading it if it is missing or out of date.
+- DatasetCache.clear: Empties the cache.
+"""
+import json
+import os
+import shutil
+import threading
+import numpy as np
+import pandas as pd
+
+from collections import OrderedDict
+
+from question2_data_analysis.data_schema import CATEGORICAL_COLUMNS, apply_schema
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    PYARROW_AVAILABLE = True
+except ImportError:
+    PYARROW_AVAILABLE = False
+
+DEFAULT_CACHE_BYTES = 512 * 1024 * 1024 # Memory limit of the loaded dataset cache (512 MB)
+
+"""
+Define a function to find the Parquet copy of a cleaned CSV file
+Parameters:
+    file_path (str): The path of the cleaned CSV file
+Return:
+- The same path with the .parquet extension
+"""
+def columnar_path(file_path: str) -> str:
+    return os.path.splitext(file_path)[0] + ".parquet"
+
+class ColumnarWriter:
+    def __init__(self, file_path: str) -> None:
+        if not PYARROW_AVAILABLE:
+            raise ImportError("pyarrow is needed for the Parquet output")
+
+        self.file_path = file_path
+        self._temp_path = file_path + ".tmp"
+        self._writer = None
+        self._schema = None
+
+    """
+    Appends a cleaned chunk to the Parquet file as a new row group.
+    structure:
+    - Take the schema from the first chunk, with the categorical columns encoded as dictionaries with int32 indices,
+        so every chunk has the same schema whatever the number of categories it contains
+    - Convert the chunk to that schema and write it
+    """
+    def write(self, df: pd.DataFrame) -> None:
+        if self._schema is None:
+            schema = pa.Schema.from_pandas(df, preserve_index=False)
+            for column in df.select_dtypes("category").columns:
+                index = schema.get_field_index(column)
+                ordered = df[column].cat.ordered
+                schema = schema.set(index, pa.field(column, pa.dictionary(pa.int32(), pa.string(), ordered)))
+            self._schema = schema.remove_metadata()
+            self._writer = pq.ParquetWriter(self._temp_path, self._schema)
+
+        self._writer.write_table(pa.Table.from_pandas(df, schema=self._schema, preserve_index=False))
+
+    """
+    Finishes the Parquet file and moves it into place, so readers never see a half written file.
+    """
+    def close(self) -> None:
+        if self._writer is None:
+            return
+        self._writer.close()
+        self._writer = None
+        os.replace(self._temp_path, self.file_path)
+
+    def __enter__(self) -> "ColumnarWriter":
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        if exc_type is None:
+            self.close()
+        elif self._writer is not None:
+            # Drop the partial file of a failed run
+            self._writer.close()
+            self._writer = None
+            os.remove(self._temp_path)
+
+"""
+Define a function to find the memory-mappable copy of a cleaned CSV file
+Parameters:
+    file_path (str): The path of the cleaned CSV file
+Return:
+- The folder path, the same path with the .columns extension
+"""
+def mapped_path(file_path: str) -> str:
+    return os.path.splitext(file_path)[0] + ".columns"
+
+"""
+Define a function to identify the version of a file
+Return:
+- The size and modification time in nanoseconds of the file
+"""
+def file_signature(file_path: str) -> list:
+    status = os.stat(file_path)
+    return [status.st_size, status.st_mtime_ns]
+
+"""
+Define a function to find the memory-mappable copy made from one version of a cleaned CSV file
+Parameters:
+    file_path (str): The path of the cleaned CSV file
+    signature (list): The file_signature of the CSV file
+Return:
+- The folder path inside the mapped_path folder, named after the signature
+"""
+def mapped_version_path(file_path: str, signature: list) -> str:
+    return os.path.join(mapped_path(file_path), "-".join(str(value) for value in signature))
+
+"""
+Define a function to save a cleaned dataset as a memory-mappable copy
+Parameters:
+    df (pd.DataFrame): The cleaned dataset, with the compact types of the schema
+    file_path (str): The path of the cleaned CSV file the copy is made from
+Structure:
+- Save every column as .npy files in a folder next to the CSV file, named by the column position:
+    numeric and boolean columns as their values, categorical columns as their integer codes,
+    text columns as one UTF-8 text file with the character offsets of the values (and the null mask if any)
+- Save the column names and kinds, the categories and the signature of the CSV file in manifest.json
+- Write the folder under a temporary name of this process and thread, then rename it to the folder of the signature:
+    the rename is atomic, so the readers only ever see complete copies. If another process published the same version
+    first, the rename fails and its copy is kept
+- Remove the copies of older versions of the CSV file, never the current one a reader may be mapping
+"""
+def write_mapped(df: pd.DataFrame, file_path: str) -> None:
+    signature = file_signature(file_path)
+    target_path = mapped_version_path(file_path, signature)
+    temp_path = f"{target_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    shutil.rmtree(temp_path, ignore_errors=True)
+    os.makedirs(temp_path)
+
+    manifest = {"rows": len(df), "source": signature, "columns": []}
+    for position, column in enumerate(df.columns):
+        series = df[column]
+        base_path = os.path.join(temp_path, str(position))
+        entry = {"name": column}
+        if isinstance(series.dtype, pd.CategoricalDtype):
+            entry.update(kind="categorical", categories=series.cat.categories.tolist(), ordered=bool(series.cat.ordered))
+            np.save(base_path + ".npy", series.cat.codes.to_numpy())
+        elif pd.api.types.is_numeric_dtype(series.dtype) or pd.api.types.is_bool_dtype(series.dtype):
+            entry["kind"] = "values"
+            np.save(base_path + ".npy", series.to_numpy())
+        else:
+            entry["kind"] = "text"
+            texts = series.fillna("").astype(str)
+            with open(base_path + ".txt", mode="w", encoding="utf-8", newline="") as file:
+                file.write("".join(texts))
+            np.save(base_path + ".offsets.npy", np.concatenate([[0], np.cumsum(texts.str.len().to_numpy(dtype=np.int64))]))
+            if series.isna().any():
+                entry["nulls"] = True
+                np.save(base_path + ".nulls.npy", series.isna().to_numpy())
+        manifest["columns"].append(entry)
+
+    with open(os.path.join(temp_path, "manifest.json"), mode="w", encoding="utf-8") as file:
+        json.dump(manifest, file)
+    try:
+        os.rename(temp_path, target_path)
+    except OSError:
+        shutil.rmtree(temp_path, ignore_errors=True)
+        if not os.path.isfile(os.path.join(target_path, "manifest.json")):
+            raise
+
+    # The temporary folders of the other writers are left alone
+    for name in os.listdir(mapped_path(file_path)):
+        path = os.path.join(mapped_path(file_path), name)
+        if path == target_path or name.endswith(".tmp"):
+            continue
+        if os.path.isdir(path):
+            shutil.rmtree(path, ignore_errors=True)
+        else:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+"""
+Define a function to map the memory-mappable copy of a cleaned dataset
+Parameters:
+    file_path (str): The path of the cleaned CSV file
+    columns (list): The columns to load, or None for all columns
+Structure:
+- Check the copy was made from the current CSV file (same size and modification time)
+- Map the numeric, boolean and categorical code arrays copy-on-write, the DataFrame is built on the mapped memory:
+    the numeric and boolean columns are views of the mapped files, and each categorical column is built around
+    its mapped codes (df[column].array.codes), the .cat.codes accessor returns a copy
+- Decode the text columns (Python strings can't be mapped)
+Return:
+- The cleaned dataset as a DataFrame, or None if there is no copy of the current CSV file
+    (or the copy was removed while it was loaded, because the CSV file changed)
+"""
+def load_mapped(file_path: str, columns: list = None) -> pd.DataFrame:
+    if not os.path.isfile(file_path):
+        return None
+    folder_path = mapped_version_path(file_path, file_signature(file_path))
+    try:
+        with open(os.path.join(folder_path, "manifest.json"), encoding="utf-8") as file:
+            manifest = json.load(file)
+    except FileNotFoundError:
+        return None
+
+    entries = {entry["name"]: (position, entry) for position, entry in enumerate(manifest["columns"])}
+    columns = list(entries) if columns is None else columns
+    missing = [column for column in columns if column not in entries]
+    if missing:
+        raise ValueError(f"Columns {missing} are not in the cleaned dataset")
+    # Copy-on-write: the pages are shared until a reader changes a value in place, the files never change.
+    # An empty file can't be mapped
+    mmap_mode = "c" if manifest["rows"] else None
+
+    try:
+        data = {column: load_mapped_column(folder_path, *entries[column], mmap_mode) for column in columns}
+    except FileNotFoundError:
+        return None
+    return pd.DataFrame(data, columns=columns, copy=False)
+
+"""
+Define a function to load one column of a memory-mappable copy
+Parameters:
+    folder_path (str): The folder of the copy
+    position (int): The position of the column, the name of its files
+    entry (dict): The manifest entry of the column
+    mmap_mode (str): The np.load mapping mode
+Return:
+- The mapped values or categorical, or the decoded text values
+"""
+def load_mapped_column(folder_path: str, position: int, entry: dict, mmap_mode: str):
+    base_path = os.path.join(folder_path, str(position))
+    if entry["kind"] == "categorical":
+        codes = np.asarray(np.load(base_path + ".npy", mmap_mode=mmap_mode))
+        # The codes were saved with the integer type pandas picks for the categories, so they are kept, not converted
+        return pd.Categorical.from_codes(codes, dtype=pd.CategoricalDtype(entry["categories"], entry["ordered"]))
+    if entry["kind"] == "values":
+        # A plain array view of the mapped memory, not a np.memmap
+        return np.asarray(np.load(base_path + ".npy", mmap_mode=mmap_mode))
+    with open(base_path + ".txt", encoding="utf-8", newline="") as file:
+        text = file.read()
+    offsets = np.load(base_path + ".offsets.npy").tolist()
+    values = pd.Series([text[start:end] for start, end in zip(offsets[:-1], offsets[1:])])
+    if entry.get("nulls"):
+        values = values.mask(np.load(base_path + ".nulls.npy"))
+    return values
+
+"""
+Define a function to load the cleaned dataset
+Parameters:
+    file_path (str): The path of the cleaned CSV file
+    columns (list): The columns to load, or None for all columns
+    float32_price (bool): Load the price as float32 instead of float64
+    mapped (bool): Map the memory-mappable copy, saving it first if it is missing or out of date
+Structure:
+- Read the Parquet copy if pyarrow is installed and the copy is not older than the CSV file,
+    only the requested columns are read from disk
+- Otherwise read only the requested columns of the CSV file, with the low cardinality text read as categoricals
+- Convert the columns to the compact types of the schema
+- If mapped, the first load saves the whole dataset with those types as the memory-mappable copy,
+    which later loads map without parsing or converting anything. When the copy can't be saved (read-only folder)
+    or mapped, the dataset is read as if mapped was False
+Return:
+- The cleaned dataset as a DataFrame
+"""
+def load_cleaned(file_path: str, columns: list = None, float32_price: bool = False, mapped: bool = False) -> pd.DataFrame:
+    if mapped:
+        df = load_mapped(file_path, columns)
+        if df is None:
+            try:
+                write_mapped(load_cleaned(file_path), file_path)
+                df = load_mapped(file_path, columns)
+            except OSError as e:
+                print(f"-- The memory-mapped copy can't be saved ({e}), the cleaned file is read instead --")
+        if df is None:
+            return load_cleaned(file_path, columns, float32_price)
+        if float32_price and "price" in df.columns:
+            df["price"] = df["price"].astype(np.float32)
+        return df
+
+    parquet_path = columnar_path(file_path)
+    if (PYARROW_AVAILABLE and os.path.isfile(parquet_path)
+            and (not os.path.isfile(file_path) or os.path.getmtime(parquet_path) >= os.path.getmtime(file_path))):
+        df = pd.read_parquet(parquet_path, columns=columns)
+    else:
+        dtypes = {column: "category" for column in CATEGORICAL_COLUMNS + ["price_category"]
+                  if columns is None or column in columns}
+        df = pd.read_csv(file_path, usecols=columns, dtype=dtypes)
+
+    return apply_schema(df, float32_price=float32_price)
+
+class DatasetCache:
+    def __init__(self, max_bytes: int = DEFAULT_CACHE_BYTES) -> None:
+        # Validate initial data
+        if max_bytes <= 0:
+            raise ValueError("Max bytes must be positive value")
+
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        # {(path, float32_price, mapped): {"signature", "df", "complete", "bytes"}}, least recently used first
+        self._entries: OrderedDict[tuple, dict] = OrderedDict()
+        self._total_bytes = 0
+
+    """
+    Returns the cleaned dataset, from the cache when it holds the requested columns of the current file.
+    Parameters:
+        file_path, columns, float32_price, mapped: The load_cleaned parameters
+    structure:
+    - Drop the entry of the file if the CSV or Parquet file changed size or modification time since it was loaded
+    - Return the requested columns of the entry if it has them all
+    - Otherwise load the missing columns only, add them to the entry (one frame per file, whatever the column order
+        of each stage) and evict the least recently used entries while the cache is over its memory limit
+    returns:
+    - The requested columns as a new DataFrame, so a caller adding or replacing a column does not change the cache
+    """
+    def load(self, file_path: str, columns: list = None, float32_price: bool = False, mapped: bool = False) -> pd.DataFrame:
+        key = (os.path.abspath(file_path), float32_price, mapped)
+        signature = self._signature(file_path)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry["signature"] != signature:
+                self._remove(key)
+                entry = None
+            if entry is not None and (entry["complete"] if columns is None
+                                      else all(column in entry["df"].columns for column in columns)):
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry["df"][list(entry["df"].columns) if columns is None else columns]
+            self.misses += 1
+            cached = entry["df"] if entry is not None else None
+
+        missing = None if columns is None or cached is None else [column for column in columns if column not in cached.columns]
+        df = load_cleaned(file_path, columns=missing if missing is not None else columns,
+                          float32_price=float32_price, mapped=mapped)
+        if missing is not None:
+            df = pd.concat([cached, df], axis=1)
+
+        size = int(df.memory_usage(deep=True).sum())
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            if size <= self.max_bytes:
+                self._entries[key] = {"signature": signature, "df": df, "complete": columns is None, "bytes": size}
+                self._total_bytes += size
+                while self._total_bytes > self.max_bytes:
+                    self._remove(next(iter(self._entries)))
+        return df[list(df.columns) if columns is None else columns]
+
+    """
+    Empties the cache.
+    """
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._total_bytes = 0
+
+    def _remove(self, key: tuple) -> None:
+        self._total_bytes -= self._entries.pop(key)["bytes"]
+
+    """
+    Identifies the version of the files a cleaned dataset is loaded from, the CSV file and its Parquet copy.
+    """
+    @staticmethod
+    def _signature(file_path: str) -> list:
+        return [file_signature(path) if os.path.isfile(path) else None for path in (file_path, columnar_path(file_path))]
+
+DATASET_CACHE = DatasetCache() # The cache shared by the analysis, prediction and visualization stages
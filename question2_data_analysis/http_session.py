@@ -0,0 +1,104 @@
+"""
+http_session.py
+This module provides the shared HTTP layer for the scraper:
+a pooled requests.Session with keep-alive connections,
+exponential backoff with jitter and Retry-After handling.
+
+functions:
+- create_session: Creates a session with a connection pool of the given size.
+- get_session: Returns the shared default session, creating it on first use.
+- is_retryable_status: Decides whether a failed HTTP status code is worth retrying.
+- parse_retry_after: Converts a Retry-After header into a number of seconds.
+- backoff_delay: Calculates the exponential backoff delay with full jitter.
+"""
+import random
+import threading
+import time
+import requests
+
+from email.utils import parsedate_to_datetime
+from requests.adapters import HTTPAdapter
+
+DEFAULT_POOL_SIZE = 10 # Number of keep-alive connections kept per host
+BACKOFF_BASE = 1.0 # Delay in seconds for the first retry
+MAX_BACKOFF = 60.0 # Upper bound for any single retry delay in seconds
+RETRYABLE_CLIENT_ERRORS = {408, 429} # 4xx codes that are temporary (Request Timeout, Too Many Requests)
+
+_default_session = None
+_default_session_lock = threading.Lock()
+
+"""
+Define a function to create a pooled session
+Parameters:
+    pool_size (int): The maximum number of connections kept alive per host
+Structure:
+- Create a requests.Session, which reuses TCP connections (keep-alive)
+- Mount an HTTPAdapter with the given pool size for both http and https
+Return:
+- The configured session
+"""
+def create_session(pool_size: int = DEFAULT_POOL_SIZE) -> requests.Session:
+    if pool_size <= 0:
+        raise ValueError("Pool size must be positive value")
+
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+"""
+Define a function to get the shared default session
+Return:
+- The module level session, created on first use
+"""
+def get_session() -> requests.Session:
+    global _default_session
+    with _default_session_lock:
+        if _default_session is None:
+            _default_session = create_session()
+        return _default_session
+
+"""
+Define a function to check if a failed HTTP status code should be retried
+Parameters:
+    status_code (int): The HTTP status code of the failed response
+Return:
+- True for server errors (5xx) and temporary client errors (408, 429),
+    False for other client errors (4xx) such as 404 which will not change on retry
+"""
+def is_retryable_status(status_code: int) -> bool:
+    return status_code >= 500 or status_code in RETRYABLE_CLIENT_ERRORS
+
+"""
+Define a function to parse the Retry-After header
+Parameters:
+    value (str): The header value, either a number of seconds or an HTTP date
+Return:
+- The number of seconds to wait (capped at MAX_BACKOFF), or None if the header is missing or invalid
+"""
+def parse_retry_after(value: str) -> float:
+    if not value:
+        return None
+    try:
+        seconds = float(value)
+    except ValueError:
+        try:
+            seconds = parsedate_to_datetime(value).timestamp() - time.time()
+        except (TypeError, ValueError):
+            return None
+    return min(max(seconds, 0.0), MAX_BACKOFF)
+
+"""
+Define a function to calculate the backoff delay before a retry
+Parameters:
+    attempt (int): The number of the attempt that just failed (starting from 1)
+    base (float): The delay for the first retry in seconds
+Structure:
+- Double the delay for every failed attempt, up to MAX_BACKOFF
+- Apply full jitter so that concurrent workers do not retry at the same moment
+Return:
+- The delay in seconds
+"""
+def backoff_delay(attempt: int, base: float = BACKOFF_BASE) -> float:
+    return random.uniform(0, min(MAX_BACKOFF, base * 2 ** (attempt - 1)))
@@ -0,0 +1,237 @@
+"""
+near_duplicates.py
+This module finds the books that were scraped more than once with small differences,
+such as a trailing space in the title or a re-scraped price, which drop_duplicates misses.
+Two stages link the rows of the same book:
+    key: rows with the same normalized title and category (lower case, no punctuation, single spaces)
+    fuzzy (optional): rows in the same category whose titles have a Jaccard similarity of character 3-grams
+        over the threshold, estimated with MinHash signatures and found through LSH buckets
+The linked rows form duplicate clusters (connected components), the first row of each cluster is kept.
+Every step is a vectorized pass over the rows, and the index is a fixed size signature per row,
+so the running time grows almost linearly with the number of rows.
+
+functions:
+- normalize_text: Normalizes text for comparison.
+- normalized_hashes: Hashes the normalized text of some columns of each row.
+- key_hashes: Hashes the normalized key columns of each row.
+- minhash_signatures: Calculates the MinHash signatures of the character 3-grams of texts.
+- lsh_pairs: Finds the pairs of similar signatures through LSH buckets.
+- find_duplicate_clusters: Labels every row with the first row of its duplicate cluster.
+- duplicate_report: Describes the duplicate clusters.
+"""
+import re
+import numpy as np
+import pandas as pd
+
+from scipy.sparse import coo_matrix
+from scipy.sparse.csgraph import connected_components
+
+KEY_COLUMNS = ["title", "category"] # Columns that identify a book, the price can change between scrapes
+UNKNOWN_TITLES = {"", "unknown"} # Normalized titles of filled rows, never merged with other rows
+MAX_TEXT_LENGTH = 256 # Characters of each text used for the signatures
+BATCH_SIZE = 10000 # Texts per batch of the signature calculation
+
+"""
+Define a function to normalize text for comparison
+Structure:
+- Lower case, punctuation replaced by spaces, runs of white space replaced by a single space, stripped
+Return:
+- The normalized texts, missing values become empty texts
+"""
+def normalize_text(series: pd.Series) -> pd.Series:
+    return (
+        series.fillna("").astype(str)
+        .str.lower()
+        # Unicode aware \w, the default engine of the Arrow strings only knows ASCII letters
+        .str.replace(r"[^\w\s]", " ", regex=True, flags=re.UNICODE)
+        .str.replace(r"\s+", " ", regex=True)
+        .str.strip()
+    )
+
+"""
+Define a function to hash the normalized text of some columns of each row
+Return:
+- A 64-bit hash per row
+"""
+def normalized_hashes(df: pd.DataFrame, columns: list) -> np.ndarray:
+    normalized = pd.DataFrame({column: normalize_text(df[column]) for column in columns})
+    return pd.util.hash_pandas_object(normalized, index=False).to_numpy()
+
+"""
+Define a function to hash the normalized key columns of each row
+Parameters:
+    df (pd.DataFrame): The filled data
+    key_columns (list): The columns that identify a book
+Structure:
+- Hash the normalized key columns
+- Use the hash of the entire row for unknown titles, so they only match exact duplicates
+Return:
+- A 64-bit hash per row
+"""
+def key_hashes(df: pd.DataFrame, key_columns: list = KEY_COLUMNS) -> np.ndarray:
+    hashes = normalized_hashes(df, key_columns).copy()
+    unknown = normalize_text(df[key_columns[0]]).isin(UNKNOWN_TITLES).to_numpy()
+    if unknown.any():
+        numbers = {column: float for column in df.select_dtypes("number").columns}
+        row_hashes = pd.util.hash_pandas_object(df[unknown].astype(numbers), index=False).to_numpy()
+        hashes[unknown] = row_hashes
+    return hashes
+
+"""
+Define a function to calculate the MinHash signatures of texts
+Parameters:
+    texts (pd.Series): Normalized texts
+    num_perm (int): The number of hash functions (signature length)
+    seed (int): The seed of the hash function coefficients
+Structure:
+- Calculate the signature of each distinct text once
+- Sort the texts by length, and put the code points of a batch of texts of similar length,
+    padded with a space on both sides, into a matrix
+- Hash every character 3-gram of the matrix to one 64-bit number
+- For every multiply-shift hash function (a * x + b) >> 32, take the minimum over the 3-grams of each text
+Return:
+- An array of shape (number of texts, num_perm), the fraction of equal entries of two signatures
+    estimates the Jaccard similarity of their 3-gram sets
+"""
+def minhash_signatures(texts: pd.Series, num_perm: int = 64, seed: int = 1) -> np.ndarray:
+    if num_perm <= 0:
+        raise ValueError("Number of permutations must be positive value")
+
+    generator = np.random.default_rng(seed)
+    a = generator.integers(1, 1 << 63, size=num_perm, dtype=np.uint64) | np.uint64(1)
+    b = generator.integers(0, 1 << 63, size=num_perm, dtype=np.uint64)
+
+    text_codes, distinct = pd.factorize(texts.astype(str))
+    padded = " " + pd.Series(distinct).str.slice(0, MAX_TEXT_LENGTH - 2) + " "
+    lengths = padded.str.len().to_numpy()
+    order = np.argsort(lengths, kind="stable")
+    distinct_signatures = np.empty((len(distinct), num_perm), dtype=np.uint64)
+    for start in range(0, len(order), BATCH_SIZE):
+        rows = order[start:start + BATCH_SIZE]
+        width = max(int(lengths[rows].max()), 3)
+        batch = padded.iloc[rows].to_numpy(dtype=f"<U{width}")
+        codes = batch.view(np.uint32).reshape(len(rows), width).astype(np.uint64)
+
+        # Code points fit in 21 bits, so the three of a 3-gram fit in one 64-bit number
+        grams = (codes[:, :-2] << np.uint64(42)) | (codes[:, 1:-1] << np.uint64(21)) | codes[:, 2:]
+        padding = np.arange(width - 2) >= (lengths[rows, None] - 2)
+        for index in range(num_perm):
+            # Overflow wraps around, multiply-shift hashing relies on it
+            hashed = (a[index] * grams + b[index]) >> np.uint64(32)
+            hashed[padding] = np.iinfo(np.uint64).max
+            distinct_signatures[rows, index] = hashed.min(axis=1)
+    return distinct_signatures[text_codes]
+
+"""
+Define a function to find the pairs of similar signatures
+Parameters:
+    signatures (np.ndarray): The MinHash signatures
+    bands (int): The number of LSH bands, num_perm must be divisible by it
+    threshold (float): The minimum estimated Jaccard similarity of a pair
+    groups (np.ndarray): A 64-bit hash per row, only rows of the same group are paired (e.g. the category)
+Structure:
+- For every band, hash the slice of each signature with the group, and sort the rows by that hash
+- Rows with the same hash share a bucket, pair each of them with the first and the previous row of its bucket
+- Keep the pairs whose signatures agree on at least the threshold fraction of the entries
+Return:
+- A tuple of (first rows, second rows) of the similar pairs
+"""
+def lsh_pairs(signatures: np.ndarray, bands: int = 16, threshold: float = 0.8, groups: np.ndarray = None) -> tuple:
+    rows, num_perm = signatures.shape
+    if bands <= 0 or num_perm % bands:
+        raise ValueError("Bands must be a positive divisor of the signature length")
+    if not (0 < threshold <= 1):
+        raise ValueError("Threshold must be between 0 and 1")
+
+    width = num_perm // bands
+    base = groups.astype(np.uint64) if groups is not None else np.zeros(rows, dtype=np.uint64)
+    first_rows, second_rows = [], []
+    for band in range(bands):
+        bucket = base.copy()
+        for column in signatures[:, band * width:(band + 1) * width].T:
+            # Overflow wraps around, which is fine for a hash
+            bucket = bucket * np.uint64(1000003) + column.astype(np.uint64)
+        order = np.argsort(bucket, kind="stable")
+        sorted_bucket = bucket[order]
+        same = np.flatnonzero(sorted_bucket[1:] == sorted_bucket[:-1]) + 1
+        if not len(same):
+            continue
+        starts = np.flatnonzero(np.r_[True, sorted_bucket[1:] != sorted_bucket[:-1]])
+        bucket_start = starts[np.searchsorted(starts, same, side="right") - 1]
+        first_rows += [order[same - 1], order[bucket_start]]
+        second_rows += [order[same], order[same]]
+
+    if not first_rows:
+        return np.array([], dtype=np.int64), np.array([], dtype=np.int64)
+    first_rows, second_rows = np.concatenate(first_rows), np.concatenate(second_rows)
+    similarity = (signatures[first_rows] == signatures[second_rows]).mean(axis=1)
+    similar = (similarity >= threshold) & (first_rows != second_rows)
+    return first_rows[similar], second_rows[similar]
+
+"""
+Define a function to find the duplicate clusters of a dataset
+Parameters:
+    df (pd.DataFrame): The filled data
+    key_columns (list): The columns that identify a book, the first one is the title
+    fuzzy (bool): Also link the rows with similar titles in the same category with MinHash/LSH
+    threshold (float): The minimum estimated Jaccard similarity of similar titles
+    num_perm (int): The MinHash signature length
+    bands (int): The number of LSH bands
+Structure:
+- Link every row to the first row with the same key hash
+- If fuzzy, link the pairs of similar titles found by lsh_pairs (unknown titles are left out)
+- Find the connected components of the links
+Return:
+- An array with, for every row, the position of the first row of its cluster
+    (a row that is not a duplicate is labelled with its own position)
+"""
+def find_duplicate_clusters(df: pd.DataFrame,
+                            key_columns: list = KEY_COLUMNS,
+                            fuzzy: bool = False,
+                            threshold: float = 0.8,
+                            num_perm: int = 64,
+                            bands: int = 16
+                            ) -> np.ndarray:
+    rows = len(df)
+    positions = np.arange(rows)
+    codes, _ = pd.factorize(key_hashes(df, key_columns))
+    first_of_key = np.full(codes.max() + 1 if rows else 0, rows)
+    np.minimum.at(first_of_key, codes, positions)
+    first_rows, second_rows = [first_of_key[codes]], [positions]
+
+    if fuzzy and rows:
+        titles = normalize_text(df[key_columns[0]])
+        known = np.flatnonzero(~titles.isin(UNKNOWN_TITLES).to_numpy())
+        groups = normalized_hashes(df.iloc[known], key_columns[1:]) if len(key_columns) > 1 else None
+        signatures = minhash_signatures(titles.iloc[known], num_perm)
+        similar_first, similar_second = lsh_pairs(signatures, bands, threshold, groups)
+        first_rows.append(known[similar_first])
+        second_rows.append(known[similar_second])
+
+    first_rows, second_rows = np.concatenate(first_rows), np.concatenate(second_rows)
+    links = coo_matrix((np.ones(len(first_rows), dtype=np.int8), (first_rows, second_rows)), shape=(rows, rows))
+    _, components = connected_components(links, directed=False)
+    first_of_component = np.full(components.max() + 1 if rows else 0, rows)
+    np.minimum.at(first_of_component, components, positions)
+    return first_of_component[components]
+
+"""
+Define a function to describe the duplicate clusters
+Parameters:
+    df (pd.DataFrame): The data the clusters were found in
+    clusters (np.ndarray): The cluster labels returned by find_duplicate_clusters
+Return:
+- A DataFrame with one row per cluster of more than one row: the kept title, the cluster size,
+    the distinct titles and the price range, largest clusters first
+"""
+def duplicate_report(df: pd.DataFrame, clusters: np.ndarray) -> pd.DataFrame:
+    members = df.assign(cluster=clusters)
+    members = members[members.groupby("cluster")["cluster"].transform("size") > 1]
+    report = members.groupby("cluster").agg(
+        size=("cluster", "size"),
+        titles=("title", lambda titles: list(dict.fromkeys(titles))),
+        min_price=("price", "min"),
+        max_price=("price", "max"),
+    )
+    report.insert(0, "kept_title", df["title"].to_numpy()[report.index.to_numpy()])
+    return report.sort_values("size", ascending=False, kind="stable")
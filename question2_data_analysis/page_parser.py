@@ -0,0 +1,203 @@
+"""
+page_parser.py
+This module parses the listing, category and detail pages of books.toscrape.com.
+The parser backend is pluggable:
+    html.parser: Python's built-in parser over the entire page
+    lxml: the lxml parser over the entire page (needs the optional lxml package)
+    strainer: html.parser restricted by a SoupStrainer to the elements that are used
+    lxml-strainer: lxml restricted by a SoupStrainer to the elements that are used
+The fastest available backend is used by default.
+Run this module to benchmark the backends on saved pages.
+
+functions:
+- available_backends: Returns the backends that can be used in this environment.
+- make_soup: Parses HTML with a backend, keeping only the elements matched by the strainer.
+- extract_books: Extracts the book entries from a parsed listing page.
+- parse_listing: Extracts the book entries and the next page URL from a listing page.
+- parse_listing_page: Extracts the book entries from a listing page.
+- parse_category_links: Extracts the category links from the sidebar of a listing page.
+- parse_breadcrumb_category: Extracts the category from the breadcrumb of a detail page.
+- benchmark_backends: Measures the parse time per page of every backend.
+"""
+import argparse
+import glob
+import os
+import timeit
+
+from urllib.parse import urljoin
+from bs4 import BeautifulSoup, SoupStrainer
+
+try:
+    import lxml # noqa: F401 (only needed by BeautifulSoup)
+    LXML_AVAILABLE = True
+except ImportError:
+    LXML_AVAILABLE = False
+
+BACKENDS = ["html.parser", "lxml", "strainer", "lxml-strainer"]
+DEFAULT_BACKEND = "lxml-strainer" if LXML_AVAILABLE else "strainer"
+FIXTURES_PATH = "tests/test_question2/fixtures/catalogue/" # Saved pages used by the benchmark
+
+# Strainers keep only the elements each page type needs
+LISTING_STRAINER = SoupStrainer(["article", "li"], attrs={"class": ["product_pod", "next"]})
+CATEGORY_STRAINER = SoupStrainer("div", class_="side_categories")
+BREADCRUMB_STRAINER = SoupStrainer("ul", class_="breadcrumb")
+
+"""
+Define a function to list the backends that can be used
+Return:
+- The backend names, without the lxml backends if lxml is not installed
+"""
+def available_backends() -> list:
+    return [backend for backend in BACKENDS if LXML_AVAILABLE or not backend.startswith("lxml")]
+
+"""
+Define a function to parse HTML with a backend
+Parameters:
+    html (str): The HTML content of the page
+    backend (str): The parser backend name
+    strainer (SoupStrainer): The elements kept by the strainer backends
+Return:
+- The parsed BeautifulSoup object
+"""
+def make_soup(html: str, backend: str = DEFAULT_BACKEND, strainer: SoupStrainer = None) -> BeautifulSoup:
+    if backend not in available_backends():
+        raise ValueError(f"Parser backend must be one of {available_backends()}")
+
+    features = "lxml" if backend.startswith("lxml") else "html.parser"
+    parse_only = strainer if backend.endswith("strainer") else None
+    return BeautifulSoup(html, features, parse_only=parse_only)
+
+"""
+Define a function to extract the book entries from a parsed listing page
+Parameters:
+    soup (BeautifulSoup): The parsed listing page
+    detail_base_url (str): The base URL used to resolve each book's detail URL
+Structure:
+- Find all book articles
+- Extract the title, price, rating, detail URL and availability of each book
+- Skip a book and print the error if any of its fields can't be extracted
+Return:
+- A list of lists containing [title, price, rating, detail_url, availability]
+"""
+def extract_books(soup: BeautifulSoup, detail_base_url: str) -> list:
+    entries = []
+    books = soup.find_all("article", class_="product_pod")
+
+    for book in books:
+        try:
+            title = book.h3.a['title']
+            price = book.find("p", class_="price_color").text.strip()
+            rating = book.find("p", class_="star-rating")["class"][1]
+            detail_url = urljoin(detail_base_url, book.h3.a["href"])
+            availability = book.find("p", class_="instock availability").text.strip()
+
+            entries.append([title, price, rating, detail_url, availability])
+        except Exception as book_error:
+            print(f"Error: {book_error}")
+
+    return entries
+
+"""
+Define a function to parse a listing page
+Parameters:
+    html (str): The HTML content of the listing page
+    page_url (str): The URL of the page, used to resolve the relative links
+    backend (str): The parser backend name
+Return:
+- A tuple of (book entries, URL of the next page or None on the last page)
+"""
+def parse_listing(html: str, page_url: str, backend: str = DEFAULT_BACKEND) -> tuple[list, str]:
+    soup = make_soup(html, backend, LISTING_STRAINER)
+    next_link = soup.select_one("li.next a")
+    next_url = urljoin(page_url, next_link["href"]) if next_link else None
+    return extract_books(soup, page_url), next_url
+
+"""
+Define a function to extract the book entries from a listing page
+Parameters:
+    html (str): The HTML content of the listing page
+    detail_base_url (str): The base URL used to resolve each book's detail URL
+    backend (str): The parser backend name
+Return:
+- A list of lists containing [title, price, rating, detail_url, availability]
+"""
+def parse_listing_page(html: str, detail_base_url: str, backend: str = DEFAULT_BACKEND) -> list:
+    return parse_listing(html, detail_base_url, backend)[0]
+
+"""
+Define a function to extract the category links from the sidebar of a listing page
+Parameters:
+    html (str): The HTML content of a listing page
+    page_url (str): The URL of the page, used to resolve the relative links
+    backend (str): The parser backend name
+Return:
+- A list of (category name, category URL) tuples
+"""
+def parse_category_links(html: str, page_url: str, backend: str = DEFAULT_BACKEND) -> list:
+    soup = make_soup(html, backend, CATEGORY_STRAINER)
+    links = soup.select("div.side_categories ul li ul li a")
+    return [(link.text.strip(), urljoin(page_url, link["href"])) for link in links]
+
+"""
+Define a function to extract the category from the breadcrumb of a detail page
+Parameters:
+    html (str): The HTML content of the detail page
+    backend (str): The parser backend name
+Return:
+- The category name, the third breadcrumb item (Home > Books > Category > Title)
+"""
+def parse_breadcrumb_category(html: str, backend: str = DEFAULT_BACKEND) -> str:
+    soup = make_soup(html, backend, BREADCRUMB_STRAINER)
+    breadcrumb = soup.find("ul", class_="breadcrumb")
+    return breadcrumb.find_all("li")[2].text.strip()
+
+"""
+Define a function to benchmark the parser backends
+Parameters:
+    listing_pages (list): HTML contents of saved listing pages
+    detail_pages (list): HTML contents of saved detail pages
+    repeat (int): The number of times every page is parsed
+Structure:
+- Check that every backend extracts the same data as html.parser
+- Time the listing page parse (books and categories) and the detail page parse of every backend
+Return:
+- A dictionary {backend: {"listing_ms": ..., "detail_ms": ...}} with the average milliseconds per page
+"""
+def benchmark_backends(listing_pages: list, detail_pages: list, repeat: int = 20) -> dict:
+    def parse_listings(backend: str) -> list:
+        return [
+            (parse_listing(html, "", backend), parse_category_links(html, "", backend))
+            for html in listing_pages
+        ]
+
+    def parse_details(backend: str) -> list:
+        return [parse_breadcrumb_category(html, backend) for html in detail_pages]
+
+    expected = (parse_listings("html.parser"), parse_details("html.parser"))
+    results = {}
+    for backend in available_backends():
+        if (parse_listings(backend), parse_details(backend)) != expected:
+            raise ValueError(f"Parser backend {backend} extracted different data")
+
+        listing_seconds = timeit.timeit(lambda: parse_listings(backend), number=repeat)
+        detail_seconds = timeit.timeit(lambda: parse_details(backend), number=repeat)
+        results[backend] = {
+            "listing_ms": listing_seconds * 1000 / (repeat * max(len(listing_pages), 1)),
+            "detail_ms": detail_seconds * 1000 / (repeat * max(len(detail_pages), 1)),
+        }
+    return results
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the HTML parser backends on saved pages")
+    parser.add_argument("pages_path", nargs="?", default=FIXTURES_PATH, help="Folder with page-*.html and */index.html pages")
+    parser.add_argument("--repeat", type=int, default=20, help="Number of times every page is parsed")
+    args = parser.parse_args()
+
+    listing_pages = [open(path, encoding="utf-8").read() for path in glob.glob(os.path.join(args.pages_path, "page-*.html"))]
+    detail_pages = [open(path, encoding="utf-8").read() for path in glob.glob(os.path.join(args.pages_path, "*", "index.html"))]
+
+    print(f"\n-- Parse time per page ({len(listing_pages)} listing, {len(detail_pages)} detail pages) --")
+    print(f"{'Backend':<16}{'Listing (ms)':>14}{'Detail (ms)':>14}")
+    print('-'*44)
+    for backend, timing in benchmark_backends(listing_pages, detail_pages, args.repeat).items():
+        print(f"{backend:<16}{timing['listing_ms']:>14.3f}{timing['detail_ms']:>14.3f}")
@@ -0,0 +1,181 @@
+"""
+pairwise_tests.py
+This module compares every pair of groups of a GroupedStatistics table (e.g. the price of every pair of categories)
+with hypothesis tests computed from the sufficient statistics of the groups, so the k(k-1)/2 comparisons are
+array arithmetic instead of k(k-1)/2 scans of the data:
+    Welch's t-test: from the count, mean and variance of each group
+    Mann-Whitney U test (optional): from the value frequencies of each group, the U statistics of all the pairs
+        are one matrix product of the frequency matrix with its cumulative counts (normal approximation with
+        tie and continuity corrections, like stats.mannwhitneyu(method="asymptotic"))
+The p-values are corrected for the number of comparisons with Holm (family-wise error rate)
+or Benjamini-Hochberg (false discovery rate).
+
+functions:
+- adjust_p_values: Corrects p-values for multiple comparisons.
+- pairwise_welch: Welch's t-test for every pair of groups.
+- pairwise_mann_whitney: The Mann-Whitney U test for every pair of groups.
+- pairwise_tests: Runs the tests for every pair of groups and returns them as a table.
+"""
+import numpy as np
+import pandas as pd
+
+from scipy import stats
+from question2_data_analysis.streaming_stats import GroupedStatistics
+
+CORRECTIONS = ["holm", "bh", "none"] # Holm, Benjamini-Hochberg, or no correction
+DEFAULT_ALPHA = 0.05 # Significance level of the corrected p-values
+
+"""
+Define a function to correct p-values for multiple comparisons
+Parameters:
+    p_values (np.ndarray): The p-values, the NaN ones (tests that could not be run) are not counted
+    method (str): holm (Holm-Bonferroni step-down) or bh (Benjamini-Hochberg step-up), or none
+Return:
+- The corrected p-values, in the same order
+"""
+def adjust_p_values(p_values: np.ndarray, method: str = "holm") -> np.ndarray:
+    if method not in CORRECTIONS:
+        raise ValueError(f"Correction must be one of {CORRECTIONS}")
+    p_values = np.asarray(p_values, dtype=float)
+    adjusted = p_values.copy()
+    finite = np.flatnonzero(~np.isnan(p_values))
+    m = len(finite)
+    if method == "none" or m == 0:
+        return adjusted
+
+    order = finite[np.argsort(p_values[finite], kind="stable")]
+    ranked = p_values[order]
+    if method == "holm":
+        # The i-th smallest p-value is multiplied by m - i, and the adjusted values never decrease
+        corrected = np.maximum.accumulate((m - np.arange(m)) * ranked)
+    else:
+        # The i-th smallest p-value is multiplied by m / i, and the adjusted values never increase from the largest
+        corrected = np.minimum.accumulate((m / np.arange(1, m + 1) * ranked)[::-1])[::-1]
+    adjusted[order] = np.minimum(corrected, 1.0)
+    return adjusted
+
+"""
+Define a function to select the groups compared
+Return:
+- The positions of the groups in the statistics, the groups with fewer than min_count values are left out
+"""
+def group_positions(statistics: GroupedStatistics, groups: list = None, min_count: int = 2) -> np.ndarray:
+    positions = np.arange(len(statistics.groups)) if groups is None else statistics.groups.get_indexer(groups)
+    if (positions < 0).any():
+        missing = [group for group, position in zip(groups, positions) if position < 0]
+        raise ValueError(f"Groups {missing} are not in the statistics")
+    return positions[statistics.n[positions] >= min_count]
+
+"""
+Define a function to run Welch's t-test for every pair of groups
+Parameters:
+    statistics (GroupedStatistics): The statistics of the groups
+    groups (list): The groups compared, all the groups if None
+    min_count (int): The groups with fewer values are left out (at least 2 for a variance)
+Return:
+- A DataFrame with one row per pair (group_a, group_b, the counts, means, difference of the means, t statistic,
+    Welch-Satterthwaite degrees of freedom and two-sided p-value)
+"""
+def pairwise_welch(statistics: GroupedStatistics, groups: list = None, min_count: int = 2) -> pd.DataFrame:
+    # Validate initial data
+    if min_count < 2:
+        raise ValueError("Min count must be at least 2")
+    positions = group_positions(statistics, groups, min_count)
+    a, b = np.triu_indices(len(positions), k=1)
+    a, b = positions[a], positions[b]
+
+    n_a, n_b = statistics.n[a].astype(float), statistics.n[b].astype(float)
+    mean_a, mean_b = statistics.mean[a], statistics.mean[b]
+    # Squared standard errors of the means
+    se_a = statistics.m2[a] / (n_a - 1) / n_a
+    se_b = statistics.m2[b] / (n_b - 1) / n_b
+    with np.errstate(divide="ignore", invalid="ignore"):
+        t_stat = (mean_a - mean_b) / np.sqrt(se_a + se_b)
+        dof = (se_a + se_b) ** 2 / (se_a**2 / (n_a - 1) + se_b**2 / (n_b - 1))
+    p_value = 2 * stats.t.sf(np.abs(t_stat), dof)
+
+    return pd.DataFrame({
+        "group_a": statistics.groups[a], "group_b": statistics.groups[b],
+        "n_a": n_a.astype(np.int64), "n_b": n_b.astype(np.int64), "mean_a": mean_a, "mean_b": mean_b,
+        "difference": mean_a - mean_b, "t_stat": t_stat, "df": dof, "p_value": p_value,
+    })
+
+"""
+Define a function to run the Mann-Whitney U test for every pair of groups
+Parameters:
+    statistics (GroupedStatistics): The statistics of the groups
+    groups (list): The groups compared, all the groups if None
+    min_count (int): The groups with fewer values are left out
+Structure:
+- Build the frequency matrix F (one row per group, one column per distinct value) from the group value frequencies
+- U of group a against group b counts the pairs where the value of a is larger, plus half the ties:
+    U = F @ (cumsum(F) - F / 2).T gives it for every pair at once
+- The tie correction of the variance needs the sum of (t^3 - t) over the values of both groups, with t = F_a + F_b:
+    expanding the cube gives matrix products too
+Return:
+- A DataFrame with one row per pair, in the same order as pairwise_welch (group_a, group_b, U statistic of group_a,
+    two-sided p-value)
+"""
+def pairwise_mann_whitney(statistics: GroupedStatistics, groups: list = None, min_count: int = 2) -> pd.DataFrame:
+    positions = group_positions(statistics, groups, min_count)
+    a, b = np.triu_indices(len(positions), k=1)
+
+    counts = statistics.counts
+    group_codes = counts.index.get_level_values(0).to_numpy(dtype=np.int64)
+    keep = np.isin(group_codes, positions)
+    values, value_codes = np.unique(counts.index.get_level_values(1).to_numpy(dtype=float)[keep], return_inverse=True)
+    row_of_group = np.full(len(statistics.groups), -1)
+    row_of_group[positions] = np.arange(len(positions))
+    frequencies = np.zeros((len(positions), len(values)))
+    frequencies[row_of_group[group_codes[keep]], value_codes] = counts.to_numpy()[keep]
+
+    below = np.cumsum(frequencies, axis=1) - frequencies / 2
+    u_stat = (frequencies @ below.T)[a, b]
+    cubes = (frequencies**3).sum(axis=1)
+    squares = frequencies**2
+    tie_cubes = cubes[a] + cubes[b] + 3 * (squares @ frequencies.T)[a, b] + 3 * (frequencies @ squares.T)[a, b]
+
+    n_a, n_b = frequencies.sum(axis=1)[a], frequencies.sum(axis=1)[b]
+    n = n_a + n_b
+    mean = n_a * n_b / 2
+    tie_term = (tie_cubes - n) / (n * (n - 1))
+    with np.errstate(divide="ignore", invalid="ignore"):
+        z = (np.abs(u_stat - mean) - 0.5) / np.sqrt(n_a * n_b / 12 * ((n + 1) - tie_term))
+    p_value = np.minimum(2 * stats.norm.sf(z), 1.0)
+
+    return pd.DataFrame({
+        "group_a": statistics.groups[positions[a]], "group_b": statistics.groups[positions[b]],
+        "u_stat": u_stat, "p_value": p_value,
+    })
+
+"""
+Define a function to run the tests for every pair of groups
+Parameters:
+    statistics (GroupedStatistics): The statistics of the groups
+    groups (list): The groups compared, all the groups if None
+    mann_whitney (bool): Also run the Mann-Whitney U test (needs no normality assumption)
+    correction (str): The multiple comparison correction, one of CORRECTIONS, applied to each test separately
+    alpha (float): The significance level of the corrected p-values
+    min_count (int): The groups with fewer values are left out
+Return:
+- The pairwise_welch table with the corrected p-value and significance of each pair
+    (and the Mann-Whitney U statistic, p-value, corrected p-value and significance), the most significant pairs first
+"""
+def pairwise_tests(statistics: GroupedStatistics, groups: list = None, mann_whitney: bool = False,
+                   correction: str = "holm", alpha: float = DEFAULT_ALPHA, min_count: int = 2) -> pd.DataFrame:
+    # Validate initial data
+    if correction not in CORRECTIONS:
+        raise ValueError(f"Correction must be one of {CORRECTIONS}")
+    if not (0 < alpha < 1):
+        raise ValueError("Alpha must be between 0 and 1")
+
+    table = pairwise_welch(statistics, groups, min_count)
+    table["p_adjusted"] = adjust_p_values(table["p_value"].to_numpy(), correction)
+    table["significant"] = table["p_adjusted"] < alpha
+    if mann_whitney:
+        ranks = pairwise_mann_whitney(statistics, groups, min_count)
+        table["u_stat"] = ranks["u_stat"].to_numpy()
+        table["mw_p_value"] = ranks["p_value"].to_numpy()
+        table["mw_p_adjusted"] = adjust_p_values(table["mw_p_value"].to_numpy(), correction)
+        table["mw_significant"] = table["mw_p_adjusted"] < alpha
+    return table.sort_values("p_value", kind="stable").reset_index(drop=True)
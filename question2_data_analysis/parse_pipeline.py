@@ -0,0 +1,80 @@
+"""
+parse_pipeline.py
+This module defines the ParsePipeline class, the parsing stage of the concurrent scraper.
+Fetcher threads hand the raw HTML of each page to a process pool, so HTML parsing runs
+in parallel on all cores instead of being limited by the GIL of the fetching process.
+submit returns the future of the parse right away, so a fetcher goes on fetching while its earlier
+pages are parsed, and the caller collects the results in order.
+At most max_pending pages are queued or being parsed: a fetcher that finds the queue full blocks
+until a parse finishes (backpressure), which caps the memory held by raw pages.
+
+functions:
+- __init__: Starts the process pool and the bounded queue of pending pages.
+- submit: Queues a page to be parsed in the process pool and returns the future of the result.
+- parse: Parses a page in the process pool and waits for the result.
+- close: Shuts the process pool down.
+"""
+import multiprocessing
+import os
+import threading
+
+from collections.abc import Callable
+from concurrent.futures import Future, ProcessPoolExecutor
+
+class ParsePipeline:
+    def __init__(self, parse_workers: int = None, max_pending: int = None) -> None:
+        if parse_workers is None:
+            parse_workers = os.cpu_count() or 1
+        if max_pending is None:
+            max_pending = parse_workers * 2
+
+        # Validate initial data
+        if parse_workers <= 0:
+            raise ValueError("Parse workers must be positive value")
+        if max_pending <= 0:
+            raise ValueError("Max pending must be positive value")
+
+        self.parse_workers = parse_workers
+        self.max_pending = max_pending
+        self._slots = threading.BoundedSemaphore(max_pending)
+        # Spawn fresh processes, forking a process that already runs fetcher threads can deadlock
+        self._executor = ProcessPoolExecutor(max_workers=parse_workers, mp_context=multiprocessing.get_context("spawn"))
+
+    """
+    Queues a page to be parsed in the process pool.
+    Parameters:
+        parse_function (Callable): A module level function such as parse_listing_page,
+            so that it can be sent to the worker processes
+        html (str): The raw HTML of the page
+        *args: Further arguments of the parse function
+    structure:
+    - Wait for a free slot in the queue of pending pages (backpressure)
+    - Submit the parse to the process pool, the slot is freed when the parse is finished
+    returns:
+    - The future of the result of the parse function
+    """
+    def submit(self, parse_function: Callable, html: str, *args) -> Future:
+        self._slots.acquire()
+        try:
+            future = self._executor.submit(parse_function, html, *args)
+        except BaseException:
+            self._slots.release()
+            raise
+        future.add_done_callback(lambda _: self._slots.release())
+        return future
+
+    """
+    Parses a page in the process pool and waits for the result, for a caller that needs it to go on
+    (e.g. the next page link of a listing)
+    """
+    def parse(self, parse_function: Callable, html: str, *args):
+        return self.submit(parse_function, html, *args).result()
+
+    def close(self) -> None:
+        self._executor.shutdown(wait=True, cancel_futures=True)
+
+    def __enter__(self) -> "ParsePipeline":
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        self.close()
@@ -0,0 +1,49 @@
+"""
+rate_limiter.py
+This module defines the TokenBucket class, a thread-safe token-bucket rate limiter.
+It is shared by the scraper workers so that concurrent requests still stay polite
+to the target host, replacing the fixed random sleep before every request.
+
+functions:
+- __init__: Initializes the bucket with a refill rate and a burst capacity.
+- acquire: Blocks until a token is available and consumes it.
+"""
+import threading
+import time
+
+class TokenBucket:
+    def __init__(self, rate: float, capacity: int = 1) -> None:
+        # Validate initial data
+        if rate <= 0:
+            raise ValueError("Rate must be positive value")
+        if capacity <= 0:
+            raise ValueError("Capacity must be positive value")
+
+        self.rate = rate # Tokens added per second
+        self.capacity = capacity # Maximum number of tokens (burst size)
+        self.tokens = float(capacity)
+        self.updated_at = time.monotonic()
+        self._lock = threading.Lock()
+
+    """
+    Blocks until a token is available and consumes it.
+    structure:
+    - Refill the bucket based on the time elapsed since the last update.
+    - If a token is available, consume it and return.
+    - Otherwise, reserve the next token and sleep until it is refilled.
+    returns:
+    - The number of seconds spent waiting.
+    """
+    def acquire(self) -> float:
+        with self._lock:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+            self.updated_at = now
+
+            # Reserve a token even if it is not refilled yet, so waiting threads queue up in order
+            self.tokens -= 1
+            wait = 0.0 if self.tokens >= 0 else -self.tokens / self.rate
+
+        if wait > 0:
+            time.sleep(wait)
+        return wait
@@ -0,0 +1,127 @@
+"""
+raw_validation.py
+This module defines the RawValidator class, which checks the raw scraped data before it is cleaned:
+    schema: every column used by the cleaning rules must be in the raw file
+    coercion: a value the convert rules can't read (a price such as "£abc", an unknown rating label)
+        is counted as a failure of its column, instead of silently becoming a null value filled with the median
+    thresholds: the cleaning stops when the failure rate of a column is over its maximum,
+        so a broken scrape fails fast instead of being cleaned into wrong data
+The rows with a failure are written unchanged to a quarantine CSV file, with the failed columns,
+and left out of the cleaned data.
+The checks are vectorized and run as part of the convert step, so they don't add a pass over the data.
+
+functions:
+- __init__: Prepares the thresholds and the quarantine file.
+- check_columns: Checks the raw columns against the columns used by the rules.
+- convert: Converts a raw chunk with the convert rules, and quarantines the rows that fail.
+- check: Raises an error if a failure rate is over its threshold.
+- report: Returns the failure counts as a dictionary.
+"""
+import os
+import numpy as np
+import pandas as pd
+
+from question2_data_analysis.cleaning_rules import RuleSet
+
+DEFAULT_MAX_FAILURE_RATE = 0.05 # Fraction of the rows of a column that may fail conversion
+
+class RawValidator:
+    """
+    Creates a validator for the convert rules of a rule set.
+    Parameters:
+        rules (RuleSet): The cleaning rules, their convert rules define the coercions
+        quarantine_path (str): The CSV file of the rejected rows, or None to only count them
+        max_failure_rate (float or dict): The maximum failure rate of every column,
+            or {column: rate} with DEFAULT_MAX_FAILURE_RATE for the other columns
+        append (bool): Add to an existing quarantine file (incremental mode) instead of replacing it
+    """
+    def __init__(self, rules: RuleSet, quarantine_path: str = None, max_failure_rate=DEFAULT_MAX_FAILURE_RATE,
+                 append: bool = False) -> None:
+        rates = max_failure_rate if isinstance(max_failure_rate, dict) else {}
+        default_rate = DEFAULT_MAX_FAILURE_RATE if isinstance(max_failure_rate, dict) else max_failure_rate
+        # Validate initial data
+        for rate in [default_rate, *rates.values()]:
+            if not (0 <= rate <= 1):
+                raise ValueError("Max failure rate must be between 0 and 1")
+
+        self.rules = rules
+        self.quarantine_path = quarantine_path
+        self.required_columns = list(dict.fromkeys(rule.column for rule in rules.rules))
+        self.max_failure_rates = {column: rates.get(column, default_rate) for column in rules.converted_columns}
+        self.rows = 0
+        self.quarantined = 0
+        self.failures = {column: 0 for column in rules.converted_columns}
+        if quarantine_path is not None and not append and os.path.isfile(quarantine_path):
+            os.remove(quarantine_path)
+
+    """
+    Checks that every column used by the rules is in the raw data.
+    """
+    def check_columns(self, columns: list) -> None:
+        missing = [column for column in self.required_columns if column not in columns]
+        if missing:
+            raise ValueError(f"Raw data is missing the columns {missing}")
+
+    """
+    Converts a raw chunk with the convert rules and quarantines the rows that fail.
+    Parameters:
+        df (pd.DataFrame): The raw chunk, changed in place like RuleSet.convert
+        record (bool): Count the failures and write the quarantine file,
+            False when the same rows are converted again (second pass of the chunked mode)
+    Structure:
+    - Keep the raw text of the converted columns
+    - Convert the chunk, a failure is a value that was not null before the conversion and is null after it
+    - Write the failed rows with their raw values and the failed columns to the quarantine file
+    Return:
+    - The converted chunk without the failed rows
+    """
+    def convert(self, df: pd.DataFrame, record: bool = True) -> pd.DataFrame:
+        self.check_columns(df.columns)
+        columns = self.rules.converted_columns
+        raw = df[columns].copy()
+        df = self.rules.convert(df)
+
+        failed = {column: raw[column].notna().to_numpy() & df[column].isna().to_numpy() for column in columns}
+        any_failed = np.logical_or.reduce(list(failed.values())) if failed else np.zeros(len(df), dtype=bool)
+        if record:
+            self.rows += len(df)
+            for column in columns:
+                self.failures[column] += int(failed[column].sum())
+            if any_failed.any():
+                self._quarantine(df, raw, failed, any_failed)
+        return df[~any_failed].copy() if any_failed.any() else df
+
+    """
+    Raises a ValueError if the failure rate of a column is over its maximum.
+    """
+    def check(self) -> None:
+        if not self.rows:
+            return
+        exceeded = [
+            f"{column} {count / self.rows:.1%} > {self.max_failure_rates[column]:.1%}"
+            for column, count in self.failures.items() if count / self.rows > self.max_failure_rates[column]
+        ]
+        if exceeded:
+            location = f", the rows are in {self.quarantine_path}" if self.quarantine_path else ""
+            raise ValueError(f"Too many values can't be converted ({', '.join(exceeded)}){location}")
+
+    def report(self) -> dict:
+        return {"rows": self.rows, "quarantined": self.quarantined, "failures": dict(self.failures)}
+
+    """
+    Appends the failed rows to the quarantine file, with the raw values and a column listing the failed columns.
+    """
+    def _quarantine(self, df: pd.DataFrame, raw: pd.DataFrame, failed: dict, any_failed: np.ndarray) -> None:
+        self.quarantined += int(any_failed.sum())
+        if self.quarantine_path is None:
+            return
+        rows = df[any_failed].assign(**{column: raw.loc[any_failed, column] for column in raw.columns})
+        reasons = pd.Series("", index=rows.index)
+        for column, column_failed in failed.items():
+            reasons += np.where(column_failed[any_failed], column + " ", "")
+        rows["failed_columns"] = reasons.str.strip()
+
+        # Create the quarantine saving folder if it is not exist
+        os.makedirs(os.path.dirname(self.quarantine_path) or ".", exist_ok=True)
+        new_file = not os.path.isfile(self.quarantine_path)
+        rows.to_csv(self.quarantine_path, mode="a", index=False, header=new_file, encoding="utf-8")
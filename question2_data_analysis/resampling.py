@@ -0,0 +1,223 @@
+"""
+resampling.py
+This module computes bootstrap confidence intervals and permutation tests, which do not rely on the
+distribution assumptions behind the parametric p-values of scipy.
+The resamples are drawn in batches as NumPy index matrices (one row per resample), so every statistic of a batch
+is one vectorized reduction along the rows; a batch holds at most MAX_BATCH_VALUES indices to bound the memory.
+When the data has far fewer distinct values than rows (prices have two decimals), a resample is drawn as the counts
+of the distinct values instead: multinomial counts for the bootstrap, multivariate hypergeometric counts for a
+permutation. The distribution of the resamples is the same, and a resample costs the number of distinct values
+instead of the number of rows.
+The batches can be fanned out over a process pool. Each batch has its own random generator, spawned from the seed
+with np.random.SeedSequence, so the results are the same whatever the number of workers.
+
+functions:
+- compress: Replaces the data by its distinct values and their frequencies when it has many repeated values.
+- batch_sizes: Splits the resamples into batches.
+- set_worker_data: Gives a pool worker the data of the batches.
+- resample_batch: Computes the statistics of one batch of resamples.
+- run_batches: Runs the batches inline or in a process pool.
+- bootstrap_ci: Bootstrap percentile confidence interval of the mean, median or correlation.
+- permutation_test: Permutation test of the difference of the means of two groups.
+"""
+import multiprocessing
+import numpy as np
+
+from concurrent.futures import ProcessPoolExecutor
+
+DEFAULT_RESAMPLES = 10000 # Resamples of the bootstrap and the permutation test
+MAX_BATCH_VALUES = 2_000_000 # Indices or counts drawn per batch (16 MB of int64)
+COMPRESSION_RATIO = 4 # Resample the distinct values when there are this many times fewer of them than rows
+STATISTICS = ["mean", "median", "correlation"] # The statistics of bootstrap_ci
+
+_WORKER_DATA = None # The data of a pool worker, sent once by the pool initializer instead of with every batch
+
+"""
+Define a function to split the resamples into batches
+Parameters:
+    resamples (int): The number of resamples
+    n (int): The number of values drawn per resample
+Return:
+- The number of resamples of each batch, at most MAX_BATCH_VALUES indices per batch
+"""
+def batch_sizes(resamples: int, n: int) -> list:
+    size = max(1, MAX_BATCH_VALUES // max(n, 1))
+    return [min(size, resamples - start) for start in range(0, resamples, size)]
+
+"""
+Define a function to compress the data into its distinct values
+Parameters:
+    data (np.ndarray): The values, or the rows of a 2-column array
+Return:
+- The distinct values (rows) sorted, and their frequencies, or the data and None if it has few repeated values
+"""
+def compress(data: np.ndarray) -> tuple:
+    values, frequencies = np.unique(data, axis=0, return_counts=True)
+    if len(values) * COMPRESSION_RATIO > len(data):
+        return data, None
+    return values, frequencies
+
+"""
+Define a function to give a pool worker the data of the batches
+"""
+def set_worker_data(data: np.ndarray) -> None:
+    global _WORKER_DATA
+    _WORKER_DATA = data
+
+"""
+Define a function to compute the statistics of one batch of resamples
+Parameters:
+    task (tuple): The kind (bootstrap or permutation), the statistic or the size of the first group,
+        the number of resamples and the SeedSequence of the batch
+    data (tuple): The values (a 2-column array for the correlation) and their frequencies (None for one row per value),
+        the worker data if None
+Return:
+- The statistic of each resample of the batch
+"""
+def resample_batch(task: tuple, data: tuple = None) -> np.ndarray:
+    kind, option, size, seed = task
+    values, frequencies = _WORKER_DATA if data is None else data
+    generator = np.random.default_rng(seed)
+    n = len(values) if frequencies is None else int(frequencies.sum())
+
+    if kind == "permutation":
+        n_a = option
+        if frequencies is None:
+            # Each row is a permutation of the pooled values, the first n_a values are the first group
+            indices = generator.permuted(np.broadcast_to(np.arange(n), (size, n)), axis=1)
+            sum_a = values[indices[:, :n_a]].sum(axis=1)
+            total = values.sum()
+        else:
+            # The counts of each distinct value drawn without replacement into the first group
+            sum_a = generator.multivariate_hypergeometric(frequencies, n_a, size=size) @ values
+            total = frequencies @ values
+        return sum_a / n_a - (total - sum_a) / (n - n_a)
+
+    if frequencies is None:
+        samples = values[generator.integers(0, n, size=(size, n))]
+        if option == "mean":
+            return samples.mean(axis=1)
+        if option == "median":
+            return np.median(samples, axis=1)
+        x = samples[:, :, 0] - samples[:, :, 0].mean(axis=1, keepdims=True)
+        y = samples[:, :, 1] - samples[:, :, 1].mean(axis=1, keepdims=True)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            return (x * y).sum(axis=1) / np.sqrt((x * x).sum(axis=1) * (y * y).sum(axis=1))
+
+    # The counts of each distinct value drawn with replacement, one row per resample
+    weights = generator.multinomial(n, frequencies / frequencies.sum(), size=size)
+    if option == "mean":
+        return weights @ values / n
+    if option == "median":
+        # The k-th smallest value is the first distinct value whose cumulative count is over k
+        cumulative = np.cumsum(weights, axis=1)
+        lower = values[(cumulative <= (n - 1) // 2).sum(axis=1)]
+        upper = values[(cumulative <= n // 2).sum(axis=1)]
+        return (lower + upper) / 2
+    # Centered on the mean of the data, so the moments below don't lose precision
+    x = values[:, 0] - frequencies @ values[:, 0] / n
+    y = values[:, 1] - frequencies @ values[:, 1] / n
+    mean_x, mean_y = weights @ x / n, weights @ y / n
+    covariance = weights @ (x * y) / n - mean_x * mean_y
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return covariance / np.sqrt((weights @ (x * x) / n - mean_x**2) * (weights @ (y * y) / n - mean_y**2))
+
+"""
+Define a function to run the batches of resamples
+Parameters:
+    kind (str): bootstrap or permutation
+    option: The statistic (bootstrap) or the size of the first group (permutation)
+    data (np.ndarray): The values resampled, compressed into their distinct values if they have many repeated values
+    resamples (int): The number of resamples
+    seed (int): The seed, the same seed gives the same resamples
+    workers (int): The number of worker processes, None or 1 runs the batches in this process
+Return:
+- The statistic of every resample, in batch order
+"""
+def run_batches(kind: str, option, data: np.ndarray, resamples: int, seed: int, workers: int = None) -> np.ndarray:
+    # Validate initial data
+    if resamples <= 0:
+        raise ValueError("Resamples must be positive value")
+    if workers is not None and workers <= 0:
+        raise ValueError("Workers must be positive value")
+
+    data = compress(data)
+    sizes = batch_sizes(resamples, len(data[0]))
+    seeds = np.random.SeedSequence(seed).spawn(len(sizes))
+    tasks = [(kind, option, size, batch_seed) for size, batch_seed in zip(sizes, seeds)]
+    if workers is None or workers == 1 or len(tasks) == 1:
+        return np.concatenate([resample_batch(task, data) for task in tasks])
+
+    with ProcessPoolExecutor(max_workers=min(workers, len(tasks)), mp_context=multiprocessing.get_context("spawn"),
+                             initializer=set_worker_data, initargs=(data,)) as executor:
+        return np.concatenate(list(executor.map(resample_batch, tasks)))
+
+"""
+Define a function to compute a bootstrap confidence interval
+Parameters:
+    data (np.ndarray): The values, or a 2-column array (x, y) for the correlation, the rows with a null value are dropped
+    statistic (str): One of STATISTICS
+    resamples (int): The number of bootstrap resamples
+    confidence (float): The confidence level of the interval
+    seed (int): The seed of the resamples
+    workers (int): The number of worker processes
+Return:
+- A dictionary with the statistic of the data (estimate), the percentile interval (low, high)
+    and the standard deviation of the resampled statistics (std_error)
+"""
+def bootstrap_ci(data: np.ndarray, statistic: str = "mean", resamples: int = DEFAULT_RESAMPLES, confidence: float = 0.95,
+                 seed: int = 0, workers: int = None) -> dict:
+    # Validate initial data
+    if statistic not in STATISTICS:
+        raise ValueError(f"Statistic must be one of {STATISTICS}")
+    if not (0 < confidence < 1):
+        raise ValueError("Confidence must be between 0 and 1")
+    data = np.asarray(data, dtype=float)
+    if statistic == "correlation":
+        if data.ndim != 2 or data.shape[1] != 2:
+            raise ValueError("The correlation needs a 2-column array")
+        data = data[~np.isnan(data).any(axis=1)]
+    else:
+        data = data[~np.isnan(data)]
+    if len(data) < 2:
+        raise ValueError("The bootstrap needs at least 2 values")
+
+    if statistic == "mean":
+        estimate = data.mean()
+    elif statistic == "median":
+        estimate = np.median(data)
+    else:
+        estimate = np.corrcoef(data[:, 0], data[:, 1])[0, 1]
+
+    values = run_batches("bootstrap", statistic, data, resamples, seed, workers)
+    low, high = np.nanquantile(values, [(1 - confidence) / 2, (1 + confidence) / 2])
+    return {"estimate": float(estimate), "low": float(low), "high": float(high), "std_error": float(np.nanstd(values, ddof=1))}
+
+"""
+Define a function to test the difference of the means of two groups by permutation
+Parameters:
+    a (np.ndarray): The values of the first group, the null values are dropped
+    b (np.ndarray): The values of the second group
+    resamples (int): The number of permutations
+    seed (int): The seed of the permutations
+    workers (int): The number of worker processes
+Structure:
+- Pool the values, and shuffle the group labels: each permutation splits the pooled values into groups of the same sizes
+- The two-sided p-value is the share of permutations with a difference at least as large as the observed one,
+    counting the observed split itself so it is never 0
+Return:
+- A dictionary with the observed difference of the means (a - b) and the p-value
+"""
+def permutation_test(a: np.ndarray, b: np.ndarray, resamples: int = DEFAULT_RESAMPLES, seed: int = 0,
+                     workers: int = None) -> dict:
+    a = np.asarray(a, dtype=float)
+    b = np.asarray(b, dtype=float)
+    a, b = a[~np.isnan(a)], b[~np.isnan(b)]
+    if len(a) == 0 or len(b) == 0:
+        raise ValueError("Both groups need at least 1 value")
+
+    observed = a.mean() - b.mean()
+    differences = run_batches("permutation", len(a), np.concatenate([a, b]), resamples, seed, workers)
+    # A small tolerance, so a permutation equal to the observed split is not lost to rounding
+    extreme = np.count_nonzero(np.abs(differences) >= abs(observed) - 1e-12 * max(1.0, abs(observed)))
+    return {"difference": float(observed), "p_value": float((extreme + 1) / (resamples + 1))}
@@ -0,0 +1,178 @@
+"""
+response_cache.py
+This module defines the ResponseCache class, an on-disk cache of HTTP responses for the scraper.
+Each entry is keyed by the SHA-256 hash of its URL and stored as two files:
+    <key>.html: the response body
+    <key>.json: the URL, ETag, Last-Modified and fetch time
+Entries older than the TTL are revalidated with a conditional GET,
+and the least recently used entries are evicted when the cache grows over its size limit.
+
+functions:
+- __init__: Initializes the cache folder and loads the LRU index from disk.
+- get: Returns the cached entry of a URL, or None if it is not cached.
+- is_fresh: Checks if an entry is younger than the TTL.
+- conditional_headers: Builds the If-None-Match / If-Modified-Since headers for an entry.
+- put: Stores a response body and its validators.
+- refresh: Marks an entry as fetched now, after a 304 Not Modified response.
+"""
+import hashlib
+import json
+import os
+import threading
+import time
+
+from collections import OrderedDict
+
+CACHE_PATH = "question2_data_analysis/data/cache/" # Path to save the cached responses
+DEFAULT_TTL = 24 * 60 * 60 # Seconds before an entry must be revalidated (1 day)
+DEFAULT_MAX_BYTES = 200 * 1024 * 1024 # Size limit of the cache folder (200 MB)
+
+class ResponseCache:
+    def __init__(self,
+                cache_path: str = CACHE_PATH,
+                ttl: float = DEFAULT_TTL,
+                max_bytes: int = DEFAULT_MAX_BYTES,
+                offline: bool = False
+                ) -> None:
+        # Validate initial data
+        if ttl < 0:
+            raise ValueError("TTL can't be negative value")
+        if max_bytes <= 0:
+            raise ValueError("Max bytes must be positive value")
+
+        self.cache_path = cache_path
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.offline = offline # Serve only from the cache and never touch the network
+
+        self._lock = threading.Lock()
+        self._index: OrderedDict[str, int] = OrderedDict() # {key: size in bytes}, least recently used first
+        self._total_bytes = 0
+
+        # Create the cache folder if it is not exist
+        os.makedirs(self.cache_path, exist_ok=True)
+        self._load_index()
+
+    """
+    Loads the LRU index from the metadata files, ordered by their last access time.
+    """
+    def _load_index(self) -> None:
+        entries = []
+        for file_name in os.listdir(self.cache_path):
+            if not file_name.endswith(".json"):
+                continue
+            key = file_name[:-len(".json")]
+            meta_path, body_path = self._paths(key)
+            try:
+                size = os.path.getsize(meta_path) + os.path.getsize(body_path)
+                entries.append((os.path.getmtime(meta_path), key, size))
+            except OSError:
+                continue # Skip half written entries
+
+        for _, key, size in sorted(entries):
+            self._index[key] = size
+            self._total_bytes += size
+
+    def _key(self, url: str) -> str:
+        return hashlib.sha256(url.encode("utf-8")).hexdigest()
+
+    def _paths(self, key: str) -> tuple[str, str]:
+        return (
+            os.path.join(self.cache_path, key + ".json"),
+            os.path.join(self.cache_path, key + ".html"),
+        )
+
+    """
+    Writes a file through a temporary file, so readers never see a half written file.
+    """
+    def _write(self, path: str, content: str) -> None:
+        temp_path = f"{path}.{threading.get_ident()}.tmp"
+        with open(temp_path, mode="w", encoding="utf-8") as file:
+            file.write(content)
+        os.replace(temp_path, path)
+
+    """
+    Returns the cached entry of a URL.
+    Parameters:
+        url (str): The URL of the response
+    returns:
+    - A dictionary with url, etag, last_modified, fetched_at and body, or None if the URL is not cached
+    """
+    def get(self, url: str) -> dict:
+        key = self._key(url)
+        meta_path, body_path = self._paths(key)
+        try:
+            with open(meta_path, encoding="utf-8") as file:
+                entry = json.load(file)
+            with open(body_path, encoding="utf-8") as file:
+                entry["body"] = file.read()
+        except (OSError, ValueError):
+            return None
+
+        # Mark the entry as recently used
+        with self._lock:
+            if key in self._index:
+                self._index.move_to_end(key)
+        os.utime(meta_path)
+        return entry
+
+    """
+    Checks if an entry is younger than the TTL and can be used without revalidation.
+    """
+    def is_fresh(self, entry: dict) -> bool:
+        return time.time() - entry["fetched_at"] < self.ttl
+
+    """
+    Builds the conditional GET headers from the validators of an entry.
+    """
+    def conditional_headers(self, entry: dict) -> dict:
+        headers = {}
+        if entry is None:
+            return headers
+        if entry.get("etag"):
+            headers["If-None-Match"] = entry["etag"]
+        if entry.get("last_modified"):
+            headers["If-Modified-Since"] = entry["last_modified"]
+        return headers
+
+    """
+    Stores a response body and its validators.
+    Parameters:
+        url (str): The URL of the response
+        body (str): The response text
+        etag (str): The ETag header of the response
+        last_modified (str): The Last-Modified header of the response
+    structure:
+    - Write the body and metadata files
+    - Update the LRU index and evict the least recently used entries while the cache is over its size limit
+    """
+    def put(self, url: str, body: str, etag: str = None, last_modified: str = None) -> None:
+        key = self._key(url)
+        meta_path, body_path = self._paths(key)
+        meta = {
+            "url": url,
+            "etag": etag,
+            "last_modified": last_modified,
+            "fetched_at": time.time(),
+        }
+        self._write(body_path, body)
+        self._write(meta_path, json.dumps(meta))
+        size = os.path.getsize(meta_path) + os.path.getsize(body_path)
+
+        with self._lock:
+            self._total_bytes += size - self._index.pop(key, 0)
+            self._index[key] = size
+            while self._total_bytes > self.max_bytes and len(self._index) > 1:
+                evicted_key, evicted_size = self._index.popitem(last=False)
+                self._total_bytes -= evicted_size
+                for path in self._paths(evicted_key):
+                    try:
+                        os.remove(path)
+                    except OSError:
+                        pass
+
+    """
+    Marks an entry as fetched now, after the server answered 304 Not Modified.
+    """
+    def refresh(self, url: str, entry: dict) -> None:
+        self.put(url, entry["body"], entry.get("etag"), entry.get("last_modified"))
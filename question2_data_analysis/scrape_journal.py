@@ -0,0 +1,110 @@
+"""
+scrape_journal.py
+This module defines the ScrapeJournal class, an append-only checkpoint journal for the scraper.
+Every scraped book and every completed listing page is written to a JSON Lines file as soon as it is done,
+so a crashed or killed run can be restarted and resume where it left off.
+
+functions:
+- __init__: Opens the journal file and replays the records of a previous run.
+- is_page_complete: Checks if all books of a listing page are journaled.
+- get_row: Returns the journaled row of a book, or None.
+- page_rows: Returns the journaled rows of a completed page in book order.
+- expect_page: Records how many books a listing page has.
+- record_book: Appends a scraped book and completes its page when all its books are journaled.
+- close: Closes the journal file.
+- clear: Closes and deletes the journal file after a successful run.
+"""
+import json
+import os
+import threading
+
+class ScrapeJournal:
+    def __init__(self, journal_path: str) -> None:
+        self.journal_path = journal_path
+        self.completed_pages: set[int] = set()
+        self.rows: dict[tuple[int, int], list] = {} # {(page, index): row}
+        self.urls: dict[tuple[int, int], str] = {} # {(page, index): detail_url}
+        self.page_sizes: dict[int, int] = {} # {page: number of books}
+        self._lock = threading.Lock()
+
+        if os.path.isfile(self.journal_path):
+            self._replay()
+        else:
+            # Create the journal saving folder if it is not exist
+            os.makedirs(os.path.dirname(self.journal_path) or ".", exist_ok=True)
+        self._file = open(self.journal_path, mode="a", encoding="utf-8")
+
+    """
+    Reads the records of a previous run.
+    A half written last line (the run was killed while writing) is ignored.
+    """
+    def _replay(self) -> None:
+        with open(self.journal_path, encoding="utf-8") as file:
+            for line in file:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    continue
+
+                if record["type"] == "book":
+                    key = (record["page"], record["index"])
+                    self.rows[key] = record["row"]
+                    self.urls[key] = record["url"]
+                elif record["type"] == "page":
+                    self.completed_pages.add(record["page"])
+                    self.page_sizes[record["page"]] = record["size"]
+
+    def _append(self, record: dict) -> None:
+        self._file.write(json.dumps(record, ensure_ascii=False) + "\n")
+        self._file.flush()
+
+    def is_page_complete(self, page: int) -> bool:
+        return page in self.completed_pages
+
+    def get_row(self, page: int, index: int) -> list:
+        return self.rows.get((page, index))
+
+    def page_rows(self, page: int) -> list:
+        return [self.rows[(page, index)] for index in range(self.page_sizes[page])]
+
+    """
+    Records how many books a listing page has, so the page can be completed by record_book.
+    A page without books is completed at once.
+    """
+    def expect_page(self, page: int, size: int) -> None:
+        with self._lock:
+            self.page_sizes[page] = size
+            self._complete_page_if_done(page)
+
+    """
+    Appends a scraped book to the journal.
+    Parameters:
+        page (int): The listing page number of the book
+        index (int): The position of the book on the listing page
+        url (str): The detail URL of the book
+        row (list): The scraped row of the book
+    structure:
+    - Write the book record and flush it to disk at once
+    - If every book of the page is journaled, write the page record
+    """
+    def record_book(self, page: int, index: int, url: str, row: list) -> None:
+        with self._lock:
+            self.rows[(page, index)] = row
+            self.urls[(page, index)] = url
+            self._append({"type": "book", "page": page, "index": index, "url": url, "row": row})
+            self._complete_page_if_done(page)
+
+    def _complete_page_if_done(self, page: int) -> None:
+        size = self.page_sizes.get(page)
+        if size is None or page in self.completed_pages:
+            return
+        if all((page, index) in self.rows for index in range(size)):
+            self.completed_pages.add(page)
+            self._append({"type": "page", "page": page, "size": size})
+
+    def close(self) -> None:
+        self._file.close()
+
+    def clear(self) -> None:
+        self.close()
+        os.remove(self.journal_path)
@@ -0,0 +1,186 @@
+"""
+scrape_metrics.py
+This module defines the ScrapeMetrics class, which collects the throughput and latency metrics of a scrape:
+    requests: count, errors, retries, bytes transferred, status codes and a latency histogram
+    cache: fresh hits, revalidated (304) hits, misses and the hit ratio
+    rate limiter: total time spent waiting for a token
+    parse: pages parsed and parse time per page
+    rows: rows scraped and rows per second
+The metrics can be exported as JSON at the end of a run, and periodically while the run is going on,
+to tell whether a slow crawl is network, parser or rate limiter bound.
+
+functions:
+- __init__: Initializes the counters and starts the run clock.
+- record_request: Records the latency, size and status code of one HTTP request.
+- record_retry: Records a retried request.
+- record_cache: Records a cache lookup result.
+- record_wait: Records the time spent waiting for the rate limiter.
+- record_parse: Records the time spent parsing one page.
+- record_row: Records one scraped row.
+- snapshot: Returns all metrics as a dictionary.
+- to_json: Writes the snapshot to a JSON file.
+- start_snapshots: Writes the snapshot to a JSON file periodically in a background thread.
+- stop_snapshots: Stops the periodic snapshots.
+"""
+import json
+import os
+import threading
+import time
+
+LATENCY_BUCKETS_MS = [50, 100, 250, 500, 1000, 2500, 5000, 10000] # Upper bounds of the latency histogram buckets
+CACHE_RESULTS = ["hit", "revalidated", "miss"]
+
+class ScrapeMetrics:
+    def __init__(self) -> None:
+        self.started_at = time.monotonic()
+        self._lock = threading.Lock()
+        self._stop_event = None
+        self._snapshot_thread = None
+
+        self.requests = 0
+        self.request_errors = 0
+        self.retries = 0
+        self.bytes_transferred = 0
+        self.status_codes: dict[int, int] = {} # {status code: count}
+        self.latency_histogram = [0] * (len(LATENCY_BUCKETS_MS) + 1) # The last bucket is over the largest bound
+        self.latency_total_ms = 0.0
+        self.latency_max_ms = 0.0
+        self.cache_results = {result: 0 for result in CACHE_RESULTS}
+        self.wait_seconds = 0.0
+        self.pages_parsed = 0
+        self.parse_seconds = 0.0
+        self.rows = 0
+
+    """
+    Records one HTTP request.
+    Parameters:
+        latency (float): The request time in seconds
+        size (int): The number of bytes received
+        status_code (int): The HTTP status code, or None if the request failed without a response
+    """
+    def record_request(self, latency: float, size: int = 0, status_code: int = None) -> None:
+        latency_ms = latency * 1000
+        bucket = next(
+            (index for index, bound in enumerate(LATENCY_BUCKETS_MS) if latency_ms <= bound),
+            len(LATENCY_BUCKETS_MS)
+        )
+        with self._lock:
+            self.requests += 1
+            self.bytes_transferred += size
+            self.latency_histogram[bucket] += 1
+            self.latency_total_ms += latency_ms
+            self.latency_max_ms = max(self.latency_max_ms, latency_ms)
+            if status_code is None:
+                self.request_errors += 1
+            else:
+                self.status_codes[status_code] = self.status_codes.get(status_code, 0) + 1
+
+    def record_retry(self) -> None:
+        with self._lock:
+            self.retries += 1
+
+    """
+    Records a cache lookup result: "hit" (fresh), "revalidated" (304 Not Modified) or "miss".
+    """
+    def record_cache(self, result: str) -> None:
+        if result not in CACHE_RESULTS:
+            raise ValueError(f"Cache result must be one of {CACHE_RESULTS}")
+        with self._lock:
+            self.cache_results[result] += 1
+
+    def record_wait(self, seconds: float) -> None:
+        with self._lock:
+            self.wait_seconds += seconds
+
+    def record_parse(self, seconds: float) -> None:
+        with self._lock:
+            self.pages_parsed += 1
+            self.parse_seconds += seconds
+
+    def record_row(self) -> None:
+        with self._lock:
+            self.rows += 1
+
+    """
+    Returns all metrics as a dictionary.
+    structure:
+    - Label the latency histogram buckets by their upper bound in milliseconds
+    - Calculate the averages and ratios from the counters
+    returns:
+    - A dictionary that can be written as JSON
+    """
+    def snapshot(self) -> dict:
+        with self._lock:
+            elapsed = time.monotonic() - self.started_at
+            labels = [f"<={bound}ms" for bound in LATENCY_BUCKETS_MS] + [f">{LATENCY_BUCKETS_MS[-1]}ms"]
+            lookups = sum(self.cache_results.values())
+            return {
+                "elapsed_seconds": round(elapsed, 3),
+                "requests": {
+                    "count": self.requests,
+                    "errors": self.request_errors,
+                    "retries": self.retries,
+                    "bytes": self.bytes_transferred,
+                    "status_codes": {str(code): count for code, count in sorted(self.status_codes.items())},
+                    "latency_ms": {
+                        "mean": round(self.latency_total_ms / self.requests, 3) if self.requests else None,
+                        "max": round(self.latency_max_ms, 3),
+                        "histogram": dict(zip(labels, self.latency_histogram)),
+                    },
+                },
+                "cache": {
+                    **self.cache_results,
+                    "hit_ratio": round((lookups - self.cache_results["miss"]) / lookups, 4) if lookups else None,
+                },
+                "rate_limiter": {
+                    "wait_seconds": round(self.wait_seconds, 3),
+                },
+                "parse": {
+                    "pages": self.pages_parsed,
+                    "seconds": round(self.parse_seconds, 3),
+                    "mean_ms": round(self.parse_seconds * 1000 / self.pages_parsed, 3) if self.pages_parsed else None,
+                },
+                "rows": {
+                    "count": self.rows,
+                    "per_second": round(self.rows / elapsed, 3) if elapsed > 0 else None,
+                },
+            }
+
+    """
+    Writes the snapshot to a JSON file through a temporary file, so readers never see a half written file.
+    """
+    def to_json(self, file_path: str) -> None:
+        # Create the metrics saving folder if it is not exist
+        os.makedirs(os.path.dirname(file_path) or ".", exist_ok=True)
+        temp_path = file_path + ".tmp"
+        with open(temp_path, mode="w", encoding="utf-8") as file:
+            json.dump(self.snapshot(), file, indent=2)
+        os.replace(temp_path, file_path)
+
+    """
+    Writes the snapshot to a JSON file every interval seconds in a background thread.
+    Parameters:
+        file_path (str): The JSON file to overwrite with each snapshot
+        interval (float): The number of seconds between snapshots
+    """
+    def start_snapshots(self, file_path: str, interval: float = 30.0) -> None:
+        if interval <= 0:
+            raise ValueError("Interval must be positive value")
+        if self._snapshot_thread is not None:
+            raise RuntimeError("Periodic snapshots are already running")
+
+        self._stop_event = threading.Event()
+
+        def run() -> None:
+            while not self._stop_event.wait(interval):
+                self.to_json(file_path)
+
+        self._snapshot_thread = threading.Thread(target=run, daemon=True)
+        self._snapshot_thread.start()
+
+    def stop_snapshots(self) -> None:
+        if self._snapshot_thread is None:
+            return
+        self._stop_event.set()
+        self._snapshot_thread.join()
+        self._snapshot_thread = None
@@ -0,0 +1,383 @@
+"""
+streaming_stats.py
+This module defines the accumulators the analysis uses to compute all its statistics in one pass over the data.
+They are updated chunk by chunk, so a file larger than memory is analyzed while it is read,
+and two accumulators of different chunks or shards of a dataset can be merged.
+    mean, variance and correlation: Welford/Chan running moments and co-moments
+    quantiles, median and mode: exact, from the frequency table of the values
+        (a price has two decimals, so the table stays small however many rows there are)
+    frequency counts: kept in the order the values first appear, like value_counts
+    group statistics: the group column is factorized once per chunk, and the count, moments, min, max and
+        value frequencies of every group come from the same bincount/segment reductions, whatever the number of groups
+
+functions:
+- merge_moments: Combines the count, mean and sum of squared deviations of two parts of the data.
+- count_values: Counts the values of a chunk, in the order they first appear.
+- merge_counts: Adds two frequency tables.
+- quantile_from_counts: Computes a quantile from a frequency table.
+- ColumnStatistics: The running statistics of a numeric column.
+- GroupedStatistics: The running statistics of a numeric column for every group of a categorical column.
+- AnalysisStatistics: The running statistics of the price, rating and category columns used by the analysis.
+"""
+import numpy as np
+import pandas as pd
+
+from scipy import stats
+
+"""
+Define a function to combine the running moments of two parts of the data (Chan et al.)
+Parameters:
+    n_a, mean_a, m2_a: The count, mean and sum of squared deviations of the first part (numbers or arrays)
+    n_b, mean_b, m2_b: The same for the second part
+Return:
+- The count, mean and sum of squared deviations of both parts, a part without values is ignored
+"""
+def merge_moments(n_a, mean_a, m2_a, n_b, mean_b, m2_b) -> tuple:
+    n = n_a + n_b
+    delta = mean_b - mean_a
+    with np.errstate(divide="ignore", invalid="ignore"):
+        mean = np.where(n > 0, mean_a + delta * np.divide(n_b, n), 0.0)
+        m2 = np.where(n > 0, m2_a + m2_b + delta**2 * np.divide(n_a * n_b, n), 0.0)
+    return n, mean, m2
+
+"""
+Define a function to count the values of a chunk
+Parameters:
+    series (pd.Series): The chunk of a column, the null values are not counted
+Return:
+- A Series of counts indexed by value, in the order the values first appear (a category as its text)
+"""
+def count_values(series: pd.Series) -> pd.Series:
+    codes, uniques = pd.factorize(series)
+    counts = np.bincount(codes[codes >= 0], minlength=len(uniques))
+    return pd.Series(counts, index=pd.Index(np.asarray(uniques)), dtype=np.int64)
+
+"""
+Define a function to add two frequency tables, the values of the first table keep their order
+"""
+def merge_counts(counts: pd.Series, other: pd.Series) -> pd.Series:
+    if counts is None:
+        return other
+    return pd.concat([counts, other]).groupby(level=0, sort=False).sum()
+
+"""
+Define a function to compute a quantile from a frequency table
+Parameters:
+    counts (pd.Series): The counts indexed by value
+    q (float): The quantile, between 0 and 1
+Return:
+- The quantile with linear interpolation, the same as Series.quantile on the values, or NaN without values
+"""
+def quantile_from_counts(counts: pd.Series, q: float) -> float:
+    counts = counts[counts > 0].sort_index()
+    total = counts.sum()
+    if total == 0:
+        return np.nan
+    cumulative = counts.to_numpy().cumsum()
+    values = counts.index.to_numpy(dtype=float)
+    position = (total - 1) * q
+    lower = int(np.floor(position))
+    lower_value = values[np.searchsorted(cumulative, lower, side="right")]
+    upper_value = values[np.searchsorted(cumulative, min(lower + 1, total - 1), side="right")]
+    return lower_value + (upper_value - lower_value) * (position - lower)
+
+class ColumnStatistics:
+    def __init__(self) -> None:
+        self.n = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.min = np.nan
+        self.max = np.nan
+        self.counts: pd.Series = None # {value: count} in the order the values first appear
+
+    """
+    Adds a chunk of the column, the null values are skipped.
+    """
+    def update(self, series: pd.Series) -> None:
+        values = series.dropna()
+        if values.empty:
+            return
+        array = values.to_numpy(dtype=float)
+        mean = array.mean()
+        self._add(len(array), mean, float(((array - mean) ** 2).sum()), array.min(), array.max(), count_values(values))
+
+    """
+    Adds the values of another accumulator, as if its chunks had been added with update.
+    """
+    def merge(self, other: "ColumnStatistics") -> None:
+        if other.n:
+            self._add(other.n, other.mean, other.m2, other.min, other.max, other.counts)
+
+    def _add(self, n: int, mean: float, m2: float, minimum: float, maximum: float, counts: pd.Series) -> None:
+        self.n, mean, m2 = merge_moments(self.n, self.mean, self.m2, n, mean, m2)
+        self.mean, self.m2 = float(mean), float(m2)
+        self.min = np.fmin(self.min, minimum)
+        self.max = np.fmax(self.max, maximum)
+        self.counts = merge_counts(self.counts, counts)
+
+    def std(self) -> float:
+        return np.sqrt(self.m2 / (self.n - 1)) if self.n > 1 else np.nan
+
+    def quantile(self, q: float) -> float:
+        return quantile_from_counts(self.counts, q) if self.n else np.nan
+
+    """
+    Returns the most frequent value, the smallest one if several values are as frequent (like Series.mode), or NaN.
+    """
+    def mode(self) -> float:
+        if not self.n:
+            return np.nan
+        return self.counts[self.counts == self.counts.max()].index.min()
+
+    """
+    Returns the number of values below lower or above upper.
+    """
+    def count_outside(self, lower: float, upper: float) -> int:
+        if not self.n:
+            return 0
+        values = self.counts.index.to_numpy(dtype=float)
+        return int(self.counts[(values < lower) | (values > upper)].sum())
+
+class GroupedStatistics:
+    def __init__(self) -> None:
+        self.groups = pd.Index([], dtype=object) # The group labels, in the order they first appear
+        self.rows = np.zeros(0, dtype=np.int64) # Rows of each group, with or without a value
+        self.n = np.zeros(0, dtype=np.int64) # Values of each group
+        self.mean = np.zeros(0)
+        self.m2 = np.zeros(0)
+        self.min = np.zeros(0)
+        self.max = np.zeros(0)
+        self.counts = pd.Series(dtype=np.int64, index=pd.MultiIndex.from_arrays([[], []])) # {(group position, value): count}
+
+    """
+    Adds a chunk to the statistics, with one vectorized pass for all the groups.
+    Parameters:
+        groups (pd.Series): The group of each row, the rows without a group are skipped
+        values (pd.Series): The value of each row, the null values are only counted in the group rows
+    Structure:
+    - Factorize the groups of the chunk once, every group statistic is then a bincount over the group codes
+    - The sum of squared deviations uses the group means of the chunk, then the chunk is merged with Chan's formulas
+    - The (group, value) frequencies come from one np.unique of combined group and value codes
+    """
+    def update(self, groups: pd.Series, values: pd.Series) -> None:
+        codes, uniques = pd.factorize(groups)
+        labels = pd.Index(np.asarray(uniques), dtype=object)
+        k = len(labels)
+        has_group = codes >= 0
+        codes = codes[has_group]
+        array = np.asarray(values, dtype=float)[has_group]
+        present = ~np.isnan(array)
+        group, array = codes[present], array[present]
+
+        rows = np.bincount(codes, minlength=k)
+        n = np.bincount(group, minlength=k)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            mean = np.where(n > 0, np.bincount(group, weights=array, minlength=k) / n, 0.0)
+        m2 = np.bincount(group, weights=(array - mean[group]) ** 2, minlength=k)
+        minimum, maximum = np.full(k, np.nan), np.full(k, np.nan)
+        np.fmin.at(minimum, group, array)
+        np.fmax.at(maximum, group, array)
+
+        value_codes, value_uniques = pd.factorize(array)
+        width = max(len(value_uniques), 1)
+        pairs, pair_counts = np.unique(group.astype(np.int64) * width + value_codes, return_counts=True)
+        counts = pd.Series(pair_counts, index=pd.MultiIndex.from_arrays(
+            [pairs // width, np.asarray(value_uniques, dtype=float)[pairs % width]]))
+        self._add(labels, rows, n, mean, m2, minimum, maximum, counts)
+
+    """
+    Adds the groups of another accumulator, as if its chunks had been added with update.
+    """
+    def merge(self, other: "GroupedStatistics") -> None:
+        self._add(other.groups, other.rows, other.n, other.mean, other.m2, other.min, other.max, other.counts)
+
+    def _add(self, labels: pd.Index, rows: np.ndarray, n: np.ndarray, mean: np.ndarray, m2: np.ndarray,
+             minimum: np.ndarray, maximum: np.ndarray, counts: pd.Series) -> None:
+        new = labels[~labels.isin(self.groups)]
+        if len(new):
+            added = len(new)
+            self.groups = self.groups.append(new)
+            self.rows = np.concatenate([self.rows, np.zeros(added, dtype=np.int64)])
+            self.n = np.concatenate([self.n, np.zeros(added, dtype=np.int64)])
+            self.mean = np.concatenate([self.mean, np.zeros(added)])
+            self.m2 = np.concatenate([self.m2, np.zeros(added)])
+            self.min = np.concatenate([self.min, np.full(added, np.nan)])
+            self.max = np.concatenate([self.max, np.full(added, np.nan)])
+        positions = self.groups.get_indexer(labels)
+
+        def scatter(array: np.ndarray, fill) -> np.ndarray:
+            full = np.full(len(self.groups), fill, dtype=np.asarray(array).dtype if len(array) else float)
+            full[positions] = array
+            return full
+
+        self.rows = self.rows + scatter(rows, 0)
+        self.n, self.mean, self.m2 = merge_moments(self.n, self.mean, self.m2, scatter(n, 0), scatter(mean, 0.0), scatter(m2, 0.0))
+        self.min = np.fmin(self.min, scatter(minimum, np.nan))
+        self.max = np.fmax(self.max, scatter(maximum, np.nan))
+        if len(counts):
+            counts = pd.Series(counts.to_numpy(), index=pd.MultiIndex.from_arrays(
+                [positions[counts.index.get_level_values(0).to_numpy(dtype=np.int64)], counts.index.get_level_values(1)]))
+            self.counts = pd.concat([self.counts, counts]).groupby(level=[0, 1]).sum() if len(self.counts) else counts.sort_index()
+
+    """
+    Computes a quantile of every group from the (group, value) frequencies, with linear interpolation like Series.quantile.
+    Return:
+    - An array with the quantile of each group, NaN for a group without values
+    """
+    def quantile(self, q: float) -> np.ndarray:
+        result = np.full(len(self.groups), np.nan)
+        if not len(self.counts):
+            return result
+        # The frequencies are sorted by group then value, so each group is a contiguous segment of the cumulative counts
+        cumulative = self.counts.to_numpy().cumsum()
+        values = self.counts.index.get_level_values(1).to_numpy(dtype=float)
+        offsets = np.concatenate([[0], np.cumsum(self.n)[:-1]])
+        position = (self.n - 1) * q
+        lower = np.floor(position).astype(np.int64)
+        upper = np.minimum(lower + 1, self.n - 1)
+        last = len(cumulative) - 1
+        lower_value = values[np.minimum(np.searchsorted(cumulative, offsets + lower, side="right"), last)]
+        upper_value = values[np.minimum(np.searchsorted(cumulative, offsets + upper, side="right"), last)]
+        has_values = self.n > 0
+        result[has_values] = (lower_value + (upper_value - lower_value) * (position - lower))[has_values]
+        return result
+
+    """
+    Returns the statistics of every group as a table.
+    Parameters:
+        quantiles (list): The quantiles added as columns
+    Return:
+    - A DataFrame indexed by group, in the order the groups first appear, with the rows, count (of values),
+        mean, var, std, min, max and quantile columns
+    """
+    def table(self, quantiles: list = (0.25, 0.5, 0.75)) -> pd.DataFrame:
+        with np.errstate(divide="ignore", invalid="ignore"):
+            var = np.where(self.n > 1, self.m2 / (self.n - 1), np.nan)
+        table = pd.DataFrame({
+            "rows": self.rows, "count": self.n, "mean": np.where(self.n > 0, self.mean, np.nan),
+            "var": var, "std": np.sqrt(var), "min": self.min, "max": self.max,
+        }, index=pd.Index(self.groups, name="group"))
+        for q in quantiles:
+            table[f"{q:.0%}"] = self.quantile(q)
+        return table
+
+    """
+    Returns the k groups with the most rows, the first group to appear wins a tie (like value_counts).
+    """
+    def top_k(self, k: int) -> pd.Index:
+        order = np.argsort(-self.rows, kind="stable")[:k]
+        return self.groups[order]
+
+    """
+    Returns the count, mean and standard deviation of a group, or (0, NaN, NaN) for an unknown group.
+    """
+    def group(self, label) -> tuple[int, float, float]:
+        position = self.groups.get_indexer([label])[0]
+        if position < 0 or not self.n[position]:
+            return 0, np.nan, np.nan
+        n = int(self.n[position])
+        return n, float(self.mean[position]), float(np.sqrt(self.m2[position] / (n - 1))) if n > 1 else np.nan
+
+    """
+    Compares the values of two groups with Welch's t-test, from their counts, means and variances only.
+    Return:
+    - The t statistic and two-sided p-value, NaN if a group has fewer than 2 values
+    """
+    def welch_test(self, a, b) -> tuple[float, float]:
+        n_a, mean_a, std_a = self.group(a)
+        n_b, mean_b, std_b = self.group(b)
+        if n_a < 2 or n_b < 2:
+            return np.nan, np.nan
+        t_stat, p_value = stats.ttest_ind_from_stats(mean_a, std_a, n_a, mean_b, std_b, n_b, equal_var=False)
+        return float(t_stat), float(p_value)
+
+class AnalysisStatistics:
+    def __init__(self) -> None:
+        self.price = ColumnStatistics()
+        self.rating = ColumnStatistics()
+        self.category_prices = GroupedStatistics() # The price of each category
+        self.pair = {"n": 0, "mean_x": 0.0, "mean_y": 0.0, "m2_x": 0.0, "m2_y": 0.0, "c_xy": 0.0} # Price and rating
+
+    """
+    Adds a chunk of rows to the statistics, with one vectorized pass over each column.
+    Parameters:
+        df (pd.DataFrame): The chunk, with the price, rating and category columns
+    """
+    def update(self, df: pd.DataFrame) -> None:
+        self.price.update(df["price"])
+        self.rating.update(df["rating"])
+        self.category_prices.update(df["category"], df["price"])
+
+        both = df[["price", "rating"]].dropna().to_numpy(dtype=float)
+        if len(both):
+            x, y = both[:, 0], both[:, 1]
+            mean_x, mean_y = x.mean(), y.mean()
+            self._merge_pair({
+                "n": len(both), "mean_x": mean_x, "mean_y": mean_y, "m2_x": ((x - mean_x) ** 2).sum(),
+                "m2_y": ((y - mean_y) ** 2).sum(), "c_xy": ((x - mean_x) * (y - mean_y)).sum(),
+            })
+
+    """
+    Adds the rows of another accumulator (another chunk or shard of the data), as if they had been added with update.
+    """
+    def merge(self, other: "AnalysisStatistics") -> None:
+        self.price.merge(other.price)
+        self.rating.merge(other.rating)
+        self.category_prices.merge(other.category_prices)
+        if other.pair["n"]:
+            self._merge_pair(other.pair)
+
+    """
+    Returns the rows of each category, in the order the categories first appear.
+    """
+    @property
+    def categories(self) -> pd.Series:
+        return pd.Series(self.category_prices.rows, index=self.category_prices.groups)
+
+    def _merge_pair(self, other: dict) -> None:
+        pair = self.pair
+        n = pair["n"] + other["n"]
+        delta_x = other["mean_x"] - pair["mean_x"]
+        delta_y = other["mean_y"] - pair["mean_y"]
+        weight = pair["n"] * other["n"] / n
+        self.pair = {
+            "n": n,
+            "mean_x": pair["mean_x"] + delta_x * other["n"] / n,
+            "mean_y": pair["mean_y"] + delta_y * other["n"] / n,
+            "m2_x": pair["m2_x"] + other["m2_x"] + delta_x**2 * weight,
+            "m2_y": pair["m2_y"] + other["m2_y"] + delta_y**2 * weight,
+            "c_xy": pair["c_xy"] + other["c_xy"] + delta_x * delta_y * weight,
+        }
+
+    """
+    Returns the average price of the most frequent categories.
+    Parameters:
+        k (int): The number of categories, the first one to appear wins a tie (like value_counts)
+    Return:
+    - A DataFrame with the category and its average price rounded to 2 decimals, the highest price first
+    """
+    def top_category_prices(self, k: int) -> pd.DataFrame:
+        means = pd.Series(self.category_prices.mean, index=self.category_prices.groups)
+        prices = means[self.category_prices.top_k(k)].round(2).sort_values(ascending=False)
+        return prices.rename_axis("category").rename("price").reset_index()
+
+    """
+    Returns the Pearson correlation coefficient of the price and rating and its two-sided p-value.
+    """
+    def price_rating_correlation(self) -> tuple[float, float]:
+        pair = self.pair
+        if pair["n"] < 2 or pair["m2_x"] == 0 or pair["m2_y"] == 0:
+            return np.nan, np.nan
+        r = float(np.clip(pair["c_xy"] / np.sqrt(pair["m2_x"] * pair["m2_y"]), -1.0, 1.0))
+        if pair["n"] == 2:
+            return r, 1.0
+        # Under no correlation r is Beta(n/2 - 1, n/2 - 1) distributed on [-1, 1], as in stats.pearsonr
+        half = pair["n"] / 2 - 1
+        p_value = 2 * stats.beta.cdf(-abs(r), half, half, loc=-1, scale=2)
+        return r, float(p_value)
+
+    """
+    Returns the number of prices, mean price and price standard deviation of a category.
+    """
+    def category_price(self, category: str) -> tuple[int, float, float]:
+        return self.category_prices.group(category)
@@ -0,0 +1,62 @@
+"""
+fixture_server.py
+A local HTTP stand-in for books.toscrape.com, serving the saved fixture pages.
+"""
+import functools
+import os
+import threading
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+
+FIXTURES_PATH = os.path.join(os.path.dirname(__file__), "fixtures")
+
+class FixtureHandler(SimpleHTTPRequestHandler):
+    def log_message(self, format, *args):
+        pass # Keep the test output clean
+
+    def log_request(self, code="-", size="-"):
+        self.server.response_codes.append(int(code))
+
+    def do_GET(self):
+        self.server.requested_paths.append(self.path)
+        failures = self.server.failures.get(self.path)
+        if failures:
+            status, headers = failures.pop(0)
+            self.send_response(status)
+            for name, value in headers.items():
+                self.send_header(name, value)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        super().do_GET()
+
+class FixtureServer:
+    def __init__(self) -> None:
+        handler = functools.partial(FixtureHandler, directory=FIXTURES_PATH)
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+        self.httpd.requested_paths = []
+        self.httpd.failures = {}
+        self.httpd.response_codes = []
+        self.url = f"http://127.0.0.1:{self.httpd.server_address[1]}/"
+        self.base_url = self.url + "catalogue/page-{}.html"
+        self.detail_base_url = self.url + "catalogue/"
+
+    @property
+    def requested_paths(self) -> list:
+        return self.httpd.requested_paths
+
+    @property
+    def response_codes(self) -> list:
+        return self.httpd.response_codes
+
+    """
+    Makes the next requests to the path fail with the given status codes before serving the page.
+    """
+    def fail(self, path: str, statuses: list, headers: dict = None) -> None:
+        self.httpd.failures[path] = [(status, headers or {}) for status in statuses]
+
+    def start(self) -> None:
+        threading.Thread(target=self.httpd.serve_forever, args=(0.05,), daemon=True).start()
+
+    def stop(self) -> None:
+        self.httpd.shutdown()
+        self.httpd.server_close()
@@ -0,0 +1,113 @@
+import os
+import tempfile
+import unittest
+from contextlib import redirect_stdout
+from io import StringIO
+from unittest import mock
+
+import numpy as np
+import pandas as pd
+
+from question2_data_analysis import data_cleaner
+from question2_data_analysis.cleaning_rules import Bin, FillMissing, FlagPattern, MapOrdinal, ParseCurrency, Rule, RuleSet
+from question2_data_analysis.data_cleaner import DEFAULT_RULES, RATING_MAP, clean_data
+
+class TestCleaningRules(unittest.TestCase):
+
+    def test_parse_currency(self):
+        df = pd.DataFrame({"price": ["£51.77", " £3 ", None, "free"]}, dtype=str)
+        ParseCurrency("price").apply(df)
+        np.testing.assert_array_equal(df["price"].to_numpy(), [51.77, 3.0, np.nan, np.nan])
+
+    def test_map_ordinal(self):
+        df = pd.DataFrame({"rating": ["One", "Five", "Three"]})
+        MapOrdinal("rating", RATING_MAP).apply(df)
+        pd.testing.assert_series_equal(df["rating"], pd.Series(["One", "Five", "Three"]).map(RATING_MAP), check_names=False)
+
+        # Unknown and missing labels become NaN and the column becomes float, like Series.map
+        labels = pd.Series(["Two", "Six", None])
+        df = pd.DataFrame({"rating": labels})
+        MapOrdinal("rating", RATING_MAP).apply(df)
+        pd.testing.assert_series_equal(df["rating"], labels.map(RATING_MAP), check_names=False)
+
+    def test_bin_matches_cut(self):
+        values = pd.Series([np.nan, -1.0, 0.0, 19.99, 20.0, 40.0, 1e9, float("inf")])
+        for right in (False, True):
+            df = pd.DataFrame({"price": values})
+            Bin("price", "price_category", [0, 20, 40, float("inf")], ["Budget", "Mid-range", "Premium"], right=right).apply(df)
+            expected = pd.cut(values, bins=(0, 20, 40, float("inf")), right=right,
+                              labels=["Budget", "Mid-range", "Premium"]).astype(str)
+            pd.testing.assert_series_equal(df["price_category"], expected, check_names=False)
+
+    def test_flag_pattern(self):
+        df = pd.DataFrame({"availability": ["In stock", "Out of stock", None]})
+        FlagPattern("availability", "in_stock", "In Stock").apply(df)
+        self.assertEqual(df["in_stock"].tolist(), [True, False, False])
+
+    def test_rule_set(self):
+        rules = RuleSet([
+            ParseCurrency("price"),
+            FillMissing("price", strategy="median"),
+            FillMissing("title", "Unknown"),
+        ])
+        self.assertEqual(rules.median_columns, ["price"])
+        df = rules.fill(rules.convert(pd.DataFrame({"title": [None, "A"], "price": ["£2", None]})), {"price": 5.0})
+        self.assertEqual(df.to_dict("list"), {"title": ["Unknown", "A"], "price": [2.0, 5.0]})
+        self.assertEqual(rules.fingerprint(), RuleSet([
+            ParseCurrency("price"),
+            FillMissing("price", strategy="median"),
+            FillMissing("title", "Unknown"),
+        ]).fingerprint())
+        self.assertNotEqual(rules.fingerprint(), DEFAULT_RULES.fingerprint())
+
+    def test_fill_rule_apply(self):
+        # Each fill rule applied on its own gives the same result as the fused fill of the rule set
+        raw = pd.DataFrame({"title": [None, "A"], "price": [2.0, None], "rating": [None, 3.0]})
+        fills = [FillMissing("price", strategy="median"), FillMissing("title", "Unknown"), FillMissing("shipping", 0.0)]
+        df = raw.copy()
+        for rule in fills:
+            rule.apply(df, {"price": 5.0})
+        pd.testing.assert_frame_equal(df, RuleSet(fills).fill(raw, {"price": 5.0}))
+        with self.assertRaises(ValueError):
+            FillMissing("price", strategy="median").apply(raw.copy())
+
+    def test_invalid_rules(self):
+        # Every rule has an apply
+        with self.assertRaises(TypeError):
+            Rule("title")
+        with self.assertRaises(TypeError):
+            type("NoApply", (Rule,), {"stage": "derive"})("title")
+        with self.assertRaises(ValueError):
+            FillMissing("title")
+        with self.assertRaises(ValueError):
+            FillMissing("title", "Unknown", strategy="mode")
+        with self.assertRaises(ValueError):
+            Bin("price", "price_category", [0, 20], ["Budget", "Premium"])
+        with self.assertRaises(ValueError):
+            RuleSet([FillMissing("title", "Unknown"), FillMissing("title", "")])
+
+    def test_new_field(self):
+        # A scraped shipping cost only needs new rules
+        temp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(temp_dir.cleanup)
+        with open(os.path.join(temp_dir.name, "books.csv"), "w", encoding="utf-8") as file:
+            file.write("title,price,rating,category,availability,shipping\n"
+                       "A,£10.00,One,Poetry,In stock,£2.50\n"
+                       "B,£30.00,Two,Travel,In stock,\n"
+                       "C,£50.00,Four,Travel,In stock,£4.50\n")
+        rules = RuleSet(DEFAULT_RULES.rules + [
+            ParseCurrency("shipping"),
+            FillMissing("shipping", strategy="median"),
+            Bin("shipping", "shipping_band", [0, 3, float("inf")], ["Cheap", "Costly"]),
+        ])
+
+        with mock.patch.multiple(data_cleaner, RAW_DATA_PATH=temp_dir.name, CLEANED_DATA_PATH=temp_dir.name):
+            for chunksize in (None, 1):
+                with redirect_stdout(StringIO()):
+                    clean_data("books.csv", chunksize=chunksize, rules=rules)
+                cleaned = pd.read_csv(os.path.join(temp_dir.name, "cleaned_books.csv"))
+                self.assertEqual(cleaned["shipping"].tolist(), [2.5, 3.5, 4.5])
+                self.assertEqual(cleaned["shipping_band"].tolist(), ["Cheap", "Costly", "Costly"])
+
+if __name__ == "__main__":
+    unittest.main()
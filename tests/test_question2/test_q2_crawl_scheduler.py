@@ -0,0 +1,61 @@
+import unittest
+
+from question2_data_analysis.crawl_scheduler import BloomFilter, CrawlScheduler
+from tests.test_question2.fixture_server import FixtureServer
+from tests.test_question2.test_q2_scraper import EXPECTED_ROWS
+
+class TestBloomFilter(unittest.TestCase):
+
+    def test_invalid_initiation(self):
+        with self.assertRaises(ValueError):
+            BloomFilter(capacity=0)
+        with self.assertRaises(ValueError):
+            BloomFilter(error_rate=1.5)
+
+    def test_add_and_contains(self):
+        bloom = BloomFilter(capacity=1000, error_rate=0.01)
+        urls = [f"http://example.com/book_{i}/index.html" for i in range(1000)]
+        self.assertTrue(all(bloom.add(url) for url in urls[:500]))
+        # No false negatives
+        self.assertTrue(all(url in bloom for url in urls[:500]))
+        self.assertFalse(bloom.add(urls[0]))
+        false_positives = sum(url in bloom for url in urls[500:])
+        self.assertLess(false_positives, 25)
+
+class TestCrawlScheduler(unittest.TestCase):
+
+    def setUp(self):
+        self.servers = [FixtureServer(), FixtureServer()]
+        for server in self.servers:
+            server.start()
+
+    def tearDown(self):
+        for server in self.servers:
+            server.stop()
+
+    def test_invalid_initiation(self):
+        with self.assertRaises(ValueError):
+            CrawlScheduler([self.servers[0].base_url], host_concurrency=0)
+
+    def test_crawl_mirrors(self):
+        scheduler = CrawlScheduler(
+            [server.base_url for server in self.servers],
+            pages=2,
+            host_concurrency=2,
+            host_requests_per_second=1000
+        )
+        rows = list(scheduler.crawl())
+        self.assertEqual(sorted(rows), sorted(EXPECTED_ROWS * 2))
+        self.assertEqual(len(scheduler.hosts), 2)
+        for server in self.servers:
+            self.assertEqual(len(server.requested_paths), 7)
+
+    def test_duplicate_urls_are_fetched_once(self):
+        server = self.servers[0]
+        scheduler = CrawlScheduler([server.base_url, server.base_url], pages=2, host_requests_per_second=1000)
+        rows = list(scheduler.crawl())
+        self.assertEqual(sorted(rows), sorted(EXPECTED_ROWS))
+        self.assertEqual(len(server.requested_paths), len(set(server.requested_paths)))
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,161 @@
+import os
+import shutil
+import tempfile
+import unittest
+from contextlib import redirect_stdout
+from io import StringIO
+from unittest import mock
+
+import pandas as pd
+
+from question2_data_analysis import data_cleaner
+from question2_data_analysis.data_cleaner import clean_batch, clean_data, median_from_counts
+
+RAW_FILE = "question2_data_analysis/data/raw/books_data_500.csv"
+CLEANED_FILE = "question2_data_analysis/data/cleaned/cleaned_books_data_500.csv"
+
+# Null values and duplicates spread over several chunks
+RAW_ROWS = """title,price,rating,category,availability
+A,£10.00,One,Poetry,In stock
+B,,Three,Travel,In stock
+A,£10.00,One,Poetry,In stock
+C,£55.50,,Poetry,
+D,£25.00,Five,,In stock
+B,,Three,Travel,In stock
+,£31.20,Two,Travel,Out of stock
+A,£10.00,One,Poetry,In stock
+E,£12.00,Four,Poetry,In stock
+"""
+
+class TestDataCleaner(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.raw_path = os.path.join(self.temp_dir.name, "raw")
+        self.cleaned_path = os.path.join(self.temp_dir.name, "cleaned")
+        os.makedirs(self.raw_path)
+        patcher = mock.patch.multiple(data_cleaner, RAW_DATA_PATH=self.raw_path, CLEANED_DATA_PATH=self.cleaned_path)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def clean(self, file_name, chunksize=None) -> bytes:
+        shutil.rmtree(self.cleaned_path, ignore_errors=True)
+        with redirect_stdout(StringIO()):
+            clean_data(file_name, chunksize=chunksize)
+        with open(os.path.join(self.cleaned_path, "cleaned_" + file_name), "rb") as file:
+            return file.read()
+
+    def test_median_from_counts(self):
+        for values in ([3.0], [1.0, 2.0], [5.0, 1.0, 1.0, 4.0, 2.0], [2.5, 2.5, 7.0, 1.0]):
+            counts = pd.Series(values).value_counts()
+            self.assertEqual(median_from_counts(counts), pd.Series(values).median())
+        self.assertTrue(pd.isna(median_from_counts(pd.Series(dtype=float))))
+
+    def test_chunked_matches_in_memory(self):
+        with open(os.path.join(self.raw_path, "books.csv"), "w", encoding="utf-8") as file:
+            file.write(RAW_ROWS)
+
+        expected = self.clean("books.csv")
+        for chunksize in (1, 2, 4, 100):
+            self.assertEqual(self.clean("books.csv", chunksize), expected)
+
+        cleaned = pd.read_csv(os.path.join(self.cleaned_path, "cleaned_books.csv"))
+        self.assertEqual(len(cleaned), 6)
+        self.assertEqual(cleaned["price"].isna().sum(), 0)
+
+    def test_chunked_scraped_data(self):
+        shutil.copy(RAW_FILE, self.raw_path)
+        with open(CLEANED_FILE, "rb") as file:
+            expected = file.read()
+
+        self.assertEqual(self.clean("books_data_500.csv", chunksize=64), expected)
+
+    def incremental_run(self, file_name) -> str:
+        output = StringIO()
+        with redirect_stdout(output):
+            clean_data(file_name, chunksize=3, incremental=True)
+        return output.getvalue()
+
+    def append_raw(self, file_name, rows):
+        with open(os.path.join(self.raw_path, file_name), "a", encoding="utf-8") as file:
+            file.write(rows)
+
+    def assert_same_as_full_clean(self, file_name):
+        with open(os.path.join(self.cleaned_path, "cleaned_" + file_name), "rb") as file:
+            incremental = file.read()
+        shutil.copytree(self.cleaned_path, self.cleaned_path + "-incremental")
+        self.assertEqual(incremental, self.clean(file_name))
+        shutil.rmtree(self.cleaned_path)
+        shutil.copytree(self.cleaned_path + "-incremental", self.cleaned_path)
+        shutil.rmtree(self.cleaned_path + "-incremental")
+
+    def test_incremental(self):
+        with open(os.path.join(self.raw_path, "books.csv"), "w", encoding="utf-8") as file:
+            file.write(RAW_ROWS)
+
+        self.assertIn("cleaning the whole file", self.incremental_run("books.csv"))
+        self.assert_same_as_full_clean("books.csv")
+        self.assertIn("No new raw rows", self.incremental_run("books.csv"))
+
+        # Duplicates of cleaned rows, a new row and a line that is still being written
+        self.append_raw("books.csv", "A,£10.00,One,Poetry,In stock\nF,£44.00,Three,Travel,In stock\nG,£1")
+        output = self.incremental_run("books.csv")
+        self.assertIn("Cleaned 2 new raw rows, 1 appended", output)
+
+        # The rest of the line and a missing price, the fill medians stay the same
+        self.append_raw("books.csv", "2.00,Two,Travel,In stock\nH,,Three,Travel,In stock\n")
+        self.assertIn("Cleaned 2 new raw rows, 2 appended", self.incremental_run("books.csv"))
+        self.assert_same_as_full_clean("books.csv")
+
+        # A new rating changes the rating median used for the rows already filled
+        self.append_raw("books.csv", "J,£5.00,Five,Travel,In stock\nK,£6.00,Five,Travel,In stock\n")
+        self.assertIn("cleaning the whole file", self.incremental_run("books.csv"))
+        self.assert_same_as_full_clean("books.csv")
+
+    def test_incremental_rewritten_raw(self):
+        with open(os.path.join(self.raw_path, "books.csv"), "w", encoding="utf-8") as file:
+            file.write(RAW_ROWS)
+        self.incremental_run("books.csv")
+
+        with open(os.path.join(self.raw_path, "books.csv"), "w", encoding="utf-8") as file:
+            file.write(RAW_ROWS.replace("£10.00", "£11.00") + "Z,£3.00,One,Poetry,In stock\n")
+        self.assertIn("cleaning the whole file", self.incremental_run("books.csv"))
+        self.assert_same_as_full_clean("books.csv")
+
+    def test_invalid_chunksize(self):
+        output = StringIO()
+        with redirect_stdout(output):
+            clean_data("books.csv", chunksize=0)
+        self.assertIn("Chunk size must be positive value", output.getvalue())
+
+    def test_batch(self):
+        with open(os.path.join(self.raw_path, "books_1.csv"), "w", encoding="utf-8") as file:
+            file.write(RAW_ROWS)
+        with open(os.path.join(self.raw_path, "books_2.csv"), "w", encoding="utf-8") as file:
+            file.write(RAW_ROWS.splitlines()[0] + "\nA,£10.00,One,Poetry,In stock\nZ,£3.00,Two,Travel,In stock\n")
+        # A snapshot without the price column
+        with open(os.path.join(self.raw_path, "books_3.csv"), "w", encoding="utf-8") as file:
+            file.write("title,rating\nA,One\n")
+        expected = self.clean("books_1.csv")
+
+        for workers in (1, 2):
+            shutil.rmtree(self.cleaned_path, ignore_errors=True)
+            with redirect_stdout(StringIO()):
+                summary = clean_batch(workers=workers)
+            self.assertEqual(summary["file"].tolist(), ["books_1.csv", "books_2.csv", "books_3.csv"])
+            self.assertEqual(summary["status"].tolist(), ["ok", "ok", "failed"])
+            self.assertEqual(summary["written"].tolist(), [6, 2, 0])
+            self.assertIn("price", summary.loc[2, "error"])
+            with open(os.path.join(self.cleaned_path, "cleaned_books_1.csv"), "rb") as file:
+                self.assertEqual(file.read(), expected)
+
+            # The row of books_2.csv already cleaned in books_1.csv is not merged again
+            merged = pd.read_csv(os.path.join(self.cleaned_path, "cleaned_books_data_merged.csv"))
+            self.assertEqual(len(merged), 7)
+            self.assertEqual(merged["title"].tolist()[-1], "Z")
+
+if __name__ == "__main__":
+    unittest.main()
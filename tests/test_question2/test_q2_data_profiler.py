@@ -0,0 +1,137 @@
+import os
+import tempfile
+import unittest
+from contextlib import redirect_stdout
+from io import StringIO
+from unittest import mock
+
+import numpy as np
+import pandas as pd
+
+from question2_data_analysis import data_cleaner
+from question2_data_analysis.data_cleaner import clean_data
+from question2_data_analysis.data_profiler import DataProfiler, diff_profiles, load_profile, profile_table
+from tests.test_question2.test_q2_data_cleaner import RAW_ROWS
+
+BOOKS = pd.DataFrame({
+    "title": ["A", "Bb", None, "Dddd", "A"],
+    "price": [10.5, np.nan, 31.2, 55.0, 10.5],
+    "rating": [1, 3, 3, 5, 2],
+    "in_stock": [True, True, False, True, True],
+    "category": pd.Categorical(["Poetry", "Travel", "Poetry", None, "Poetry"]),
+})
+
+class TestDataProfiler(unittest.TestCase):
+
+    def profile(self, df, chunksize=None, **kwargs) -> dict:
+        profiler = DataProfiler(**kwargs)
+        for start in range(0, len(df), chunksize or len(df)):
+            profiler.update(df.iloc[start:start + (chunksize or len(df))])
+        return profiler.snapshot()
+
+    def test_matches_pandas(self):
+        profile = self.profile(BOOKS)
+        self.assertEqual(profile["rows"], 5)
+        for column in BOOKS.columns:
+            self.assertEqual(profile["columns"][column]["nulls"], BOOKS[column].isna().sum())
+            self.assertEqual(profile["columns"][column]["cardinality"], BOOKS[column].nunique())
+
+        price = profile["columns"]["price"]
+        self.assertEqual(price["kind"], "numeric")
+        self.assertEqual((price["min"], price["max"]), (10.5, 55.0))
+        self.assertAlmostEqual(price["mean"], BOOKS["price"].mean())
+        self.assertAlmostEqual(price["std"], BOOKS["price"].std())
+        self.assertTrue(price["quantiles_exact"])
+        for label, quantile in (("25%", 0.25), ("50%", 0.5), ("95%", 0.95)):
+            self.assertAlmostEqual(price["quantiles"][label], BOOKS["price"].quantile(quantile))
+
+        self.assertEqual(profile["columns"]["in_stock"]["mean"], 0.8)
+        self.assertEqual(profile["columns"]["title"]["length"], {"min": 1.0, "max": 4.0, "mean": 2.0})
+        self.assertEqual(profile["columns"]["category"]["kind"], "text")
+
+    def test_chunks_and_merge(self):
+        expected = self.profile(BOOKS)
+        self.assertEqual(self.profile(BOOKS, chunksize=2), expected)
+
+        first, second = DataProfiler(), DataProfiler()
+        first.update(BOOKS.iloc[:3])
+        second.update(BOOKS.iloc[3:])
+        first.merge(second)
+        self.assertEqual(first.snapshot(), expected)
+
+        with self.assertRaises(ValueError):
+            first.update(BOOKS.assign(price="free"))
+
+    def test_large_column(self):
+        generator = np.random.default_rng(1)
+        df = pd.DataFrame({"value": generator.normal(size=50000), "key": generator.integers(0, 20000, 50000)})
+        profile = self.profile(df, chunksize=7000, sample_size=2000, sketch_size=512)
+        value = profile["columns"]["value"]
+        self.assertFalse(value["quantiles_exact"])
+        self.assertAlmostEqual(value["quantiles"]["50%"], df["value"].median(), delta=0.1)
+        self.assertAlmostEqual(value["mean"], df["value"].mean())
+        key = profile["columns"]["key"]
+        self.assertFalse(key["cardinality_exact"])
+        self.assertAlmostEqual(key["cardinality"] / df["key"].nunique(), 1, delta=0.15)
+
+    def test_empty_column(self):
+        profile = self.profile(pd.DataFrame({"price": [np.nan, np.nan]}))
+        self.assertEqual(profile["columns"]["price"]["null_fraction"], 1.0)
+        self.assertIsNone(profile["columns"]["price"]["quantiles"]["50%"])
+        self.assertEqual(profile_table(profile).loc["price", "nulls"], 2)
+
+    def test_diff(self):
+        before = self.profile(BOOKS)
+        worse = BOOKS.drop(columns="in_stock").assign(rating=[np.nan, np.nan, 3, 5, 2], price=[100.0] * 5).head(4)
+        diff = diff_profiles(before, self.profile(worse))
+        self.assertEqual(diff["rows"], [5, 4])
+        self.assertEqual(diff["removed_columns"], ["in_stock"])
+        self.assertEqual(diff["changes"]["price"]["max"], [55.0, 100.0])
+        self.assertEqual(diff["regressions"], [
+            "in_stock: column removed", "rows: 5 -> 4", "title: null fraction 0.200 -> 0.250", "price: mean 26.8 -> 100",
+            "rating: null fraction 0.000 -> 0.500", "rating: mean 2.8 -> 4", "category: null fraction 0.200 -> 0.250",
+        ])
+        self.assertEqual(diff_profiles(before, before)["regressions"], [])
+
+class TestCleanProfile(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.raw_path = os.path.join(self.temp_dir.name, "raw")
+        self.cleaned_path = os.path.join(self.temp_dir.name, "cleaned")
+        os.makedirs(self.raw_path)
+        patcher = mock.patch.multiple(data_cleaner, RAW_DATA_PATH=self.raw_path, CLEANED_DATA_PATH=self.cleaned_path)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def clean(self, rows, **kwargs) -> str:
+        with open(os.path.join(self.raw_path, "books.csv"), "w", encoding="utf-8") as file:
+            file.write(rows)
+        output = StringIO()
+        with redirect_stdout(output):
+            clean_data("books.csv", **kwargs)
+        return output.getvalue()
+
+    def test_profile_saved(self):
+        self.clean(RAW_ROWS)
+        profile_path = os.path.join(self.cleaned_path, "cleaned_books.profile.json")
+        expected = load_profile(profile_path)
+        self.assertEqual(expected["before"]["columns"]["price"]["nulls"], 2)
+        self.assertEqual(expected["after"]["columns"]["price"]["nulls"], 0)
+        self.assertEqual(expected["after"]["rows"], 6)
+
+        self.clean(RAW_ROWS, chunksize=2)
+        chunked = load_profile(profile_path)
+        self.assertEqual(chunked["since_last_clean"]["regressions"], [])
+        self.assertEqual(chunked["after"]["columns"]["price"], expected["after"]["columns"]["price"])
+
+        # A broken scrape loses most rows
+        output = self.clean("\n".join(RAW_ROWS.splitlines()[:3]) + "\n")
+        self.assertIn("Data quality regressions since the last clean", output)
+        self.assertIn("rows: 6 -> 2", output)
+
+if __name__ == "__main__":
+    unittest.main()
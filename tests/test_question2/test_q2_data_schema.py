@@ -0,0 +1,53 @@
+import unittest
+
+import numpy as np
+import pandas as pd
+
+from question2_data_analysis.data_schema import apply_schema, categories_by_appearance, memory_per_row
+
+class TestDataSchema(unittest.TestCase):
+
+    def cleaned_frame(self, ratings):
+        size = len(ratings)
+        return pd.DataFrame({
+            "title": [f"Book {index}" for index in range(size)],
+            "price": np.linspace(10, 50, size),
+            "rating": ratings,
+            "category": ["Poetry", "Travel"] * (size // 2),
+            "availability": ["In stock"] * size,
+            "price_category": ["Budget", "Premium"] * (size // 2),
+            "in_stock": [True] * size,
+        })
+
+    def test_compact_types(self):
+        df = self.cleaned_frame([1.0, 3.0, 5.0, 2.0] * 50)
+        memory_before = memory_per_row(df)
+        df = apply_schema(df)
+
+        self.assertEqual(df["rating"].dtype, np.int8)
+        self.assertEqual(df["price"].dtype, np.float64)
+        self.assertEqual(df["category"].dtype, "category")
+        self.assertEqual(df["availability"].dtype, "category")
+        self.assertTrue(df["price_category"].cat.ordered)
+        self.assertEqual(df["price_category"].cat.categories.tolist(), ["Budget", "Mid-range", "Premium"])
+        self.assertEqual(df["in_stock"].dtype, bool)
+        self.assertLess(memory_per_row(df), memory_before)
+
+    def test_half_star_and_float32_price(self):
+        df = apply_schema(self.cleaned_frame([1.0, 3.5]), float32_price=True)
+        self.assertEqual(df["rating"].dtype, np.float32)
+        self.assertEqual(df["price"].dtype, np.float32)
+        self.assertEqual(apply_schema(self.cleaned_frame([1.0, 3.5]), integer_rating=True)["rating"].tolist(), [1, 3])
+
+    def test_subset_of_columns(self):
+        df = apply_schema(pd.DataFrame({"price": [1.5], "category": ["Poetry"]}))
+        self.assertEqual(df.columns.tolist(), ["price", "category"])
+
+    def test_categories_by_appearance(self):
+        values = pd.Series(["b", "a", "c", "a", "c", "b", "d"])
+        series = categories_by_appearance(values.astype("category"))
+        self.assertEqual(series.cat.categories.tolist(), ["b", "a", "c", "d"])
+        self.assertEqual(series.value_counts().index.tolist(), values.value_counts().index.tolist())
+
+if __name__ == "__main__":
+    unittest.main()
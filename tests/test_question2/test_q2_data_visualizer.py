@@ -0,0 +1,36 @@
+import os
+import unittest
+from contextlib import redirect_stdout
+from io import StringIO
+from unittest import mock
+
+import pandas as pd
+import plotly.graph_objects as go
+
+from question2_data_analysis.data_visualizer import CLEANED_DATA_PATH, bar_avg_rating_top8, interactive_bar_avg_rating_selector
+from question2_data_analysis.dataset_io import load_cleaned
+
+CLEANED_FILE = os.path.join(CLEANED_DATA_PATH, "cleaned_books_data_500.csv")
+
+class TestDataVisualizer(unittest.TestCase):
+
+    def chart(self, plot, df) -> go.Figure:
+        with mock.patch.object(go.Figure, "write_html", autospec=True) as write_html, redirect_stdout(StringIO()):
+            plot(df)
+        return write_html.call_args[0][0]
+
+    def test_rating_ranking_matches_csv(self):
+        # The loaded category column is a categorical ordered by first appearance, the CSV one is plain strings
+        loaded = load_cleaned(CLEANED_FILE, columns=["price", "rating", "category"])
+        self.assertEqual(loaded["category"].dtype, "category")
+        expected = pd.read_csv(CLEANED_FILE)
+        for plot in (interactive_bar_avg_rating_selector, bar_avg_rating_top8):
+            for trace, expected_trace in zip(self.chart(plot, loaded).data, self.chart(plot, expected).data):
+                self.assertEqual(list(trace.x), list(expected_trace.x))
+                self.assertEqual(list(trace.y), list(expected_trace.y))
+
+        top5 = self.chart(interactive_bar_avg_rating_selector, loaded).data[0]
+        self.assertEqual(list(top5.x), ["Historical", "Novels", "Erotica", "Christian Fiction", "Health"])
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,228 @@
+import multiprocessing
+import os
+import shutil
+import tempfile
+import unittest
+from contextlib import redirect_stdout
+from io import StringIO
+from unittest import mock
+
+import numpy as np
+import pandas as pd
+
+from question2_data_analysis import data_cleaner, dataset_io
+from question2_data_analysis.data_cleaner import clean_data
+from question2_data_analysis.dataset_io import (PYARROW_AVAILABLE, DatasetCache, columnar_path, file_signature, load_cleaned,
+                                                load_mapped, mapped_path, mapped_version_path)
+from tests.test_question2.test_q2_data_cleaner import RAW_FILE
+
+def load_mapped_rounds(csv_path: str, index: int, rounds: int, barrier, results) -> None:
+    # Every round starts on a cold cache: both processes find no copy and write one at the same time
+    expected = load_cleaned(csv_path)
+    errors = []
+    for _ in range(rounds):
+        barrier.wait()
+        try:
+            if not load_cleaned(csv_path, mapped=True).equals(expected):
+                errors.append("different frame")
+        except Exception as e:
+            errors.append(repr(e))
+        barrier.wait()
+        if index == 0:
+            shutil.rmtree(mapped_path(csv_path))
+        barrier.wait()
+    results.put(errors)
+
+@unittest.skipUnless(PYARROW_AVAILABLE, "pyarrow is not installed")
+class TestDatasetIO(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.raw_path = os.path.join(self.temp_dir.name, "raw")
+        self.cleaned_path = os.path.join(self.temp_dir.name, "cleaned")
+        os.makedirs(self.raw_path)
+        shutil.copy(RAW_FILE, self.raw_path)
+        self.csv_path = os.path.join(self.cleaned_path, "cleaned_books_data_500.csv")
+        patcher = mock.patch.multiple(data_cleaner, RAW_DATA_PATH=self.raw_path, CLEANED_DATA_PATH=self.cleaned_path)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def clean(self, **kwargs):
+        with redirect_stdout(StringIO()):
+            clean_data("books_data_500.csv", **kwargs)
+
+    def test_columnar_copy(self):
+        for chunksize in (None, 64):
+            self.clean(chunksize=chunksize, columnar=True)
+            expected = pd.read_csv(self.csv_path)
+
+            df = load_cleaned(self.csv_path)
+            self.assertEqual(df["category"].dtype, "category")
+            self.assertEqual(df["price_category"].dtype, "category")
+            self.assertEqual(df["in_stock"].dtype, bool)
+            self.assertEqual(df["rating"].dtype, "int8")
+            text_columns = {"category": str, "availability": str, "price_category": str}
+            pd.testing.assert_frame_equal(df.astype(text_columns), expected, check_dtype=False)
+            # Ties in value_counts break by first appearance, like the CSV values
+            self.assertEqual(df["category"].value_counts().index.tolist(), expected["category"].value_counts().index.tolist())
+
+    def test_projection(self):
+        self.clean(columnar=True)
+        # The in-memory mode also saves the memory-mappable copy
+        pd.testing.assert_frame_equal(load_mapped(self.csv_path), load_cleaned(self.csv_path))
+        df = load_cleaned(self.csv_path, columns=["price", "category"])
+        self.assertEqual(df.columns.tolist(), ["price", "category"])
+
+    def test_stale_copy(self):
+        self.clean(columnar=True)
+        # The CSV file is rewritten without a new Parquet copy
+        pd.read_csv(self.csv_path).head(10).to_csv(self.csv_path, index=False)
+        os.utime(columnar_path(self.csv_path), (0, 0))
+        self.assertEqual(len(load_cleaned(self.csv_path)), 10)
+
+    def test_without_pyarrow(self):
+        self.clean(columnar=True)
+        with mock.patch.object(dataset_io, "PYARROW_AVAILABLE", False):
+            df = load_cleaned(self.csv_path, columns=["price"])
+        self.assertEqual(df.columns.tolist(), ["price"])
+        self.assertEqual(len(df), len(pd.read_csv(self.csv_path)))
+
+class TestMappedCopy(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.csv_path = os.path.join(self.temp_dir.name, "cleaned_books.csv")
+        pd.DataFrame({
+            "title": ["A", None, "Été"],
+            "price": [10.5, 31.2, 55.0],
+            "rating": [1, 3, 5],
+            "category": ["Poetry", "Travel", "Poetry"],
+            "in_stock": [True, False, True],
+        }).to_csv(self.csv_path, index=False)
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def mapped_base(self, array: np.ndarray) -> np.memmap:
+        base = array
+        while base.base is not None and not isinstance(base, np.memmap):
+            base = base.base
+        self.assertIsInstance(base, np.memmap)
+        return base
+
+    def test_same_as_load(self):
+        expected = load_cleaned(self.csv_path)
+        self.assertIsNone(load_mapped(self.csv_path))
+        pd.testing.assert_frame_equal(load_cleaned(self.csv_path, mapped=True), expected)
+        self.assertTrue(os.path.isdir(mapped_path(self.csv_path)))
+
+        df = load_mapped(self.csv_path)
+        pd.testing.assert_frame_equal(df, expected)
+        # The numeric and boolean values and the codes inside the categorical are the mapped memory
+        for array in (df["price"].to_numpy(), df["rating"].to_numpy(), df["in_stock"].to_numpy(), df["category"].array.codes):
+            self.assertTrue(np.shares_memory(array, self.mapped_base(array)))
+        # Copy-on-write, the mapped files are not changed
+        df.loc[0, "price"] = 1.0
+        self.assertEqual(load_mapped(self.csv_path).loc[0, "price"], 10.5)
+
+        df = load_cleaned(self.csv_path, columns=["category", "price"], float32_price=True, mapped=True)
+        self.assertEqual(df.columns.tolist(), ["category", "price"])
+        self.assertEqual(df["price"].dtype, np.float32)
+        with self.assertRaises(ValueError):
+            load_mapped(self.csv_path, columns=["isbn"])
+
+    def test_concurrent_cold_start(self):
+        context = multiprocessing.get_context("spawn")
+        barrier = context.Barrier(2)
+        results = context.Queue()
+        processes = [context.Process(target=load_mapped_rounds, args=(self.csv_path, index, 20, barrier, results))
+                     for index in range(2)]
+        for process in processes:
+            process.start()
+        errors = [results.get(timeout=120) for _ in processes]
+        for process in processes:
+            process.join()
+        self.assertEqual(errors, [[], []])
+
+    def test_stale_copy(self):
+        load_cleaned(self.csv_path, mapped=True)
+        pd.read_csv(self.csv_path).head(1).to_csv(self.csv_path, index=False)
+        self.assertIsNone(load_mapped(self.csv_path))
+        self.assertEqual(len(load_cleaned(self.csv_path, mapped=True)), 1)
+        # Only the copy of the current version is kept
+        self.assertEqual(os.listdir(mapped_path(self.csv_path)), [os.path.basename(mapped_version_path(self.csv_path, file_signature(self.csv_path)))])
+
+    def test_read_only_folder(self):
+        expected = load_cleaned(self.csv_path, columns=["price", "category"])
+        with redirect_stdout(StringIO()):
+            with mock.patch.object(dataset_io, "write_mapped", side_effect=PermissionError("read-only")):
+                pd.testing.assert_frame_equal(load_cleaned(self.csv_path, columns=["price", "category"], mapped=True), expected)
+            self.assertFalse(os.path.exists(mapped_path(self.csv_path)))
+            # The copy was removed by another process right after it was saved
+            with mock.patch.object(dataset_io, "load_mapped", return_value=None):
+                pd.testing.assert_frame_equal(load_cleaned(self.csv_path, columns=["price", "category"], mapped=True), expected)
+
+    def test_empty(self):
+        pd.read_csv(self.csv_path).head(0).to_csv(self.csv_path, index=False)
+        load_cleaned(self.csv_path, mapped=True)
+        self.assertEqual(load_mapped(self.csv_path).columns.tolist(), pd.read_csv(self.csv_path).columns.tolist())
+
+class TestDatasetCache(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.csv_paths = [os.path.join(self.temp_dir.name, f"cleaned_books_{index}.csv") for index in range(2)]
+        for csv_path in self.csv_paths:
+            pd.DataFrame({
+                "price": np.linspace(1, 100, 1000),
+                "rating": np.arange(1000) % 5 + 1,
+                "category": ["Poetry", "Travel"] * 500,
+            }).to_csv(csv_path, index=False)
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def test_hits_and_columns(self):
+        cache = DatasetCache()
+        with mock.patch.object(dataset_io, "load_cleaned", wraps=load_cleaned) as loader:
+            df = cache.load(self.csv_paths[0], columns=["price", "rating"])
+            # Another stage asks for the same columns in another order, then for one more column
+            pd.testing.assert_frame_equal(cache.load(self.csv_paths[0], columns=["rating", "price"]), df[["rating", "price"]])
+            self.assertEqual(loader.call_count, 1)
+            df = cache.load(self.csv_paths[0], columns=["category", "price"])
+            self.assertEqual(loader.call_args.kwargs["columns"], ["category"])
+            pd.testing.assert_frame_equal(df, load_cleaned(self.csv_paths[0])[["category", "price"]])
+            self.assertEqual((cache.hits, cache.misses), (1, 2))
+
+            # The caller's changes don't reach the cache
+            df["price"] = 0.0
+            self.assertEqual(cache.load(self.csv_paths[0], columns=["price"])["price"].iloc[-1], 100.0)
+
+            # A rewritten file is loaded again
+            pd.read_csv(self.csv_paths[0]).head(10).to_csv(self.csv_paths[0], index=False)
+            self.assertEqual(len(cache.load(self.csv_paths[0], columns=["price"])), 10)
+
+    def test_lru_eviction(self):
+        size = int(load_cleaned(self.csv_paths[0]).memory_usage(deep=True).sum())
+        cache = DatasetCache(max_bytes=int(size * 1.5))
+        cache.load(self.csv_paths[0])
+        cache.load(self.csv_paths[1])
+        cache.load(self.csv_paths[1])
+        self.assertEqual(cache.hits, 1)
+        cache.load(self.csv_paths[0])
+        self.assertEqual(cache.misses, 3)
+
+        # A dataset over the limit is returned but not kept
+        small = DatasetCache(max_bytes=size // 2)
+        self.assertEqual(len(small.load(self.csv_paths[0])), 1000)
+        small.load(self.csv_paths[0])
+        self.assertEqual(small.hits, 0)
+
+        with self.assertRaises(ValueError):
+            DatasetCache(max_bytes=0)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,71 @@
+import unittest
+
+from question2_data_analysis.data_scraper import fetch_with_retries
+from question2_data_analysis.http_session import (
+    MAX_BACKOFF,
+    backoff_delay,
+    create_session,
+    is_retryable_status,
+    parse_retry_after,
+)
+from question2_data_analysis.rate_limiter import TokenBucket
+from tests.test_question2.fixture_server import FixtureServer
+
+class TestHttpSession(unittest.TestCase):
+
+    def setUp(self):
+        self.server = FixtureServer()
+        self.server.start()
+        self.session = create_session(pool_size=2)
+        self.rate_limiter = TokenBucket(1000)
+
+    def tearDown(self):
+        self.session.close()
+        self.server.stop()
+
+    def fetch(self, path):
+        return fetch_with_retries(
+            self.server.url + path.lstrip("/"),
+            rate_limiter=self.rate_limiter,
+            session=self.session,
+            backoff_base=0.01
+        )
+
+    def test_client_error_is_not_retried(self):
+        self.assertIsNone(self.fetch("/catalogue/missing.html"))
+        self.assertEqual(len(self.server.requested_paths), 1)
+
+    def test_server_error_is_retried(self):
+        self.server.fail("/catalogue/page-1.html", [503, 500], {"Retry-After": "0"})
+        html = self.fetch("/catalogue/page-1.html")
+        self.assertIn("A Light in the Attic", html)
+        self.assertEqual(len(self.server.requested_paths), 3)
+
+    def test_retry_budget_is_limited(self):
+        self.server.fail("/catalogue/page-1.html", [429, 429, 429, 429])
+        self.assertIsNone(self.fetch("/catalogue/page-1.html"))
+        self.assertEqual(len(self.server.requested_paths), 3)
+
+    def test_retryable_status(self):
+        self.assertTrue(is_retryable_status(503))
+        self.assertTrue(is_retryable_status(429))
+        self.assertFalse(is_retryable_status(404))
+
+    def test_parse_retry_after(self):
+        self.assertEqual(parse_retry_after("5"), 5.0)
+        self.assertEqual(parse_retry_after("100000"), MAX_BACKOFF)
+        self.assertEqual(parse_retry_after("Wed, 21 Oct 2015 07:28:00 GMT"), 0.0)
+        self.assertIsNone(parse_retry_after("soon"))
+        self.assertIsNone(parse_retry_after(None))
+
+    def test_backoff_delay_grows(self):
+        for attempt in range(1, 5):
+            self.assertLessEqual(backoff_delay(attempt, base=1.0), 2 ** (attempt - 1))
+        self.assertLessEqual(backoff_delay(20, base=1.0), MAX_BACKOFF)
+
+    def test_invalid_pool_size(self):
+        with self.assertRaises(ValueError):
+            create_session(pool_size=0)
+
+if __name__ == "__main__":
+    unittest.main()
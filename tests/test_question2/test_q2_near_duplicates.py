@@ -0,0 +1,115 @@
+import os
+import tempfile
+import unittest
+from contextlib import redirect_stdout
+from io import StringIO
+from unittest import mock
+
+import numpy as np
+import pandas as pd
+
+from question2_data_analysis import data_cleaner
+from question2_data_analysis.data_cleaner import clean_data
+from question2_data_analysis.near_duplicates import (duplicate_report, find_duplicate_clusters, key_hashes,
+                                                     lsh_pairs, minhash_signatures, normalize_text)
+
+BOOKS = pd.DataFrame({
+    "title": ["A Light in the Attic", "A Light in the Attic ", "a light in the attic!", "Tipping the Velvet",
+              "Tiping the Velvet", "Tipping the Velvet", "Unknown", "Unknown", "Soumission"],
+    "price": [51.77, 51.77, 49.99, 53.74, 53.74, 20.00, 10.00, 12.00, 50.10],
+    "category": ["Poetry", "Poetry", "Poetry", "Historical Fiction", "Historical Fiction", "Fiction",
+                 "Travel", "Travel", "Fiction"],
+})
+
+# The same book scraped again with a trailing space and a new price
+RAW_ROWS = """title,price,rating,category,availability
+A,£10.00,One,Poetry,In stock
+B,£22.00,Three,Travel,In stock
+A ,£11.00,One,Poetry,In stock
+C,£55.50,Two,Poetry,In stock
+b,£22.00,Three,Travel,In stock
+A,£10.00,One,Poetry,In stock
+"""
+
+class TestNearDuplicates(unittest.TestCase):
+
+    def test_normalize_text(self):
+        texts = pd.Series(["  The  Grand-Design! ", None, "ÉTÉ"])
+        self.assertEqual(normalize_text(texts).tolist(), ["the grand design", "", "été"])
+
+    def test_key_clusters(self):
+        clusters = find_duplicate_clusters(BOOKS)
+        # Case, punctuation and spaces are ignored, the category is part of the key
+        self.assertEqual(clusters.tolist(), [0, 0, 0, 3, 4, 5, 6, 7, 8])
+
+    def test_unknown_titles(self):
+        # Filled titles only match identical rows
+        self.assertNotEqual(*key_hashes(BOOKS.iloc[[6, 7]]))
+        self.assertEqual(*key_hashes(BOOKS.iloc[[6, 6]]))
+
+    def test_fuzzy_clusters(self):
+        clusters = find_duplicate_clusters(BOOKS, fuzzy=True, threshold=0.5)
+        # The typo is linked in the same category only
+        self.assertEqual(clusters.tolist(), [0, 0, 0, 3, 3, 5, 6, 7, 8])
+
+    def test_signatures(self):
+        texts = pd.Series(["the grand design", "the grand design", "sapiens"])
+        signatures = minhash_signatures(texts, num_perm=32)
+        self.assertEqual(signatures.shape, (3, 32))
+        np.testing.assert_array_equal(signatures[0], signatures[1])
+        self.assertLess((signatures[0] == signatures[2]).mean(), 0.5)
+
+        first, second = lsh_pairs(signatures, bands=8)
+        self.assertEqual(set(zip(first.tolist(), second.tolist())), {(0, 1)})
+        with self.assertRaises(ValueError):
+            lsh_pairs(signatures, bands=5)
+
+    def test_report(self):
+        report = duplicate_report(BOOKS, find_duplicate_clusters(BOOKS))
+        self.assertEqual(len(report), 1)
+        row = report.iloc[0]
+        self.assertEqual(row["kept_title"], "A Light in the Attic")
+        self.assertEqual(row["size"], 3)
+        self.assertEqual((row["min_price"], row["max_price"]), (49.99, 51.77))
+
+class TestCleanDedup(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.raw_path = os.path.join(self.temp_dir.name, "raw")
+        self.cleaned_path = os.path.join(self.temp_dir.name, "cleaned")
+        os.makedirs(self.raw_path)
+        with open(os.path.join(self.raw_path, "books.csv"), "w", encoding="utf-8") as file:
+            file.write(RAW_ROWS)
+        patcher = mock.patch.multiple(data_cleaner, RAW_DATA_PATH=self.raw_path, CLEANED_DATA_PATH=self.cleaned_path)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def clean(self, **kwargs) -> bytes:
+        with redirect_stdout(StringIO()):
+            clean_data("books.csv", **kwargs)
+        with open(os.path.join(self.cleaned_path, "cleaned_books.csv"), "rb") as file:
+            return file.read()
+
+    def test_key_dedup(self):
+        self.assertEqual(len(pd.read_csv(StringIO(self.clean().decode("utf-8-sig")))), 5)
+
+        expected = self.clean(dedup="key")
+        cleaned = pd.read_csv(StringIO(expected.decode("utf-8-sig")))
+        self.assertEqual(cleaned["title"].tolist(), ["A", "B", "C"])
+        for chunksize in (1, 2, 100):
+            self.assertEqual(self.clean(dedup="key", chunksize=chunksize), expected)
+
+    def test_fuzzy_needs_in_memory(self):
+        output = StringIO()
+        with redirect_stdout(output):
+            clean_data("books.csv", chunksize=2, dedup="fuzzy")
+        self.assertIn("in-memory", output.getvalue())
+        with self.assertRaises(ValueError):
+            clean_data("books.csv", dedup="similar")
+
+if __name__ == "__main__":
+    unittest.main()
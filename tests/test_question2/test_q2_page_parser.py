@@ -0,0 +1,51 @@
+import os
+import unittest
+
+from question2_data_analysis.page_parser import (
+    available_backends,
+    benchmark_backends,
+    make_soup,
+    parse_breadcrumb_category,
+    parse_category_links,
+    parse_listing,
+)
+from tests.test_question2.fixture_server import FIXTURES_PATH
+
+def read_fixture(path):
+    with open(os.path.join(FIXTURES_PATH, "catalogue", path), encoding="utf-8") as file:
+        return file.read()
+
+class TestPageParser(unittest.TestCase):
+
+    def setUp(self):
+        self.listing = read_fixture("page-1.html")
+        self.detail = read_fixture("soumission_998/index.html")
+        self.base_url = "http://example.com/catalogue/"
+
+    def test_backends_extract_the_same_data(self):
+        for backend in available_backends():
+            entries, next_url = parse_listing(self.listing, self.base_url, backend)
+            self.assertEqual(len(entries), 3)
+            self.assertEqual(entries[2], [
+                "Soumission", "£50.10", "One",
+                "http://example.com/catalogue/soumission_998/index.html", "In stock"
+            ])
+            self.assertEqual(next_url, "http://example.com/catalogue/page-2.html")
+            self.assertEqual(parse_breadcrumb_category(self.detail, backend), "Fiction")
+            self.assertEqual(parse_category_links(self.listing, self.base_url, backend)[0],
+                             ("Poetry", "http://example.com/catalogue/category/books/poetry_23/index.html"))
+
+    def test_last_page_has_no_next_url(self):
+        self.assertIsNone(parse_listing(read_fixture("page-2.html"), self.base_url)[1])
+
+    def test_invalid_backend(self):
+        with self.assertRaises(ValueError):
+            make_soup(self.listing, "html5lib")
+
+    def test_benchmark(self):
+        results = benchmark_backends([self.listing], [self.detail], repeat=1)
+        self.assertEqual(list(results), available_backends())
+        self.assertGreater(results["html.parser"]["listing_ms"], 0)
+
+if __name__ == "__main__":
+    unittest.main()
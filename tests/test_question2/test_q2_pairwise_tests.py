@@ -0,0 +1,73 @@
+import unittest
+
+import numpy as np
+import pandas as pd
+
+from scipy import stats
+from question2_data_analysis.pairwise_tests import adjust_p_values, pairwise_mann_whitney, pairwise_tests, pairwise_welch
+from question2_data_analysis.streaming_stats import GroupedStatistics
+
+def prices(seed: int) -> pd.DataFrame:
+    generator = np.random.default_rng(seed)
+    categories = np.array(["Fiction", "Poetry", "Travel", "History", "Art"])
+    rows = 600
+    category = categories[generator.integers(0, len(categories), rows)]
+    # Rounded prices have ties, Travel is more expensive
+    price = np.round(generator.normal(30, 8, rows) + 6 * (category == "Travel"), 0)
+    return pd.DataFrame({"category": np.append(category, "Single"), "price": np.append(price, 12.0)})
+
+class TestPairwiseTests(unittest.TestCase):
+
+    def setUp(self):
+        self.df = prices(5)
+        self.statistics = GroupedStatistics()
+        for start in range(0, len(self.df), 150):
+            chunk = self.df.iloc[start:start + 150]
+            self.statistics.update(chunk["category"], chunk["price"])
+
+    def sample(self, category) -> pd.Series:
+        return self.df.loc[self.df["category"] == category, "price"]
+
+    def test_adjust_p_values(self):
+        p_values = np.array([0.01, 0.04, 0.03, 0.2, np.nan])
+        np.testing.assert_allclose(adjust_p_values(p_values, "holm"), [0.04, 0.09, 0.09, 0.2, np.nan])
+        np.testing.assert_allclose(adjust_p_values(p_values, "bh"), [0.04, 0.16 / 3, 0.16 / 3, 0.2, np.nan])
+        np.testing.assert_allclose(adjust_p_values(p_values, "none"), p_values)
+        self.assertEqual(adjust_p_values(np.array([0.5, 0.9]), "holm").tolist(), [1.0, 1.0])
+        with self.assertRaises(ValueError):
+            adjust_p_values(p_values, "bonferroni")
+
+    def test_welch_matches_scipy(self):
+        table = pairwise_welch(self.statistics)
+        # The group with a single price has no variance and is left out
+        self.assertEqual(len(table), 10)
+        self.assertNotIn("Single", table["group_a"].tolist() + table["group_b"].tolist())
+        for row in table.itertuples():
+            t_stat, p_value = stats.ttest_ind(self.sample(row.group_a), self.sample(row.group_b), equal_var=False)
+            self.assertAlmostEqual(row.t_stat, t_stat)
+            self.assertAlmostEqual(row.p_value, p_value)
+
+    def test_mann_whitney_matches_scipy(self):
+        table = pairwise_mann_whitney(self.statistics, groups=["Travel", "Poetry", "Art"])
+        self.assertEqual(list(zip(table["group_a"], table["group_b"])), [("Travel", "Poetry"), ("Travel", "Art"), ("Poetry", "Art")])
+        for row in table.itertuples():
+            result = stats.mannwhitneyu(self.sample(row.group_a), self.sample(row.group_b), method="asymptotic")
+            self.assertAlmostEqual(row.u_stat, result.statistic)
+            self.assertAlmostEqual(row.p_value, result.pvalue)
+
+    def test_table(self):
+        table = pairwise_tests(self.statistics, mann_whitney=True, correction="bh")
+        self.assertTrue(table["p_value"].is_monotonic_increasing)
+        self.assertTrue((table["p_adjusted"] >= table["p_value"]).all())
+        self.assertTrue((table["mw_p_adjusted"] >= table["mw_p_value"]).all())
+        travel = table[(table["group_a"] == "Travel") | (table["group_b"] == "Travel")]
+        self.assertTrue(travel["significant"].all())
+        self.assertEqual(table.loc[0, "significant"], table.loc[0, "p_adjusted"] < 0.05)
+
+        with self.assertRaises(ValueError):
+            pairwise_tests(self.statistics, groups=["Travel", "Comics"])
+        with self.assertRaises(ValueError):
+            pairwise_tests(self.statistics, alpha=0)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,66 @@
+import os
+import threading
+import time
+import unittest
+
+from question2_data_analysis.data_scraper import scrape_data
+from question2_data_analysis.page_parser import parse_breadcrumb_category
+from question2_data_analysis.parse_pipeline import ParsePipeline
+from tests.test_question2.fixture_server import FIXTURES_PATH, FixtureServer
+from tests.test_question2.test_q2_scraper import EXPECTED_ROWS
+
+def slow_upper(html: str) -> str:
+    time.sleep(0.3)
+    return html.upper()
+
+class TestParsePipeline(unittest.TestCase):
+
+    def test_invalid_initiation(self):
+        with self.assertRaises(ValueError):
+            ParsePipeline(parse_workers=0)
+        with self.assertRaises(ValueError):
+            ParsePipeline(parse_workers=1, max_pending=0)
+
+    def test_parse_in_process_pool(self):
+        with open(os.path.join(FIXTURES_PATH, "catalogue", "sharp-objects_997", "index.html"), encoding="utf-8") as file:
+            html = file.read()
+
+        results = []
+        with ParsePipeline(parse_workers=2, max_pending=1) as pipeline:
+            # More fetcher threads than pending slots, the extra threads wait for a slot
+            threads = [
+                threading.Thread(target=lambda: results.append(pipeline.parse(parse_breadcrumb_category, html)))
+                for _ in range(4)
+            ]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+        self.assertEqual(results, ["Mystery"] * 4)
+
+    def test_submit_does_not_wait_for_the_parse(self):
+        with ParsePipeline(parse_workers=1, max_pending=2) as pipeline:
+            pipeline.parse(slow_upper, "warm up")
+            started = time.monotonic()
+            futures = [pipeline.submit(slow_upper, "a"), pipeline.submit(slow_upper, "b")]
+            # The fetcher goes on while its pages are parsed
+            self.assertLess(time.monotonic() - started, 0.2)
+            # The queue is full, the third page waits until a parse is finished
+            futures.append(pipeline.submit(slow_upper, "c"))
+            self.assertTrue(futures[0].done())
+            self.assertEqual([future.result() for future in futures], ["A", "B", "C"])
+
+    def test_scrape_with_parse_workers(self):
+        server = FixtureServer()
+        server.start()
+        try:
+            # One fetcher also hands its pages to the pipeline and keeps fetching
+            for workers in (3, 1):
+                rows = scrape_data(2, workers=workers, requests_per_second=1000, base_url=server.base_url,
+                                   detail_base_url=server.detail_base_url, parse_workers=2)
+                self.assertEqual(rows, EXPECTED_ROWS)
+        finally:
+            server.stop()
+
+if __name__ == "__main__":
+    unittest.main()
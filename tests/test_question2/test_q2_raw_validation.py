@@ -0,0 +1,124 @@
+import os
+import shutil
+import tempfile
+import unittest
+from contextlib import redirect_stdout
+from io import StringIO
+from unittest import mock
+
+import pandas as pd
+
+from question2_data_analysis import data_cleaner
+from question2_data_analysis.data_cleaner import DEFAULT_RULES, clean_data
+from question2_data_analysis.raw_validation import RawValidator
+from tests.test_question2.test_q2_data_cleaner import RAW_ROWS
+
+# A price and a rating that can't be converted, and a row with both
+BAD_ROWS = RAW_ROWS + """F,£abc,Two,Travel,In stock
+G,£7.00,Six,Poetry,In stock
+H,free,Ten,Poetry,In stock
+"""
+
+class TestRawValidator(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.quarantine_path = os.path.join(self.temp_dir.name, "quarantine.csv")
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def raw(self) -> pd.DataFrame:
+        return pd.read_csv(StringIO(BAD_ROWS), dtype=str)
+
+    def test_convert_and_quarantine(self):
+        validator = RawValidator(DEFAULT_RULES, self.quarantine_path, max_failure_rate=1)
+        raw = self.raw()
+        df = validator.convert(raw.iloc[:10].copy())
+        df = pd.concat([df, validator.convert(raw.iloc[10:].copy())])
+
+        self.assertEqual(len(df), 9)
+        self.assertNotIn("F", df["title"].tolist())
+        self.assertEqual(df["price"].isna().sum(), 2)
+        self.assertEqual(validator.report(), {"rows": 12, "quarantined": 3, "failures": {"price": 2, "rating": 2}})
+
+        # The raw values are kept, with the failed columns
+        quarantine = pd.read_csv(self.quarantine_path, dtype=str)
+        self.assertEqual(quarantine["title"].tolist(), ["F", "G", "H"])
+        self.assertEqual(quarantine["price"].tolist(), ["£abc", "£7.00", "free"])
+        self.assertEqual(quarantine["failed_columns"].tolist(), ["price", "rating", "price rating"])
+
+        # A new validator replaces the quarantine file, unless it appends to it
+        RawValidator(DEFAULT_RULES, self.quarantine_path, append=True)
+        self.assertTrue(os.path.isfile(self.quarantine_path))
+        RawValidator(DEFAULT_RULES, self.quarantine_path)
+        self.assertFalse(os.path.isfile(self.quarantine_path))
+
+    def test_thresholds(self):
+        # 2 of 12 rows fail for each column
+        validator = RawValidator(DEFAULT_RULES, max_failure_rate=0.2)
+        validator.convert(self.raw())
+        validator.check()
+
+        validator = RawValidator(DEFAULT_RULES, max_failure_rate={"rating": 0.1})
+        validator.convert(self.raw())
+        with self.assertRaisesRegex(ValueError, r"rating 16.7% > 10.0%"):
+            validator.check()
+
+        with self.assertRaises(ValueError):
+            RawValidator(DEFAULT_RULES, max_failure_rate=1.5)
+
+    def test_missing_columns(self):
+        validator = RawValidator(DEFAULT_RULES)
+        with self.assertRaisesRegex(ValueError, r"missing the columns \['price', 'availability'\]"):
+            validator.convert(self.raw().drop(columns=["price", "availability"]))
+
+class TestCleanValidation(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.raw_path = os.path.join(self.temp_dir.name, "raw")
+        self.cleaned_path = os.path.join(self.temp_dir.name, "cleaned")
+        os.makedirs(self.raw_path)
+        patcher = mock.patch.multiple(data_cleaner, RAW_DATA_PATH=self.raw_path, CLEANED_DATA_PATH=self.cleaned_path)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        with open(os.path.join(self.raw_path, "books.csv"), "w", encoding="utf-8") as file:
+            file.write(BAD_ROWS)
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def clean(self, **kwargs) -> str:
+        shutil.rmtree(self.cleaned_path, ignore_errors=True)
+        output = StringIO()
+        with redirect_stdout(output):
+            clean_data("books.csv", **kwargs)
+        return output.getvalue()
+
+    def read(self, name) -> bytes:
+        with open(os.path.join(self.cleaned_path, name), "rb") as file:
+            return file.read()
+
+    def test_quarantined_rows_not_cleaned(self):
+        output = self.clean(max_failure_rate=0.2)
+        self.assertIn("3 of 12 rows can't be converted (price 2, rating 2)", output)
+        expected = self.read("cleaned_books.csv")
+        quarantine = self.read("quarantine_books.csv")
+        self.assertNotIn(b"\nF,", expected)
+
+        # Same output and quarantine file in chunks
+        for chunksize in (1, 5):
+            self.clean(chunksize=chunksize, max_failure_rate=0.2)
+            self.assertEqual(self.read("cleaned_books.csv"), expected)
+            self.assertEqual(self.read("quarantine_books.csv"), quarantine)
+
+    def test_fail_fast(self):
+        for chunksize in (None, 4):
+            output = self.clean(chunksize=chunksize)
+            self.assertIn("Error: Too many values can't be converted (price 16.7% > 5.0%, rating 16.7% > 5.0%)", output)
+            self.assertFalse(os.path.isfile(os.path.join(self.cleaned_path, "cleaned_books.csv")))
+            self.assertTrue(os.path.isfile(os.path.join(self.cleaned_path, "quarantine_books.csv")))
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,98 @@
+import unittest
+
+import numpy as np
+
+from scipy import stats
+from unittest import mock
+from question2_data_analysis import resampling
+from question2_data_analysis.resampling import batch_sizes, bootstrap_ci, compress, permutation_test
+
+class TestResampling(unittest.TestCase):
+
+    def setUp(self):
+        generator = np.random.default_rng(7)
+        self.values = generator.normal(30, 8, 400)
+        # Rounded prices repeat, so they are resampled through their distinct values
+        self.rounded = np.round(generator.uniform(10, 60, 5000), 0)
+
+    def test_batch_sizes_and_compress(self):
+        with mock.patch.object(resampling, "MAX_BATCH_VALUES", 1000):
+            self.assertEqual(batch_sizes(25, 100), [10, 10, 5])
+            self.assertEqual(batch_sizes(3, 5000), [1, 1, 1])
+        self.assertIsNone(compress(self.values)[1])
+        values, frequencies = compress(self.rounded)
+        self.assertEqual(values.tolist(), np.unique(self.rounded).tolist())
+        self.assertEqual(frequencies.sum(), len(self.rounded))
+
+    def test_bootstrap_ci(self):
+        result = bootstrap_ci(self.values, "mean", resamples=4000, seed=1)
+        self.assertAlmostEqual(result["estimate"], self.values.mean())
+        self.assertLess(result["low"], result["estimate"])
+        self.assertGreater(result["high"], result["estimate"])
+        # Close to the normal theory interval of the mean
+        standard_error = stats.sem(self.values)
+        self.assertAlmostEqual(result["std_error"], standard_error, delta=0.1 * standard_error)
+        self.assertAlmostEqual(result["low"], self.values.mean() - 1.96 * standard_error, delta=0.2 * standard_error)
+
+        median = bootstrap_ci(np.append(self.values, np.nan), "median", resamples=2000, seed=1)
+        self.assertEqual(median["estimate"], np.median(self.values))
+        self.assertTrue(median["low"] < median["estimate"] < median["high"])
+
+        x = self.values
+        xy = np.column_stack([x, 0.5 * x + np.random.default_rng(2).normal(0, 8, len(x))])
+        correlation = bootstrap_ci(xy, "correlation", resamples=2000, seed=1)
+        self.assertAlmostEqual(correlation["estimate"], stats.pearsonr(xy[:, 0], xy[:, 1])[0])
+        self.assertTrue(correlation["low"] < correlation["estimate"] < correlation["high"])
+
+    def test_distinct_values_match_resampled_rows(self):
+        # The same distribution whether the rows or the counts of the distinct values are resampled
+        for statistic, data in (("mean", self.rounded), ("median", self.rounded),
+                                ("correlation", np.column_stack([self.rounded, self.rounded % 5]))):
+            compressed = bootstrap_ci(data, statistic, resamples=2000, seed=3)
+            with mock.patch.object(resampling, "COMPRESSION_RATIO", len(data) + 1):
+                rows = bootstrap_ci(data, statistic, resamples=2000, seed=3)
+            self.assertEqual(compressed["estimate"], rows["estimate"])
+            self.assertAlmostEqual(compressed["std_error"], rows["std_error"], delta=0.1 * rows["std_error"])
+            self.assertAlmostEqual(compressed["low"], rows["low"], delta=0.5 * rows["std_error"])
+
+    def test_seeds_are_reproducible_across_workers(self):
+        with mock.patch.object(resampling, "MAX_BATCH_VALUES", 40000):
+            inline = bootstrap_ci(self.values, "mean", resamples=300, seed=5)
+            self.assertEqual(bootstrap_ci(self.values, "mean", resamples=300, seed=5), inline)
+            self.assertNotEqual(bootstrap_ci(self.values, "mean", resamples=300, seed=6), inline)
+            # 3 batches of 100 resamples, the same in a pool of 2 workers
+            pooled = resampling.run_batches("bootstrap", "mean", self.values, 300, seed=5, workers=2)
+            np.testing.assert_array_equal(pooled, resampling.run_batches("bootstrap", "mean", self.values, 300, seed=5))
+
+    def test_permutation_test(self):
+        a, b = self.values[:150], self.values[150:] + 2
+        result = permutation_test(a, b, resamples=4000, seed=1)
+        self.assertAlmostEqual(result["difference"], a.mean() - b.mean())
+        self.assertAlmostEqual(result["p_value"], stats.ttest_ind(a, b).pvalue, delta=0.03)
+
+        # The distinct values of rounded prices give the same p-value
+        a, b = self.rounded[:2000], self.rounded[2000:] + 1
+        compressed = permutation_test(a, b, resamples=2000, seed=1)
+        with mock.patch.object(resampling, "COMPRESSION_RATIO", len(self.rounded) + 1):
+            rows = permutation_test(a, b, resamples=2000, seed=1)
+        self.assertAlmostEqual(compressed["p_value"], rows["p_value"], delta=0.03)
+        self.assertEqual(permutation_test([1.0, 2.0], [1.0, 2.0], resamples=99)["p_value"], 1.0)
+
+    def test_invalid(self):
+        with self.assertRaises(ValueError):
+            bootstrap_ci(self.values, "mode")
+        with self.assertRaises(ValueError):
+            bootstrap_ci(self.values, resamples=0)
+        with self.assertRaises(ValueError):
+            bootstrap_ci(self.values, confidence=1)
+        with self.assertRaises(ValueError):
+            bootstrap_ci(self.values, "correlation")
+        with self.assertRaises(ValueError):
+            bootstrap_ci([1.0, np.nan])
+        with self.assertRaises(ValueError):
+            permutation_test(self.values, [np.nan])
+        with self.assertRaises(ValueError):
+            permutation_test(self.values, self.values, workers=0)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,76 @@
+import tempfile
+import unittest
+
+from question2_data_analysis.data_scraper import fetch_with_retries, scrape_data
+from question2_data_analysis.rate_limiter import TokenBucket
+from question2_data_analysis.response_cache import ResponseCache
+from tests.test_question2.fixture_server import FixtureServer
+
+class TestResponseCache(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.server = FixtureServer()
+        self.server.start()
+        self.rate_limiter = TokenBucket(1000)
+        self.url = self.server.url + "catalogue/page-1.html"
+
+    def tearDown(self):
+        self.server.stop()
+        self.temp_dir.cleanup()
+
+    def fetch(self, cache):
+        return fetch_with_retries(self.url, rate_limiter=self.rate_limiter, cache=cache)
+
+    def test_put_and_get(self):
+        cache = ResponseCache(self.temp_dir.name)
+        self.assertIsNone(cache.get("http://example.com/"))
+        cache.put("http://example.com/", "<html></html>", etag='"abc"')
+        entry = cache.get("http://example.com/")
+        self.assertEqual(entry["body"], "<html></html>")
+        self.assertTrue(cache.is_fresh(entry))
+        self.assertEqual(cache.conditional_headers(entry), {"If-None-Match": '"abc"'})
+
+    def test_fresh_entry_skips_network(self):
+        cache = ResponseCache(self.temp_dir.name)
+        first = self.fetch(cache)
+        second = self.fetch(cache)
+        self.assertEqual(first, second)
+        self.assertEqual(self.server.response_codes, [200])
+
+    def test_stale_entry_is_revalidated(self):
+        cache = ResponseCache(self.temp_dir.name, ttl=0)
+        first = self.fetch(cache)
+        second = self.fetch(cache)
+        self.assertEqual(first, second)
+        self.assertEqual(self.server.response_codes, [200, 304])
+
+    def test_offline_mode(self):
+        self.fetch(ResponseCache(self.temp_dir.name))
+        offline_cache = ResponseCache(self.temp_dir.name, ttl=0, offline=True)
+        self.assertIn("A Light in the Attic", self.fetch(offline_cache))
+        self.assertIsNone(fetch_with_retries(self.server.url + "catalogue/page-2.html", cache=offline_cache))
+        self.assertEqual(self.server.response_codes, [200])
+
+    def test_offline_scrape_matches_online(self):
+        cache = ResponseCache(self.temp_dir.name)
+        online = scrape_data(2, 2, 1000, self.server.base_url, self.server.detail_base_url, cache=cache)
+        self.server.stop()
+        offline = scrape_data(2, 2, None, self.server.base_url, self.server.detail_base_url,
+                              cache=ResponseCache(self.temp_dir.name, offline=True))
+        self.assertEqual(online, offline)
+
+    def test_lru_eviction(self):
+        cache = ResponseCache(self.temp_dir.name, max_bytes=1000)
+        cache.put("http://example.com/1", "x" * 300)
+        cache.put("http://example.com/2", "x" * 300)
+        cache.get("http://example.com/1") # 2 is now the least recently used
+        cache.put("http://example.com/3", "x" * 300)
+        self.assertIsNotNone(cache.get("http://example.com/1"))
+        self.assertIsNone(cache.get("http://example.com/2"))
+        self.assertIsNotNone(cache.get("http://example.com/3"))
+        # The index is rebuilt from disk
+        self.assertLessEqual(ResponseCache(self.temp_dir.name, max_bytes=1000)._total_bytes, 1000)
+
+if __name__ == "__main__":
+    unittest.main()
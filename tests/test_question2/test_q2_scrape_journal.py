@@ -0,0 +1,78 @@
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+from question2_data_analysis import data_scraper
+from question2_data_analysis.data_scraper import load_known_categories, save_to_csv, scrape_data
+from question2_data_analysis.scrape_journal import ScrapeJournal
+from tests.test_question2.fixture_server import FixtureServer
+from tests.test_question2.test_q2_scraper import EXPECTED_ROWS
+
+class TestScrapeJournal(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.journal_path = os.path.join(self.temp_dir.name, "books.csv.journal")
+        self.server = FixtureServer()
+        self.server.start()
+
+    def tearDown(self):
+        self.server.stop()
+        self.temp_dir.cleanup()
+
+    def scrape(self, pages, **kwargs):
+        return scrape_data(
+            pages,
+            requests_per_second=1000,
+            base_url=self.server.base_url,
+            detail_base_url=self.server.detail_base_url,
+            **kwargs
+        )
+
+    def test_replay(self):
+        journal = ScrapeJournal(self.journal_path)
+        journal.expect_page(1, 2)
+        journal.record_book(1, 0, "url-0", ["A"])
+        journal.record_book(1, 1, "url-1", ["B"])
+        journal.record_book(2, 0, "url-2", ["C"])
+        journal.close()
+        # A half written line from a killed run is ignored
+        with open(self.journal_path, "a", encoding="utf-8") as file:
+            file.write('{"type": "bo')
+
+        journal = ScrapeJournal(self.journal_path)
+        self.assertTrue(journal.is_page_complete(1))
+        self.assertFalse(journal.is_page_complete(2))
+        self.assertEqual(journal.page_rows(1), [["A"], ["B"]])
+        self.assertEqual(journal.get_row(2, 0), ["C"])
+        journal.clear()
+        self.assertFalse(os.path.exists(self.journal_path))
+
+    def test_resume(self):
+        # The first run is killed after page 1
+        journal = ScrapeJournal(self.journal_path)
+        self.scrape(1, journal=journal)
+        journal.close()
+        self.server.requested_paths.clear()
+
+        for workers in (1, 2):
+            journal = ScrapeJournal(self.journal_path)
+            rows = self.scrape(2, workers=workers, journal=journal)
+            journal.close()
+            self.assertEqual(rows, EXPECTED_ROWS)
+            self.assertNotIn("/catalogue/page-1.html", self.server.requested_paths)
+
+    def test_incremental(self):
+        with mock.patch.object(data_scraper, "DATA_PATH", self.temp_dir.name):
+            save_to_csv(EXPECTED_ROWS[:3], "books.csv")
+            known_categories = load_known_categories("books.csv")
+
+        self.assertEqual(known_categories[("Soumission", "£50.10")], "Fiction")
+        rows = self.scrape(2, known_categories=known_categories)
+        self.assertEqual(rows, EXPECTED_ROWS)
+        # Only the 2 new books on page 2 fetch their detail page
+        self.assertEqual(len(self.server.requested_paths), 4)
+
+if __name__ == "__main__":
+    unittest.main()
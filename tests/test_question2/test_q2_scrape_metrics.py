@@ -0,0 +1,72 @@
+import json
+import os
+import tempfile
+import time
+import unittest
+
+from question2_data_analysis.data_scraper import fetch_with_retries, scrape_data
+from question2_data_analysis.response_cache import ResponseCache
+from question2_data_analysis.scrape_metrics import ScrapeMetrics
+from tests.test_question2.fixture_server import FixtureServer
+
+class TestScrapeMetrics(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.server = FixtureServer()
+        self.server.start()
+
+    def tearDown(self):
+        self.server.stop()
+        self.temp_dir.cleanup()
+
+    def test_latency_histogram(self):
+        metrics = ScrapeMetrics()
+        metrics.record_request(0.01, 100, 200)
+        metrics.record_request(0.3, 200, 503)
+        metrics.record_request(60.0)
+        snapshot = metrics.snapshot()["requests"]
+        self.assertEqual(snapshot["count"], 3)
+        self.assertEqual(snapshot["errors"], 1)
+        self.assertEqual(snapshot["bytes"], 300)
+        self.assertEqual(snapshot["status_codes"], {"200": 1, "503": 1})
+        self.assertEqual(snapshot["latency_ms"]["histogram"]["<=50ms"], 1)
+        self.assertEqual(snapshot["latency_ms"]["histogram"]["<=500ms"], 1)
+        self.assertEqual(snapshot["latency_ms"]["histogram"][">10000ms"], 1)
+
+    def test_invalid_cache_result(self):
+        with self.assertRaises(ValueError):
+            ScrapeMetrics().record_cache("stale")
+
+    def test_scrape_metrics(self):
+        metrics = ScrapeMetrics()
+        cache = ResponseCache(self.temp_dir.name)
+        self.server.fail("/catalogue/page-2.html", [503], {"Retry-After": "0"})
+        scrape_data(2, workers=2, requests_per_second=1000, base_url=self.server.base_url,
+                    detail_base_url=self.server.detail_base_url, cache=cache, metrics=metrics)
+        # The second run is served by the cache
+        fetch_with_retries(self.server.base_url.format(1), cache=cache, metrics=metrics)
+
+        snapshot = metrics.snapshot()
+        self.assertEqual(snapshot["requests"]["count"], 8)
+        self.assertEqual(snapshot["requests"]["retries"], 1)
+        self.assertEqual(snapshot["requests"]["status_codes"], {"200": 7, "503": 1})
+        self.assertEqual(snapshot["cache"]["miss"], 7)
+        self.assertEqual(snapshot["cache"]["hit"], 1)
+        self.assertEqual(snapshot["cache"]["hit_ratio"], 0.125)
+        self.assertEqual(snapshot["parse"]["pages"], 7)
+        self.assertEqual(snapshot["rows"]["count"], 5)
+        self.assertGreater(snapshot["rows"]["per_second"], 0)
+
+    def test_json_export(self):
+        metrics = ScrapeMetrics()
+        file_path = os.path.join(self.temp_dir.name, "metrics.json")
+        metrics.start_snapshots(file_path, interval=0.01)
+        metrics.record_row()
+        time.sleep(0.1)
+        metrics.stop_snapshots()
+        with open(file_path, encoding="utf-8") as file:
+            self.assertEqual(json.load(file)["rows"]["count"], 1)
+
+if __name__ == "__main__":
+    unittest.main()
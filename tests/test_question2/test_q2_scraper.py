@@ -0,0 +1,98 @@
+import time
+import unittest
+
+from question2_data_analysis.data_scraper import iter_scrape_data, scrape_data, write_in_batches
+from question2_data_analysis.rate_limiter import TokenBucket
+from tests.test_question2.fixture_server import FixtureServer
+
+EXPECTED_ROWS = [
+    ["A Light in the Attic", "£51.77", "Three", "Poetry", "In stock"],
+    ["Tipping the Velvet", "£53.74", "One", "Historical Fiction", "In stock"],
+    ["Soumission", "£50.10", "One", "Fiction", "In stock"],
+    ["Sharp Objects", "£47.82", "Four", "Mystery", "In stock"],
+    ["The Requiem Red", "£22.65", "One", "Fiction", "Out of stock"],
+]
+
+class TestScraper(unittest.TestCase):
+
+    def setUp(self):
+        self.server = FixtureServer()
+        self.server.start()
+
+    def tearDown(self):
+        self.server.stop()
+
+    def scrape(self, **kwargs):
+        return scrape_data(
+            2,
+            base_url=self.server.base_url,
+            detail_base_url=self.server.detail_base_url,
+            **kwargs
+        )
+
+    def test_sequential_scrape(self):
+        rows = self.scrape(requests_per_second=1000)
+        self.assertEqual(rows, EXPECTED_ROWS)
+
+    def test_concurrent_scrape_matches_sequential(self):
+        rows = self.scrape(workers=4, requests_per_second=1000)
+        self.assertEqual(rows, EXPECTED_ROWS)
+        # 2 listing pages and 5 detail pages
+        self.assertEqual(len(self.server.requested_paths), 7)
+
+    def test_index_category_strategy(self):
+        rows = self.scrape(requests_per_second=1000, category_strategy="index")
+        self.assertEqual(rows, EXPECTED_ROWS)
+        # Only the book missing from the category pages fetches its detail page
+        detail_paths = [
+            path for path in self.server.requested_paths
+            if "/category/" not in path and path.endswith("/index.html")
+        ]
+        self.assertEqual(detail_paths, ["/catalogue/tipping-the-velvet_999/index.html"])
+        self.assertIn("/catalogue/category/books/fiction_10/page-2.html", self.server.requested_paths)
+
+    def test_index_category_strategy_concurrent(self):
+        rows = self.scrape(workers=4, requests_per_second=1000, category_strategy="index")
+        self.assertEqual(rows, EXPECTED_ROWS)
+
+    def test_invalid_category_strategy(self):
+        with self.assertRaises(ValueError):
+            self.scrape(category_strategy="breadcrumb")
+
+    def test_rows_are_streamed(self):
+        rows = iter_scrape_data(2, requests_per_second=1000,
+                                base_url=self.server.base_url, detail_base_url=self.server.detail_base_url)
+        self.assertEqual(next(rows), EXPECTED_ROWS[0])
+        # Only the first listing page and the first detail page are fetched so far
+        self.assertEqual(len(self.server.requested_paths), 2)
+        self.assertEqual(list(rows), EXPECTED_ROWS[1:])
+
+    def test_concurrent_rows_are_streamed_in_order(self):
+        rows = iter_scrape_data(2, workers=3, requests_per_second=1000,
+                                base_url=self.server.base_url, detail_base_url=self.server.detail_base_url)
+        self.assertEqual(list(rows), EXPECTED_ROWS)
+
+    def test_write_in_batches(self):
+        batches = []
+        count = write_in_batches(iter(range(7)), batches.append, batch_size=3)
+        self.assertEqual(count, 7)
+        self.assertEqual(batches, [[0, 1, 2], [3, 4, 5], [6]])
+        with self.assertRaises(ValueError):
+            write_in_batches([], batches.append, batch_size=0)
+
+class TestTokenBucket(unittest.TestCase):
+
+    def test_invalid_rate(self):
+        with self.assertRaises(ValueError):
+            TokenBucket(0)
+
+    def test_rate_is_enforced(self):
+        bucket = TokenBucket(rate=50, capacity=1)
+        start = time.monotonic()
+        for _ in range(6):
+            bucket.acquire()
+        # First token is available immediately, the other 5 wait 1/50s each
+        self.assertGreaterEqual(time.monotonic() - start, 5 / 50 * 0.9)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,155 @@
+import unittest
+
+import numpy as np
+import pandas as pd
+
+from scipy import stats
+from question2_data_analysis.streaming_stats import AnalysisStatistics, ColumnStatistics, GroupedStatistics, quantile_from_counts
+
+def books(rows: int, seed: int) -> pd.DataFrame:
+    generator = np.random.default_rng(seed)
+    return pd.DataFrame({
+        "price": np.round(generator.uniform(10, 60, rows), 2),
+        "rating": generator.integers(1, 6, rows),
+        "category": generator.choice(["Fiction", "Nonfiction", "Poetry", "Travel", "Default", "History"], rows),
+    })
+
+class TestColumnStatistics(unittest.TestCase):
+
+    def test_quantile_from_counts(self):
+        for values in ([3.0], [1.0, 2.0], [5.0, 1.0, 1.0, 4.0, 2.0], [2.5, 2.5, 7.0, 1.0]):
+            counts = pd.Series(values).value_counts()
+            for q in (0, 0.25, 0.5, 0.75, 0.9, 1):
+                self.assertAlmostEqual(quantile_from_counts(counts, q), pd.Series(values).quantile(q))
+        self.assertTrue(np.isnan(quantile_from_counts(pd.Series(dtype=int), 0.5)))
+
+    def test_matches_pandas_in_chunks(self):
+        series = pd.Series([4.5, np.nan, 1.0, 4.5, 9.25, 1.0, 3.0, 4.5, 0.5])
+        for chunksize in (1, 2, 4, 9):
+            column = ColumnStatistics()
+            for start in range(0, len(series), chunksize):
+                column.update(series.iloc[start:start + chunksize])
+            self.assertEqual(column.n, series.count())
+            self.assertAlmostEqual(column.mean, series.mean())
+            self.assertAlmostEqual(column.std(), series.std())
+            self.assertEqual((column.min, column.max), (series.min(), series.max()))
+            self.assertEqual(column.mode(), series.mode()[0])
+            self.assertEqual(column.quantile(0.25), series.quantile(0.25))
+            self.assertEqual(column.count_outside(1.0, 4.5), 2)
+
+    def test_empty(self):
+        column = ColumnStatistics()
+        column.update(pd.Series([np.nan]))
+        self.assertTrue(np.isnan(column.std()) and np.isnan(column.quantile(0.5)) and np.isnan(column.mode()))
+        self.assertEqual(column.count_outside(0, 1), 0)
+
+class TestGroupedStatistics(unittest.TestCase):
+
+    def grouped(self, df, chunksize) -> GroupedStatistics:
+        statistics = GroupedStatistics()
+        for start in range(0, len(df), chunksize):
+            chunk = df.iloc[start:start + chunksize]
+            statistics.update(chunk["category"], chunk["price"])
+        return statistics
+
+    def test_matches_groupby(self):
+        df = books(2000, 3)
+        df.loc[df.index % 7 == 0, "price"] = np.nan
+        df.loc[df.index % 11 == 0, "category"] = None
+        groups = df.groupby("category", sort=False)["price"]
+        expected = pd.DataFrame({
+            "rows": groups.size(), "count": groups.count(), "mean": groups.mean(), "var": groups.var(),
+            "std": groups.std(), "min": groups.min(), "max": groups.max(),
+            "25%": groups.quantile(0.25), "50%": groups.quantile(0.5), "75%": groups.quantile(0.75),
+        })
+        for chunksize in (2000, 333, 97):
+            table = self.grouped(df, chunksize).table()
+            self.assertEqual(table.index.tolist(), expected.index.tolist())
+            pd.testing.assert_frame_equal(table, expected, check_names=False, check_dtype=False, check_index_type=False)
+
+    def test_merge_top_k_and_welch(self):
+        df = books(1500, 4)
+        expected = self.grouped(df, 1500)
+        merged = self.grouped(df.iloc[:400], 100)
+        merged.merge(self.grouped(df.iloc[400:], 250))
+        pd.testing.assert_frame_equal(merged.table(), expected.table())
+
+        counts = df["category"].value_counts()
+        self.assertEqual(merged.top_k(3).tolist(), counts.index[:3].tolist())
+
+        fiction = df.loc[df["category"] == "Fiction", "price"]
+        poetry = df.loc[df["category"] == "Poetry", "price"]
+        t_stat, p_value = merged.welch_test("Fiction", "Poetry")
+        expected_t, expected_p = stats.ttest_ind(fiction, poetry, equal_var=False)
+        self.assertAlmostEqual(t_stat, expected_t)
+        self.assertAlmostEqual(p_value, expected_p)
+        self.assertTrue(np.isnan(merged.welch_test("Fiction", "Unknown")[1]))
+
+    def test_empty_group(self):
+        statistics = GroupedStatistics()
+        statistics.update(pd.Series(["A", "B", "A"]), pd.Series([1.0, np.nan, 3.0]))
+        table = statistics.table()
+        self.assertEqual(table.loc["A", "50%"], 2.0)
+        self.assertEqual(table.loc["B", "rows"], 1)
+        self.assertTrue(np.isnan(table.loc["B", "mean"]) and np.isnan(table.loc["B", "50%"]))
+
+class TestAnalysisStatistics(unittest.TestCase):
+
+    def test_matches_pandas_and_scipy(self):
+        df = books(3000, 1)
+        statistics = AnalysisStatistics()
+        statistics.update(df)
+
+        top = df["category"].value_counts().head(4).index
+        expected = df[df["category"].isin(top)].groupby("category")["price"].mean().round(2).sort_values(ascending=False)
+        result = statistics.top_category_prices(4)
+        self.assertEqual(result["category"].tolist(), expected.index.tolist())
+        self.assertEqual(result["price"].tolist(), expected.tolist())
+
+        r, p_value = statistics.price_rating_correlation()
+        expected_r, expected_p = stats.pearsonr(df["price"], df["rating"])
+        self.assertAlmostEqual(r, expected_r)
+        self.assertAlmostEqual(p_value, expected_p)
+
+        fiction = df.loc[df["category"] == "Fiction", "price"]
+        self.assertEqual(statistics.category_price("Fiction")[0], len(fiction))
+        self.assertAlmostEqual(statistics.category_price("Fiction")[2], fiction.std())
+        self.assertEqual(statistics.category_price("Unknown")[0], 0)
+        self.assertEqual(statistics.rating.counts.sort_index().tolist(), df["rating"].value_counts().sort_index().tolist())
+
+    def test_shards_merge(self):
+        df = books(1000, 2)
+        expected = AnalysisStatistics()
+        expected.update(df)
+
+        # Shards analyzed separately (in parallel processes for a large dataset), then merged
+        shards = []
+        for start in range(0, len(df), 300):
+            shard = AnalysisStatistics()
+            for chunk_start in range(start, min(start + 300, len(df)), 70):
+                shard.update(df.iloc[chunk_start:min(chunk_start + 70, start + 300)])
+            shards.append(shard)
+        merged = AnalysisStatistics()
+        for shard in shards:
+            merged.merge(shard)
+
+        self.assertAlmostEqual(merged.price.mean, expected.price.mean)
+        self.assertAlmostEqual(merged.price.std(), expected.price.std())
+        self.assertEqual(merged.price.quantile(0.75), expected.price.quantile(0.75))
+        self.assertEqual(merged.categories.tolist(), expected.categories.tolist())
+        pd.testing.assert_frame_equal(merged.top_category_prices(6), expected.top_category_prices(6))
+        for value, expected_value in zip(merged.price_rating_correlation(), expected.price_rating_correlation()):
+            self.assertAlmostEqual(value, expected_value)
+
+    def test_category_tie_keeps_first_appearance(self):
+        statistics = AnalysisStatistics()
+        statistics.update(pd.DataFrame({"price": [1.0, 2.0], "rating": [1, 2], "category": ["Travel", "Poetry"]}))
+        statistics.update(pd.DataFrame({"price": [3.0, 4.0], "rating": [1, 2], "category": ["Poetry", "Art"]}))
+        df = pd.DataFrame({"category": ["Travel", "Poetry", "Poetry", "Art"]})
+        self.assertEqual(statistics.categories.index.tolist(), ["Travel", "Poetry", "Art"])
+        self.assertEqual(statistics.categories.sort_values(ascending=False, kind="stable").index.tolist(),
+                         df["category"].value_counts().index.tolist())
+        self.assertEqual(statistics.top_category_prices(2)["category"].tolist(), ["Poetry", "Travel"])
+
+if __name__ == "__main__":
+    unittest.main()